@@ -0,0 +1,135 @@
+#!/usr/bin/python3
+"""
+HTTP/2 transport benchmark (--http2) against the synthetic openQA/QAM server (tests.fake_server) over HTTPS, compared
+with the pooled HTTP/1.1 connections of requests. The HTTP/2 transport is run against a server offering only h2
+(multiplexed over a single connection) and against one offering only HTTP/1.1 (the fallback).
+
+The request burst is many small openQA JSON requests sent concurrently like a search does: overview queries per
+version, state and day plus job details lookups. The whole run is the tool itself (main) in a separate process.
+
+Needs httpx with HTTP/2 support (pip install oqa-search[http2]) and the openssl command.
+
+Usage: python -m benchmarks.bench_http2 [--latency SECONDS] [--versions N] [--days N] [--rounds N]
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import time
+from typing import List, Tuple
+
+from oqa_search import oqa_search
+from tests.fake_server import FakeServer
+
+UPDATE_ID = "SUSE:Maintenance:12345:67890"
+
+# transport name, whether the server offers only h2 and whether the tool uses the HTTP/2 transport
+TRANSPORTS: List[Tuple[str, bool, bool]] = [
+    ("HTTP/1.1 pooled", False, False),
+    ("HTTP/2 multiplexed", True, True),
+    ("HTTP/2 fallback", False, True),
+]
+
+
+def _burst_urls(server: FakeServer, days: int) -> List[str]:
+    """Get the URLs of the request burst: overview queries per version, state and day, then job details lookups"""
+    builds = [server.build] + ["2024{:04}-1".format(1101 + day) for day in range(days)]
+    overview_url = "{}/api/v1/jobs/overview?distri=sle&version={}&build={}&groupid=20000{}"
+    urls = [
+        overview_url.format(server.url, version, build, query)
+        for version in server.versions
+        for build in builds
+        for query in oqa_search.OQA_QUERY_STRINGS.values()
+    ]
+    job_ids = range(1, len(server.versions) * server.jobs_per_build + 1)
+    urls.extend("{}/api/v1/jobs/{}".format(server.url, job_id) for job_id in job_ids)
+
+    return urls
+
+
+def _warm_up(server: FakeServer, days: int) -> None:
+    """Look at all the builds of the request burst, then forget about the requests and connections it took"""
+    oqa_search.set_http2(server.http2)
+    urls = [url for url in _burst_urls(server, days) if "/overview?" in url]
+    futures = oqa_search._run_concurrently(oqa_search._get_json, [(url,) for url in urls], oqa_search.FETCH_SLOTS)
+    for future in futures:
+        future.result()
+    oqa_search.set_http2(False)
+    server.requests.clear()
+    server.connections = 0
+
+
+def _run_burst(server: FakeServer, days: int, http2: bool) -> float:
+    """Send the request burst with a transport from a fresh connection pool, return its wall time"""
+    oqa_search._get_session.cache_clear()
+    oqa_search._get_http2_client.cache_clear()
+    oqa_search.set_http2(http2)
+    urls = _burst_urls(server, days)
+
+    start = time.perf_counter()
+    futures = oqa_search._run_concurrently(oqa_search._get_json, [(url,) for url in urls], oqa_search.FETCH_SLOTS)
+    for future in futures:
+        future.result()
+    elapsed = time.perf_counter() - start
+    oqa_search.set_http2(False)
+
+    return elapsed
+
+
+def _run_main(server: FakeServer, days: int, http2: bool) -> Tuple[int, float]:
+    """Run the tool against the server, return its exit code and wall time"""
+    argv = [sys.executable, "-m", "oqa_search.oqa_search", UPDATE_ID, "--days", str(days), "--no-history"]
+    argv.extend(["--no-cache"] + (["--http2"] if http2 else []))
+    for option in ["--url-openqa", "--url-dashboard-qam", "--url-qam"]:
+        argv.extend([option, server.url])
+
+    start = time.perf_counter()
+    exit_code = subprocess.run(argv, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL).returncode
+
+    return exit_code, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--latency", type=float, default=0.02, help="Seconds the server waits before every answer")
+    parser.add_argument("--versions", type=int, default=8, help="Versions affected by the incident")
+    parser.add_argument("--days", type=int, default=10, help="Aggregated updates days searched back")
+    parser.add_argument("--rounds", type=int, default=3, help="Rounds of every measure, the best one is shown")
+    args = parser.parse_args()
+
+    for name, measure in [("request burst", _run_burst), ("whole run", _run_main)]:
+        print("{}:".format(name))
+        for transport, http2_server, http2 in TRANSPORTS:
+            times = []
+            exit_code = 0
+            # the incident is only in the oldest aggregated updates build, so the whole window is searched
+            with FakeServer(
+                versions=args.versions,
+                aggregated_day=args.days - 1,
+                latency=args.latency,
+                tls=True,
+                http2=http2_server,
+            ) as server:
+                # both transports (and the tool processes) trust the self signed certificate of the server
+                os.environ["SSL_CERT_FILE"] = os.environ["REQUESTS_CA_BUNDLE"] = server.cert_file
+                # the jobs looked up by the burst are made by the server once their builds were looked at
+                _warm_up(server, args.days)
+                for _ in range(args.rounds):
+                    result = measure(server, args.days, http2)
+                    if isinstance(result, tuple):
+                        exit_code, result = result
+                    times.append(result)
+            print(
+                "  {:<20} {:>8.3f} s {:>6} requests {:>4} connections{}".format(
+                    transport,
+                    min(times),
+                    sum(server.requests.values()) // args.rounds,
+                    server.connections // args.rounds,
+                    "" if exit_code == 0 else " (exit code {})".format(exit_code),
+                )
+            )
+
+
+if __name__ == "__main__":
+    main()
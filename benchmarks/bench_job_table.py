@@ -0,0 +1,118 @@
+#!/usr/bin/python3
+"""
+Job summary (--summary) benchmark on large synthetic builds: memory of the jobs kept as the dicts of their details
+against the columnar job tables (oqa_search._make_job_table), and time of counting them per state, result,
+version, group and machine, in Python over the dicts and with oqa_search._count_jobs (NumPy if installed, and without).
+
+Usage: python -m benchmarks.bench_job_table [--jobs N] [--versions N] [--groups N] [--rounds N]
+"""
+
+import argparse
+import time
+import tracemalloc
+from collections import Counter
+from typing import Callable, Dict, Iterator, List, Tuple
+
+from oqa_search import oqa_search
+
+MACHINES = ["64bit", "uefi", "aarch64", "s390x-kvm", "ppc64le", "64bit-sev", "svirt-xen-hvm"]
+RESULTS = ["failed", "incomplete", "timeout_exceeded"]
+STATES = ["scheduled", "running", "assigned", "setup", "uploading"]
+
+
+def _builds(jobs: int, versions: int, groups: int) -> Iterator[Tuple[List[Dict], str, str]]:
+    """Synthetic running and failed jobs of every build (their state, result and name from the details): jobs, version
+    and group"""
+    builds = versions * groups * 2
+    for n in range(builds):
+        version, group = "15-SP{}".format(n % versions), "group{}".format(n // versions % groups)
+        build_jobs = []
+        for job_id in range(n * jobs // builds, (n + 1) * jobs // builds):
+            job = {
+                "id": job_id,
+                "name": "sle-{}-Server-DVD-Updates-x86_64-Build20241120-1-mau-extratests{}@{}".format(
+                    version, job_id, MACHINES[job_id % len(MACHINES)]
+                ),
+                "state": "done",
+                "result": RESULTS[job_id % len(RESULTS)],
+            }
+            if n % 2:
+                job.update(state=STATES[job_id % len(STATES)], result="none")
+            build_jobs.append(job)
+        yield build_jobs, version, group
+
+
+def _keep_dicts(builds: List[Tuple[List[Dict], str, str]]) -> List[Dict]:
+    # the jobs as they come from the details, along with the build they belong to (their names are shared, so only
+    # the dicts count)
+    return [dict(job, version=version, group=group) for jobs, version, group in builds for job in jobs]
+
+
+def _keep_table(builds: List[Tuple[List[Dict], str, str]]) -> Dict:
+    table = oqa_search._make_job_table()
+    for jobs, version, group in builds:
+        oqa_search._add_job_results(table, jobs, version, group)
+    return table
+
+
+def _count_dicts(jobs: List[Dict]) -> List[Counter]:
+    return [
+        Counter(job["state"] for job in jobs),
+        Counter(job["result"] for job in jobs),
+        Counter(job["version"] for job in jobs),
+        Counter(job["group"] for job in jobs),
+        Counter(job["name"].partition("@")[2] for job in jobs),
+    ]
+
+
+def _count_table(table: Dict) -> List[Dict]:
+    return [oqa_search._count_jobs(table, [column]) for column in oqa_search.JOB_TABLE_COLUMNS]
+
+
+def _measure_memory(keep: Callable, builds: List) -> Tuple[object, float]:
+    tracemalloc.start()
+    kept = keep(builds)
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return kept, size
+
+
+def _measure_time(count: Callable, kept: object, rounds: int) -> float:
+    times = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        count(kept)
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--jobs", type=int, default=500000, help="Running and failed jobs of all the builds")
+    parser.add_argument("--versions", type=int, default=8, help="SLE versions of the builds")
+    parser.add_argument("--groups", type=int, default=4, help="Job groups of the builds")
+    parser.add_argument("--rounds", type=int, default=3, help="Rounds of every count, the best one is shown")
+    args = parser.parse_args()
+
+    builds = list(_builds(args.jobs, args.versions, args.groups))
+    jobs, dicts_size = _measure_memory(_keep_dicts, builds)
+    table, table_size = _measure_memory(_keep_table, builds)
+    del builds
+
+    print("memory ({} jobs):".format(args.jobs))
+    for name, size in [("dicts", dicts_size), ("job table", table_size)]:
+        print("  {:<18} {:>10.1f} MiB {:>8.1f} bytes per job".format(name, size / 2**20, size / args.jobs))
+
+    print("counts per state, result, version, group and machine:")
+    print("  {:<18} {:>8.3f} s".format("dicts", _measure_time(_count_dicts, jobs, args.rounds)))
+    numpy = oqa_search.numpy
+    # the columns are counted in Python without NumPy
+    oqa_search.numpy = None
+    print("  {:<18} {:>8.3f} s".format("job table (array)", _measure_time(_count_table, table, args.rounds)))
+    oqa_search.numpy = numpy
+    if numpy is not None:
+        print("  {:<18} {:>8.3f} s".format("job table (NumPy)", _measure_time(_count_table, table, args.rounds)))
+
+
+if __name__ == "__main__":
+    main()
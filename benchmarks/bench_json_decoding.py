@@ -0,0 +1,92 @@
+#!/usr/bin/python3
+"""
+Memory benchmark of decoding big openQA listings at once (json.loads) against decoding their items as the bytes
+arrive (oqa_search._iter_json_items) keeping only the needed fields.
+
+Usage: python -m benchmarks.bench_json_decoding [--groups N] [--template-size BYTES] [--jobs N]
+"""
+
+import argparse
+import json
+import time
+import tracemalloc
+from typing import Callable, Dict, Iterator, List
+
+from oqa_search import oqa_search
+
+CHUNK_SIZE = oqa_search.RESPONSE_CHUNK_SIZE
+
+
+def _job_groups_chunks(groups: int, template_size: int) -> Iterator[bytes]:
+    """Synthetic /api/v1/job_groups response, generated chunk by chunk as it would arrive from the network"""
+    template = "scenarios:\n  x86_64:\n" + "    - mau-extratests\n" * (template_size // 21)
+    yield from _list_chunks(
+        {
+            "id": i,
+            "name": "Maintenance: SLE 15 SP{} Core Incidents {}".format(i % 8, i),
+            "template": template,
+            "description": "Job group {}".format(i),
+            "build_version_sort": 1,
+            "keep_logs_in_days": 30,
+        }
+        for i in range(groups)
+    )
+
+
+def _overview_chunks(jobs: int) -> Iterator[bytes]:
+    """Synthetic /api/v1/jobs/overview response, generated chunk by chunk as it would arrive from the network"""
+    yield from _list_chunks(
+        {"id": i, "name": "sle-15-SP6-Server-DVD-Updates-x86_64-Build20241120-1-mau-extratests{}@64bit".format(i)}
+        for i in range(jobs)
+    )
+
+
+def _list_chunks(items: Iterator[Dict]) -> Iterator[bytes]:
+    buffer = bytearray(b"[")
+    for n, item in enumerate(items):
+        buffer.extend((b"," if n else b"") + json.dumps(item).encode())
+        while len(buffer) >= CHUNK_SIZE:
+            yield bytes(buffer[:CHUNK_SIZE])
+            del buffer[:CHUNK_SIZE]
+    yield bytes(buffer + b"]")
+
+
+def _decode_whole(chunks: Iterator[bytes], reducer: Callable) -> List[Dict]:
+    # what _get_json does without an item reducer: buffer the whole body, then decode it
+    return [reducer(item) for item in json.loads(b"".join(chunks))]
+
+
+def _decode_streaming(chunks: Iterator[bytes], reducer: Callable) -> List[Dict]:
+    return [reducer(item) for item in oqa_search._iter_json_items(chunks)]
+
+
+def _measure(decode: Callable, chunks: Callable[[], Iterator[bytes]], reducer: Callable) -> None:
+    tracemalloc.start()
+    start = time.perf_counter()
+    items = decode(chunks(), reducer)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(
+        "  {:<18} {:>8} items {:>10.1f} MiB peak {:>8.3f} s".format(decode.__name__, len(items), peak / 2**20, elapsed)
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--groups", type=int, default=2000, help="Job groups in the job groups listing")
+    parser.add_argument("--template-size", type=int, default=20000, help="Size of every job group template")
+    parser.add_argument("--jobs", type=int, default=200000, help="Jobs in the overview listing")
+    args = parser.parse_args()
+
+    print("job groups ({} groups, {} bytes templates):".format(args.groups, args.template_size))
+    for decode in (_decode_whole, _decode_streaming):
+        _measure(decode, lambda: _job_groups_chunks(args.groups, args.template_size), oqa_search._reduce_openqa_group)
+
+    print("overview ({} jobs):".format(args.jobs))
+    for decode in (_decode_whole, _decode_streaming):
+        _measure(decode, lambda: _overview_chunks(args.jobs), oqa_search._reduce_openqa_job)
+
+
+if __name__ == "__main__":
+    main()
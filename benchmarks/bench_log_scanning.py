@@ -0,0 +1,70 @@
+#!/usr/bin/python3
+"""
+Throughput benchmark of scanning a local mirror of build checks logs (oqa_search._scan_local_build_checks) with a
+growing number of processes, on a synthetic corpus made of the test fixtures logs repeated up to the given size.
+The test framework summaries are found from the end of the logs, with --no-summary they're left out of the corpus so
+the logs are searched whole in chunks.
+
+Usage: python -m benchmarks.bench_log_scanning [--logs N] [--log-size MIB] [--workers N [N ...]] [--no-summary]
+"""
+
+import argparse
+import os
+import tempfile
+import time
+from glob import glob
+
+from oqa_search import oqa_search
+
+UPDATE_DIR = "SUSE:Maintenance:12345:67890/build_checks"
+
+
+def _make_corpus(path: str, logs: int, log_size: int, summary: bool) -> int:
+    """Write the synthetic logs of an update, return their total size"""
+    fixtures = b"".join(open(log, "rb").read() for log in sorted(glob("tests/fixtures/*/*.log")))
+    if not summary:
+        fixtures = b"".join(
+            line
+            for line in fixtures.splitlines(keepends=True)
+            if oqa_search.extract_testsuite_summary([line.decode()]) is None
+        )
+    logs_dir = os.path.join(path, UPDATE_DIR)
+    os.makedirs(logs_dir)
+    for n in range(logs):
+        with open(os.path.join(logs_dir, "foo-testsuite{}.SUSE_SLE-15_Update.x86_64.log".format(n)), "wb") as f:
+            for _ in range(max(log_size // len(fixtures), 1)):
+                f.write(fixtures)
+
+    return sum(os.path.getsize(os.path.join(logs_dir, name)) for name in os.listdir(logs_dir))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--logs", type=int, default=8, help="Logs in the corpus")
+    parser.add_argument("--log-size", type=int, default=64, help="Size of every log in MiB")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8], help="Processes to scan with")
+    parser.add_argument("--no-summary", action="store_true", help="Leave the test framework summaries out")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as path:
+        size = _make_corpus(path, args.logs, args.log_size * 2**20, not args.no_summary)
+        print("{} logs, {:.1f} MiB ({} CPUs):".format(args.logs, size / 2**20, os.cpu_count()))
+
+        baseline = None
+        for workers in args.workers:
+            # start the processes before timing, they're shared by all the updates of a run
+            if workers > 1:
+                oqa_search._get_scan_pool(workers).submit(int).result()
+            start = time.perf_counter()
+            results = list(oqa_search._scan_local_build_checks(path, "Maintenance", 12345, 67890, "foo", workers))
+            elapsed = time.perf_counter() - start
+            baseline = baseline or elapsed
+            print(
+                "  {:>3} workers {:>8.3f} s {:>8.1f} MiB/s {:>6.2f}x {:>8} matches".format(
+                    workers, elapsed, size / 2**20 / elapsed, baseline / elapsed, sum(len(m) for _, m in results)
+                )
+            )
+
+
+if __name__ == "__main__":
+    main()
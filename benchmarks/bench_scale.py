@@ -0,0 +1,94 @@
+#!/usr/bin/python3
+"""
+Scale benchmark of a whole run (main) against the synthetic openQA/QAM server (tests.fake_server), growing one
+dimension at a time: job groups, versions, aggregated updates days to search back and build checks log sizes.
+
+Every run is a separate process, so its peak RSS is its own. The requests and bytes are the ones the server answered.
+The time to first line is when the first result (the first single incident version) is printed.
+
+Usage: python -m benchmarks.bench_scale [--latency SECONDS] [--error-rate RATIO] [--backend {openqa,dashboard}]
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import time
+from typing import Dict, List, Optional, Tuple
+
+from tests.fake_server import FakeServer
+
+UPDATE_ID = "SUSE:Maintenance:12345:67890"
+
+# values of every dimension, the others are kept at their first value meanwhile
+DIMENSIONS: Dict[str, List[int]] = {
+    "groups": [100, 1000, 5000],
+    "versions": [1, 4, 16],
+    "days": [2, 10, 30],
+    "log_mib": [1, 8, 32],
+}
+
+
+def _run(server: FakeServer, days: int, backend: str) -> Tuple[int, float, Optional[float], int]:
+    """Run the tool against the server, return its exit code, wall time, time to first line and peak RSS in bytes"""
+    argv = [sys.executable, "-m", "oqa_search.oqa_search", UPDATE_ID, "--days", str(days), "--backend", backend]
+    argv.append("--no-history")
+    for option in ["--url-openqa", "--url-dashboard-qam", "--url-qam"]:
+        argv.extend([option, server.url])
+
+    start = time.perf_counter()
+    process = subprocess.Popen(argv, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+    first_line = None
+    for line in process.stdout:
+        # the results are printed as "<version> -> <openQA URL>"
+        if first_line is None and b" -> " in line:
+            first_line = time.perf_counter() - start
+    _, status, usage = os.wait4(process.pid, 0)
+    elapsed = time.perf_counter() - start
+    process.stdout.close()
+    # ru_maxrss is in bytes on macOS and in KiB elsewhere
+    peak_rss = usage.ru_maxrss if sys.platform == "darwin" else usage.ru_maxrss * 1024
+    exit_code = os.WEXITSTATUS(status) if os.WIFEXITED(status) else -os.WTERMSIG(status)
+
+    return exit_code, elapsed, first_line, peak_rss
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds the server waits before every answer")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Ratio of requests answered with an error")
+    parser.add_argument("--backend", type=str, default="openqa", choices=["openqa", "dashboard"])
+    args = parser.parse_args()
+
+    for dimension, values in DIMENSIONS.items():
+        print("{}:".format(dimension))
+        for value in values:
+            params = {name: dimension_values[0] for name, dimension_values in DIMENSIONS.items()}
+            params[dimension] = value
+            # the incident is only in the oldest aggregated updates build, so the whole window is searched
+            server = FakeServer(
+                groups=params["groups"],
+                versions=params["versions"],
+                aggregated_day=params["days"] - 1,
+                log_size=params["log_mib"] * 2**20,
+                latency=args.latency,
+                error_rate=args.error_rate,
+            )
+            with server:
+                exit_code, elapsed, first_line, peak_rss = _run(server, params["days"], args.backend)
+            print(
+                "  {:>6} {:>8.3f} s {:>7} s first line {:>6} requests {:>9.1f} MiB received {:>8.1f} MiB peak RSS"
+                "{}".format(
+                    value,
+                    elapsed,
+                    "-" if first_line is None else "{:.3f}".format(first_line),
+                    sum(server.requests.values()),
+                    sum(server.bytes_sent.values()) / 2**20,
+                    peak_rss / 2**20,
+                    "" if exit_code == 0 else " (exit code {})".format(exit_code),
+                )
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,19 +1,86 @@
 #!/usr/bin/python3
 
 import argparse
+import array
+import asyncio
+import atexit
+import codecs
+import gzip
+import hashlib
+import heapq
+import importlib.util
+import io
+import json
+import mmap
+import os
+import posixpath
 import re
+import shutil
+import sqlite3
+import sys
+import tarfile
+import tempfile
+import threading
+import time
+from collections import Counter, OrderedDict, deque
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import contextmanager, redirect_stdout
 from datetime import datetime, timedelta
 from functools import lru_cache
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from itertools import chain, count, islice, takewhile
 from sys import argv
-from typing import Callable, Dict, List, Optional, Set, Tuple, Union
+from typing import (
+    Any,
+    Awaitable,
+    BinaryIO,
+    Callable,
+    Deque,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Pattern,
+    Set,
+    Tuple,
+    Union,
+)
 from urllib.parse import urlparse
 
 import requests
+from urllib3.exceptions import ReadTimeoutError
+
+try:
+    import zstandard
+except ImportError:
+    # only needed for zstd compressed build checks logs
+    zstandard = None
+
+try:
+    import httpx
+except ImportError:
+    # only needed for the HTTP/2 transport (--http2)
+    httpx = None
+# h2 is the HTTP/2 support of httpx, only imported by httpx itself when making an HTTP/2 client
+if httpx is not None and importlib.util.find_spec("h2") is None:
+    httpx = None
+
+try:
+    import numpy
+except ImportError:
+    # only makes counting the jobs of the job summary (--summary) faster, the columns are counted in Python instead
+    numpy = None
 
 DEFAULT_DASHBOARD_URL = "http://dashboard.qam.suse.de"
 DEFAULT_OPENQA_URL = "https://openqa.suse.de"
 DEFAULT_QAM_URL = "https://qam.suse.de"
 
+DEFAULT_CACHE_DIR = os.path.join(os.environ.get("XDG_CACHE_HOME", os.path.expanduser("~/.cache")), "oqa-search")
+DEFAULT_HISTORY_DB = os.path.join(
+    os.environ.get("XDG_DATA_HOME", os.path.expanduser("~/.local/share")), "oqa-search", "history.sqlite3"
+)
+
 MICRO_TEMPLATE_IDENTIFIER = "sle-micro"
 
 EXCLUDED_GROUPS = ["DEV", "Leap", "Development", "Micro", "Kernel", "Wicked"]
@@ -26,12 +93,43 @@ AGGREGATED_NAME_MAP = {"Public Cloud": "cloud", "SAP/HA": "sap"}
 
 AGGREGATED_EXCLUDED_VERSIONS = ["TERADATA", "16.0"]
 
+AGGREGATED_BUILD_PATTERN = re.compile(r"^(\d{8})-\d+$")
+
 OQA_QUERY_STRINGS: Dict[str, str] = {
     "failed": "&result=failed&result=incomplete&result=timeout_exceeded",
     "running": "&state=scheduled&state=running",
     "all": "",
 }
 
+OQA_FINAL_STATES = ["done", "cancelled"]
+
+# the only job fields used from job listings (e.g. overview queries)
+OQA_JOB_FIELDS = ["id", "name", "state", "result"]
+
+# QAM dashboard job statuses counted as running/scheduled and as failed (like the OQA_QUERY_STRINGS queries)
+DASHBOARD_RUNNING_STATUSES = ["waiting", "scheduled", "running"]
+DASHBOARD_FAILED_STATUSES = ["failed"]
+
+BACKENDS = ["openqa", "dashboard"]
+
+# how many job IDs to ask for in every /api/v1/jobs request and how many of those requests to send concurrently
+OQA_JOBS_BATCH_SIZE = 50
+OQA_JOBS_WORKERS = 4
+
+# how many jobs to ask for in every page of a job listing and how many pages to prefetch concurrently
+OQA_PAGE_SIZE = 500
+OQA_PAGE_WORKERS = 4
+
+# how many requests are sent at once, the waiting ones go by priority (see _request_priority)
+FETCH_SLOTS = 8
+
+# request priorities (lower first) in the order their output is printed, the requests not given any are the most
+# urgent ones (e.g. job groups and incident settings)
+PRIORITY_URGENT = 0
+PRIORITY_SINGLE_INCIDENTS = 1
+PRIORITY_AGGREGATED_UPDATES = 2
+PRIORITY_BUILD_CHECKS = 3
+
 TESTSUITE_NUMBERS_PATTERN = re.compile(r"(?:^|\s|\()\d+(?=$|\s|\))")
 
 TESTSUITE_WORDS = [
@@ -74,21 +172,298 @@ TESTSUITE_WORDS_BLOCKLIST = [
     "group",
 ]
 
+# summary lines of the test frameworks known in the build checks logs (matched after the timestamp), more can be added
+TESTSUITE_SUMMARY_PATTERNS: Dict[str, Pattern] = {
+    "automake": re.compile(r"# (TOTAL|PASS|SKIP|XFAIL|FAIL|XPASS|ERROR):\s+\d+\s*$"),
+    "meson": re.compile(r"(Ok|Expected Fail|Fail|Unexpected Pass|Skipped|Timeout):\s+\d+\s*$"),
+    "pytest": re.compile(r"=+ .*\b\d+ (passed|failed|errors?|skipped|xfailed|xpassed|deselected)\b.* in [\d.]+s.* =+$"),
+    "regrtest": re.compile(r"(All )?\d+ tests? (OK|failed|skipped|omitted|altered the execution environment)\b"),
+    "rspec": re.compile(r"\d+ examples?, \d+ failures?\b"),
+    "ctest": re.compile(r"\d+% tests passed, \d+ tests? failed out of \d+"),
+    "tap": re.compile(r"(Files=\d+, Tests=\d+|Result: (PASS|FAIL|NOTESTS))\b"),
+    "cutest": re.compile(r"(OK \(\d+ tests?\)|Tests run: \d+.*Failures: \d+)"),
+}
+
+# test results lines (after the timestamp) telling that some tests failed, for the results history
+TESTSUITE_FAILURE_PATTERN = re.compile(
+    r"(^|# |, )(fail|failures|error|errors|timeout):\s*0*[1-9]|\b0*[1-9]\d* (tests? )?(failed|failures?|errors?)\b"
+    r"|Result: FAIL|Failures!!!",
+    re.IGNORECASE,
+)
+
+# the build checks are the %check section of the build log, the summaries are looked for after its start
+TESTSUITE_SECTION_START = "Executing(%check)"
+
+# lines without a summary line after which the summary of a test framework is considered over (some run twice)
+TESTSUITE_SUMMARY_MAX_GAP = 500
+
 LOGFILE_REGEX_PATTERN: str = "[A-Za-z-0-9]*[.]SUSE_SLE-[0-9]+[-SP0-9]*_Update[%3A-Za-z_-]*[.][a-z_0-9]+[.]log"
 
+# compressed build checks logs (and archives) in local mirrors of the QAM test reports
+GZIP_SUFFIXES = [".gz", ".tgz"]
+ZSTD_SUFFIXES = [".zst", ".tzst"]
+
+# size of the chunks big build checks logs are split in to scan them in several processes and how many of them to
+# queue for every process
+SCAN_CHUNK_SIZE = 8 * 1024 * 1024
+SCAN_QUEUED_PER_WORKER = 2
+
+RESPONSE_CHUNK_SIZE = 64 * 1024
+
+JSON_WHITESPACE_PATTERN = re.compile(r"[ \t\n\r]*")
+
+INCOMPLETE_TEXT = "TIMED OUT / INCOMPLETE"
+
+# tested issues of the aggregated updates builds (empty for no build) keyed by openQA URL, version, build and group
+AGGREGATED_BUILDS_CACHE = "aggregated_builds"
+# today's aggregated updates builds could still be scheduled, the past days ones are cached forever
+AGGREGATED_BUILDS_TODAY_TTL = 30 * 60
+
+# running and failed jobs of the finished builds, along with the digest of all their job IDs (see
+# _get_build_jobs_digest), keyed by openQA URL, version, build and group
+BUILD_RESULTS_CACHE = "build_results"
+
+# longest --days window, the aggregated updates builds older than that are never looked in again and are dropped from
+# the caches keyed by build when loading them
+AGGREGATED_MAX_DAYS = 30
+BUILD_CACHES = [AGGREGATED_BUILDS_CACHE, BUILD_RESULTS_CACHE]
+
+# fingerprints of the updates whose results were final in their last search (see _get_update_fingerprint) keyed by
+# update ID, along with the openQA builds found and the statuses of the results, to skip them while unchanged
+FINGERPRINTS_CACHE = "fingerprints"
+# the updates not searched for that long are searched again anyway
+FINGERPRINTS_TTL = 30 * 24 * 60 * 60
+# statuses of the results that don't change anymore unless the update does (see _record_gate)
+FINAL_STATUSES = ["passed", "failed", "no build"]
+
+# statuses of the openQA builds in the results history
+HISTORY_STATUSES = ["passed", "failed", "running", "no build"]
+HISTORY_SECTIONS = ["single", "aggregated"]
+
+# every search adds its results, only the last results of every update are queried (see query_history)
+HISTORY_SCHEMA = """
+CREATE TABLE IF NOT EXISTS openqa_results (
+    id INTEGER PRIMARY KEY,
+    update_id TEXT NOT NULL,
+    searched_at REAL NOT NULL,
+    url TEXT NOT NULL,
+    section TEXT NOT NULL,
+    group_name TEXT NOT NULL,
+    version TEXT NOT NULL,
+    group_id INTEGER,
+    build TEXT,
+    status TEXT NOT NULL,
+    running_jobs INTEGER NOT NULL,
+    failed_jobs INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS openqa_results_update ON openqa_results (update_id, url, section, group_name, version);
+CREATE INDEX IF NOT EXISTS openqa_results_searched_at ON openqa_results (searched_at);
+CREATE TABLE IF NOT EXISTS build_checks (
+    id INTEGER PRIMARY KEY,
+    update_id TEXT NOT NULL,
+    searched_at REAL NOT NULL,
+    log TEXT NOT NULL,
+    failed INTEGER NOT NULL,
+    results TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS build_checks_update ON build_checks (update_id, log);
+CREATE INDEX IF NOT EXISTS build_checks_searched_at ON build_checks (searched_at);
+"""
+
+# responses recorded by the prefetch command keyed by URL, the --offline runs are answered from them (see set_snapshot)
+SNAPSHOT_SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    url TEXT PRIMARY KEY,
+    body BLOB NOT NULL,
+    encoding TEXT
+);
+CREATE TABLE IF NOT EXISTS info (
+    name TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+# how long the caching proxy (see make_proxy_server) keeps the responses that may still change (e.g. job listings or the
+# dashboard) and the job groups, the immutable ones (finished jobs and logs) are kept until the cache is full
+PROXY_TTL = 60
+PROXY_JOB_GROUPS_TTL = 60 * 60
+DEFAULT_PROXY_PORT = 8080
+DEFAULT_PROXY_CACHE_SIZE = 1024
+
+HTTP2_MISSING_TEXT = "--http2 needs httpx with HTTP/2 support: pip install oqa-search[http2]"
+
+# environment variable with the file to write the CPU profile of the process to, for the library API (see set_profile)
+PROFILE_ENV_VAR = "OQA_SEARCH_PROFILE"
+# seconds between the stack samples of the profiler
+PROFILE_INTERVAL = 0.005
+# functions the profile samples are attributed to (the innermost one in their stack) and the phase they belong to
+PROFILE_PHASES = {
+    "_filter_openqa_groups": "group filtering",
+    "_iter_json_items": "JSON parsing",
+    # the whole responses decoded at once (e.g. job details and incident settings), what they're fetched with is below
+    "_get_json": "JSON parsing",
+    "_get": "fetching",
+    "_open": "fetching",
+    "_iter_body": "fetching",
+    "extract_test_results": "log scanning",
+    "extract_testsuite_summary": "log scanning",
+    "extract_test_results_from_lines": "log scanning",
+    "_scan_log_summary": "log scanning",
+    "_scan_log_file": "log scanning",
+    "_extract_log": "log scanning",
+}
+# functions shown in the profile summary
+PROFILE_TOP = 15
+
+# columns of the job tables (see _make_job_table) besides the job IDs, their values are coded as integers
+JOB_TABLE_COLUMNS = ["state", "result", "version", "group", "machine"]
 
-def _parser(args) -> argparse.Namespace:
-    parser = argparse.ArgumentParser(
-        formatter_class=argparse.ArgumentDefaultsHelpFormatter,
-        description="""For a given update, search inside the Single Incidents - Core Incidents and Aggregated updates
-        job groups for openQA builds related to the update.  It searches by default within the last 5 days in the
-        "Aggregated updates" section.""",
-    )
+# exit codes of the --gate mode, by priority: the first status found is the one returned (0 if none)
+GATE_EXIT_CODES = {"failed": 1, "running": 2, "no build": 3, "incomplete": 4}
+
+
+class DeadlineExceeded(Exception):
+    """The run deadline (--deadline) expired before a request could be completed"""
+
+
+class NotInSnapshot(DeadlineExceeded):
+    """A response needed by an --offline run isn't in its snapshot, what needed it is incomplete like past the deadline"""
+
+
+class GateFailed(Exception):
+    """A failed result was found in --gate mode, nothing else needs to be looked at"""
+
+
+# requests waiting to be sent by priority and arrival (see _request_slot) and how many more can be sent at once
+_fetch_queue: List[Tuple[Tuple[int, ...], int]] = []
+_fetch_slots = FETCH_SLOTS
+_fetch_condition = threading.Condition()
+_fetch_arrivals = count()
+
+# priority of the requests sent by every thread (see _request_priority)
+_fetch_priority = threading.local()
+
+# whether the requests are sent with the HTTP/2 transport (see _send_http2) and the hosts that didn't offer h2, their
+# requests are sent with the HTTP/1.1 sessions instead
+_http2 = False
+_http1_hosts: Set[str] = set()
+# event loop the HTTP/2 transport runs in, in a thread of its own: the HTTP/2 connections of httpx can't be shared by
+# threads, so the fetching threads hand their requests over to it (see _run_http2)
+_http2_loop: Optional[asyncio.AbstractEventLoop] = None
+
+# monotonic time at which all outstanding requests are given up, None for no deadline
+_deadline: Optional[float] = None
+
+# finished openQA jobs (with their module results) keyed by openQA URL and job ID, they don't change anymore
+_finished_jobs: Dict[Tuple[str, int], Dict] = {}
+
+# directory the caches are persisted in, None to not cache anything between searches
+_cache_dir: Optional[str] = None
+
+# cache keys of the builds whose cached results were checked to be still final (or were cached) in this run
+_rechecked_builds: Set[str] = set()
+
+# caches loaded from _cache_dir keyed by name, every entry holds its value and its expiry time (None for never)
+_caches: Dict[str, Dict[str, Dict[str, Any]]] = {}
+_caches_lock = threading.Lock()
+# names of the caches changed since they were last saved
+_changed_caches: Set[str] = set()
+
+# SQLite database the results of every search are added to, None to not keep them
+_history_db: Optional[str] = None
+
+# results of the update being searched keyed by history table, added to the database once it's done (see _save_history)
+_history_rows: Dict[str, List[Dict]] = {}
+
+# snapshot the responses are recorded to (prefetch) or answered from (--offline), None to only use the network
+_snapshot_path: Optional[str] = None
+_snapshot_offline = False
+# time the snapshot was taken at, the offline runs search back from it (see _now)
+_snapshot_taken_at: Optional[float] = None
+# responses recorded since the last save (see _save_snapshot) and the connection the offline runs read them from
+_snapshot_responses: Dict[str, Tuple[bytes, Optional[str]]] = {}
+_snapshot_connection: Optional[sqlite3.Connection] = None
+_snapshot_lock = threading.Lock()
+
+# responses cached by the proxy keyed by upstream URL, least recently used first: body, content type and expiry time
+# (None for never), their total size and the maximum one
+_proxy_cache: "OrderedDict[str, Tuple[bytes, Optional[str], Optional[float]]]" = OrderedDict()
+_proxy_cache_size = 0
+_proxy_cache_max_size = DEFAULT_PROXY_CACHE_SIZE * 2**20
+# responses being fetched from the upstreams keyed by URL, the clients asking for the same one wait for it
+_proxy_fetches: Dict[str, Future] = {}
+_proxy_lock = threading.Lock()
+
+# file the profile is written to, the CPU microseconds of every sampled stack (see _get_collapsed_stack) and the thread
+# sampling them, None when not profiling
+_profile_path: Optional[str] = None
+_profile_samples: Counter = Counter()
+_profile_stop = threading.Event()
+_profile_thread: Optional[threading.Thread] = None
+
+# running and failed jobs of the builds printed so far (see _make_job_table), None when not summarizing them (--summary)
+_job_table: Optional[Dict[str, array.array]] = None
+# integer codes of the values of every job table column, in coding order (so a code is the position of its value)
+_job_codes: Dict[str, Dict[Any, int]] = {column: {} for column in JOB_TABLE_COLUMNS}
+_job_table_lock = threading.Lock()
+
+# openQA builds printed for the update being searched (URL, version, build and group ID) and the statuses of its
+# results, to fingerprint it once done (--changed-only), None when not fingerprinting
+_update_builds: Optional[List[Tuple[str, str, str, int]]] = None
+_update_statuses: Set[str] = set()
+
+# whether the search stops at the first failed result (--gate) and the statuses of the results found so far
+_gate = False
+_gate_statuses: Set[str] = set()
+
+
+class _AppendUrl(argparse.Action):
+    """Add a URL to the ones of an option given once per URL, the first one given replaces the default ones"""
+
+    def __call__(self, parser, namespace, values, option_string=None):
+        urls = getattr(namespace, self.dest)
+        setattr(namespace, self.dest, [*([] if urls is self.default else urls), values])
+
+
+def _parser(args, prefetch: bool = False) -> argparse.Namespace:
+    if prefetch:
+        parser = argparse.ArgumentParser(
+            prog="{} prefetch".format(os.path.basename(argv[0])),
+            formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+            description="""Fetch everything the searches of the given updates need (job groups, incident settings,
+            job results, aggregated updates builds and build checks logs) into a snapshot file, without showing the
+            results. Search them later with the same options and --offline SNAPSHOT, without any network access.""",
+        )
+        parser.add_argument("--snapshot", type=str, required=True, help="Snapshot file to write, replaced if it exists")
+        # nothing is kept, so everything the searches need is fetched
+        parser.set_defaults(
+            no_cache=True, no_history=True, gate=False, offline=None, build_checks_dir=None, scan_workers=1
+        )
+    else:
+        parser = argparse.ArgumentParser(
+            formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+            description="""For a given update, search inside the Single Incidents - Core Incidents and Aggregated
+            updates job groups for openQA builds related to the update.  It searches by default within the last 5 days
+            in the "Aggregated updates" section.""",
+            epilog="""The results of every search are kept in the history database, run "%(prog)s query --help" to see
+            how to query them. Run "%(prog)s prefetch --help" to see how to search offline and "%(prog)s proxy --help"
+            to see how to share the fetched results with a team.""",
+        )
     parser.add_argument(
-        "update_id", type=str, help="Update ID, format SUSE:Maintenance:xxxxx:xxxxxx or S:M:xxxxx:xxxxxx"
+        "update_id",
+        type=str,
+        nargs="+",
+        help="Update IDs, format SUSE:Maintenance:xxxxx:xxxxxx or S:M:xxxxx:xxxxxx",
     )
     parser.add_argument("--url-dashboard-qam", type=_check_url, default=DEFAULT_DASHBOARD_URL, help="QAM dashboard URL")
-    parser.add_argument("--url-openqa", type=_check_url, default=DEFAULT_OPENQA_URL, help="OpenQA URL")
+    parser.add_argument(
+        "--url-openqa",
+        type=_check_url,
+        default=[DEFAULT_OPENQA_URL],
+        action=_AppendUrl,
+        help="OpenQA URL, repeat it for every instance to search (concurrently), their results are shown next to each "
+        "other",
+    )
     parser.add_argument("--url-qam", type=_check_url, default=DEFAULT_QAM_URL, help="QAM URL")
     parser.add_argument(
         "--no-aggregated", action="store_true", help="Don't search for jobs in the Aggregated Updates section"
@@ -97,17 +472,191 @@ def _parser(args) -> argparse.Namespace:
         "--days",
         type=int,
         default=5,
-        choices=range(1, 31),
+        choices=range(1, AGGREGATED_MAX_DAYS + 1),
         help="How many days to search back for in the Aggregated Updates section",
     )
+    # the valid aggregated groups are the ones in any of the openQA instances to search in
+    url_parser = argparse.ArgumentParser(add_help=False)
+    url_parser.add_argument("--url-openqa", type=_check_url, default=[DEFAULT_OPENQA_URL], action=_AppendUrl)
+    urls_openqa = url_parser.parse_known_args(args)[0].url_openqa
+    aggregated_groups = set()
+    for future in _run_concurrently(get_aggregated_groups, [(url,) for url in urls_openqa], len(urls_openqa)):
+        aggregated_groups.update(future.result())
+
     parser.add_argument(
         "--aggregated-groups",
         type=str,
         default=["core"],
-        choices=get_aggregated_groups().keys(),
+        choices=sorted(aggregated_groups),
         nargs="+",
         help="Job groups to look into inside the Aggregated Updates section",
     )
+    parser.add_argument(
+        "--deadline",
+        type=float,
+        default=None,
+        metavar="SECONDS",
+        help="Time budget for the whole run, anything not fetched by then is reported as incomplete",
+    )
+    parser.add_argument(
+        "--backend",
+        type=str,
+        default="openqa",
+        choices=BACKENDS,
+        help="Where to get the job results from, the QAM dashboard needs a single request for the whole update (openQA "
+        "is still queried for anything missing in the dashboard)",
+    )
+    parser.add_argument(
+        "--details",
+        action="store_true",
+        help="Show the failed test suites and modules of the failed openQA builds",
+    )
+    parser.add_argument(
+        "--http2",
+        action="store_true",
+        help="Multiplex all the concurrent requests to every server over a single HTTP/2 connection (HTTP/1.1 is used "
+        "with the servers not offering it), needs httpx with HTTP/2 support: pip install oqa-search[http2]",
+    )
+    parser.add_argument(
+        "--profile",
+        type=str,
+        default=None,
+        metavar="PATH",
+        help="Profile where the CPU time of the run goes (group filtering, JSON parsing, log scanning...), written to "
+        "PATH as collapsed stacks for flamegraph.pl or speedscope, with a summary of the top functions. Set {} to "
+        "profile the library API".format(PROFILE_ENV_VAR),
+    )
+    if prefetch:
+        return parser.parse_args(args)
+
+    parser.add_argument(
+        "--cache-dir",
+        type=str,
+        default=DEFAULT_CACHE_DIR,
+        help="Where to keep the openQA results that don't change anymore between runs",
+    )
+    parser.add_argument("--no-cache", action="store_true", help="Don't use or update the cached openQA results")
+    parser.add_argument(
+        "--offline",
+        type=_check_path,
+        default=None,
+        metavar="SNAPSHOT",
+        help="Search in a snapshot written by the prefetch command instead of the network, as of when it was written "
+        "(without the cache)",
+    )
+    parser.add_argument(
+        "--build-checks-dir",
+        type=_check_path,
+        default=None,
+        help="Local mirror of the QAM test reports (a directory or a tar archive) to read the build checks logs from "
+        "instead of the QAM URL, the logs can be gzip or zstd compressed",
+    )
+    parser.add_argument(
+        "--scan-workers",
+        type=int,
+        default=1,
+        metavar="N",
+        help="Processes to scan the local build checks logs (--build-checks-dir) in, 0 for one per CPU",
+    )
+    parser.add_argument(
+        "--history-db",
+        type=str,
+        default=DEFAULT_HISTORY_DB,
+        help="SQLite database the results of every search are added to (see the query command)",
+    )
+    parser.add_argument("--no-history", action="store_true", help="Don't add the results to the history database")
+    parser.add_argument(
+        "--gate",
+        action="store_true",
+        help="Stop at the first failed result and exit with a status telling the result: {}".format(
+            ", ".join("{} {}".format(code, status) for status, code in GATE_EXIT_CODES.items())
+        ),
+    )
+    parser.add_argument(
+        "--changed-only",
+        action="store_true",
+        help="Skip the updates whose incident settings, openQA jobs, aggregated updates builds and build checks logs "
+        "didn't change since their last search with final results (nothing running or incomplete), kept in the cache",
+    )
+    parser.add_argument(
+        "--summary",
+        action="store_true",
+        help="Print how many running and failed jobs all the builds found have per state, result, version, group and "
+        "machine at the end",
+    )
+
+    args = parser.parse_args(args)
+    if args.changed_only and (args.no_cache or args.offline or args.build_checks_dir):
+        parser.error("--changed-only needs the cache and the build checks logs of the QAM URL")
+
+    return args
+
+
+def _proxy_parser(args) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        prog="{} proxy".format(os.path.basename(argv[0])),
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+        description="""Run a caching HTTP proxy for the openQA, QAM dashboard and QAM servers, to be shared by a team.
+        Every server is under its network location, e.g. search with --url-openqa http://HOST:PORT/openqa.suse.de.
+        Finished jobs, build checks logs and past aggregated updates builds are kept until the cache is full, the rest
+        of the responses (e.g. running builds) for a minute.""",
+    )
+    parser.add_argument("--url-dashboard-qam", type=_check_url, default=DEFAULT_DASHBOARD_URL, help="QAM dashboard URL")
+    parser.add_argument(
+        "--url-openqa",
+        type=_check_url,
+        default=[DEFAULT_OPENQA_URL],
+        action=_AppendUrl,
+        help="OpenQA URL to proxy, repeat it for every instance",
+    )
+    parser.add_argument("--url-qam", type=_check_url, default=DEFAULT_QAM_URL, help="QAM URL")
+    parser.add_argument("--bind", type=str, default="127.0.0.1", help="Address to listen at, 0.0.0.0 for all")
+    parser.add_argument("--port", type=int, default=DEFAULT_PROXY_PORT, help="Port to listen at")
+    parser.add_argument(
+        "--cache-size",
+        type=int,
+        default=DEFAULT_PROXY_CACHE_SIZE,
+        metavar="MIB",
+        help="Maximum size of the cached responses, the least recently used ones are dropped first",
+    )
+    parser.add_argument(
+        "--http2",
+        action="store_true",
+        help="Fetch from the servers with the HTTP/2 transport (see the search --http2), the clients use HTTP/1.1",
+    )
+    args = parser.parse_args(args)
+    if args.http2 and httpx is None:
+        parser.error(HTTP2_MISSING_TEXT)
+
+    return args
+
+
+def _query_parser(args) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        prog="{} query".format(os.path.basename(argv[0])),
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+        description="""Query the results history kept by the searches, without querying openQA or QAM. Only the last
+        results of every update are shown, newest updates first.""",
+    )
+    parser.add_argument("--history-db", type=str, default=DEFAULT_HISTORY_DB, help="SQLite database to query")
+    parser.add_argument(
+        "--build-checks", action="store_true", help="Query the build checks results instead of the openQA ones"
+    )
+    parser.add_argument(
+        "--update-id", type=str, nargs="+", default=None, help="Update IDs, format SUSE:Maintenance:xxxxx:xxxxxx"
+    )
+    parser.add_argument("--version", type=str, nargs="+", default=None, help="SLE versions")
+    parser.add_argument("--section", type=str, default=None, choices=HISTORY_SECTIONS, help="OpenQA results section")
+    parser.add_argument("--group", type=str, default=None, help="Job group, e.g. core")
+    parser.add_argument(
+        "--status",
+        type=str,
+        default=None,
+        choices=HISTORY_STATUSES,
+        help="Build status, the build checks are either passed or failed",
+    )
+    parser.add_argument("--since", type=float, default=None, metavar="DAYS", help="Only the results of the last days")
+    parser.add_argument("--last", type=int, default=None, metavar="N", help="Only the last N updates searched for")
 
     return parser.parse_args(args)
 
@@ -149,6 +698,16 @@ def print_title(text: str) -> None:
     print("\033[01;36m{}\033[0m".format(text))
 
 
+def print_incomplete(prefix: Optional[str] = None) -> None:
+    """
+    Print the timed out / incomplete marker for a result that couldn't be fetched before the deadline
+
+    :param prefix: optional text (e.g. a version) to print before the marker
+    """
+    print_warn("{} -> {}".format(prefix, INCOMPLETE_TEXT) if prefix else INCOMPLETE_TEXT)
+    _record_gate("incomplete")
+
+
 # BASIC HELPERS
 def _check_url(url: str) -> str:
     try:
@@ -159,17 +718,490 @@ def _check_url(url: str) -> str:
         raise argparse.ArgumentError("Not a valid URL")
 
 
-def _get_json(url: str) -> List[Dict]:
+def _check_path(path: str) -> str:
+    if not os.path.exists(path):
+        raise argparse.ArgumentTypeError("No such file or directory: {}".format(path))
+    return path
+
+
+def _as_list(value: Union[str, List[str]]) -> List[str]:
+    """
+    Get a list of values from either a single value or a list of them
+
+    :param value: single value or list of values
+    :return: list of values
+    """
+    return [value] if isinstance(value, str) else list(value)
+
+
+def _run_concurrently(func: Callable, args_list: List[Tuple], workers: int) -> List[Future]:
+    """
+    Call a function with every set of arguments in a pool of threads
+
+    :param func: function to call
+    :param args_list: list of positional arguments for each call
+    :param workers: maximum number of concurrent calls
+    :return: futures for each call in the same order as args_list
+    """
+    executor = ThreadPoolExecutor(max_workers=max(workers, 1))
+    # the calls send their requests with the priority of the caller
+    priority = _get_request_priority()
+    futures = [executor.submit(_call_with_priority, priority, func, *args) for args in args_list]
+    # don't wait here, the futures are waited for by the caller
+    executor.shutdown(wait=False)
+
+    return futures
+
+
+def _get_request_priority() -> Tuple[int, ...]:
+    """
+    Get the priority of the requests sent by this thread
+
+    :return: priority, see _request_priority
+    """
+    return getattr(_fetch_priority, "value", (PRIORITY_URGENT,))
+
+
+@contextmanager
+def _request_priority(*priority: int) -> Iterator[None]:
+    """
+    Set the priority of the requests sent by this thread (and the calls it runs concurrently, see _run_concurrently)
+
+    :param priority: section priority (e.g. PRIORITY_SINGLE_INCIDENTS) followed by the position of the output within
+        the section, lower first
+    """
+    previous = _get_request_priority()
+    _fetch_priority.value = priority
+    try:
+        yield
+    finally:
+        _fetch_priority.value = previous
+
+
+def _call_with_priority(priority: Tuple[int, ...], func: Callable, *args: Any) -> Any:
+    """
+    Call a function sending its requests with a given priority
+
+    :param priority: request priority, see _request_priority
+    :param func: function to call
+    :param args: positional arguments
+    :return: function result
+    """
+    with _request_priority(*priority):
+        return func(*args)
+
+
+@contextmanager
+def _request_slot() -> Iterator[None]:
+    """
+    Wait until a request can be sent, only FETCH_SLOTS are sent at once and the waiting ones go by priority (see
+    _request_priority), in arrival order for the same priority
+
+    :raises DeadlineExceeded: if the run deadline expires while waiting
+    """
+    global _fetch_slots
+    entry = (_get_request_priority(), next(_fetch_arrivals))
+    with _fetch_condition:
+        heapq.heappush(_fetch_queue, entry)
+        try:
+            while _fetch_slots == 0 or _fetch_queue[0] != entry:
+                _fetch_condition.wait(_time_left())
+        except DeadlineExceeded:
+            _fetch_queue.remove(entry)
+            heapq.heapify(_fetch_queue)
+            _fetch_condition.notify_all()
+            raise
+        heapq.heappop(_fetch_queue)
+        _fetch_slots -= 1
+        # the next request in the queue may be sent as well
+        _fetch_condition.notify_all()
+    try:
+        yield
+    finally:
+        with _fetch_condition:
+            _fetch_slots += 1
+            _fetch_condition.notify_all()
+
+
+def _get_results_future(value: Any) -> Future:
+    """
+    Wrap an already known value as a finished future
+
+    :param value: value to wrap
+    :return: future with the value as its result
+    """
+    future: Future = Future()
+    future.set_result(value)
+
+    return future
+
+
+def set_deadline(seconds: Optional[float]) -> None:
+    """
+    Set the time budget for all the requests made from now on
+
+    :param seconds: time budget in seconds, None to remove the deadline
+    """
+    global _deadline
+    _deadline = None if seconds is None else time.monotonic() + seconds
+    # the requests waiting to be sent check the new deadline
+    with _fetch_condition:
+        _fetch_condition.notify_all()
+
+
+def _time_left() -> Optional[float]:
+    """
+    Get the time left until the deadline expires
+
+    :return: seconds left or None if there's no deadline
+    :raises DeadlineExceeded: if the deadline already expired
+    """
+    if _deadline is None:
+        return None
+
+    left = _deadline - time.monotonic()
+    if left <= 0:
+        raise DeadlineExceeded("Run deadline expired")
+
+    return left
+
+
+@lru_cache(maxsize=None)
+def _get_session(host: str) -> requests.Session:
+    """
+    Get the session (and its connection pool) used for all the requests to a host
+
+    :param host: scheme and network location of the host
+    :return: session for the host
+    """
+    return requests.Session()
+
+
+def set_http2(enabled: bool) -> None:
+    """
+    Set whether the requests are sent with the HTTP/2 transport, which multiplexes all the concurrent requests to a
+    host over a single connection
+
+    :param enabled: use the HTTP/2 transport, it needs httpx with HTTP/2 support (pip install oqa-search[http2])
+    """
+    global _http2, _http2_loop
+    if enabled and httpx is None:
+        raise ValueError("The httpx and h2 packages are needed for the HTTP/2 transport")
+    _http2 = enabled
+    _http1_hosts.clear()
+    if enabled and _http2_loop is None:
+        _http2_loop = asyncio.new_event_loop()
+        threading.Thread(target=_http2_loop.run_forever, name="oqa-search-http2", daemon=True).start()
+
+
+def _run_http2(coroutine: Awaitable) -> Any:
+    """
+    Run a step of an HTTP/2 request in the event loop of the HTTP/2 transport and wait for it
+
+    :param coroutine: request step (e.g. sending it or reading the next body chunk)
+    :return: its result
+    """
+    return asyncio.run_coroutine_threadsafe(coroutine, _http2_loop).result()
+
+
+@lru_cache(maxsize=None)
+def _get_http2_client(host: str) -> "httpx.AsyncClient":
+    """
+    Get the HTTP/2 client (and its connection) used for all the requests to a host, only in the HTTP/2 event loop
+
+    :param host: scheme and network location of the host
+    :return: client for the host
+    """
+    # the timeouts are the run deadline (see _send_http2) and the redirects are followed like requests does
+    return httpx.AsyncClient(http2=True, timeout=None, follow_redirects=True)
+
+
+@contextmanager
+def _as_requests_errors() -> Iterator[None]:
+    """
+    Raise the errors of the HTTP/2 transport as the requests ones, the callers only know about those
+    """
+    try:
+        yield
+    except httpx.TimeoutException as e:
+        raise requests.Timeout(str(e)) from e
+    except httpx.TransportError as e:
+        raise requests.ConnectionError(str(e)) from e
+
+
+class _HTTP2Body(io.RawIOBase):
+    """Body of a response of the HTTP/2 transport, read in the chunks it arrives in (see _send_http2)"""
+
+    def __init__(self, response: "httpx.Response"):
+        super().__init__()
+        self._response = response
+        self._chunks = response.aiter_bytes()
+        self._chunk = b""
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        with _as_requests_errors():
+            while not self._chunk:
+                try:
+                    self._chunk = _run_http2(self._chunks.__anext__())
+                except StopAsyncIteration:
+                    return 0
+        size = min(len(buffer), len(self._chunk))
+        buffer[:size] = self._chunk[:size]
+        self._chunk = self._chunk[size:]
+        return size
+
+    def close(self) -> None:
+        if not self.closed:
+            _run_http2(self._response.aclose())
+        super().close()
+
+
+async def _send_http2_request(
+    url: str, host: str, timeout: Optional[float], headers: Optional[Dict[str, str]] = None
+) -> "httpx.Response":
+    """
+    Send a request for a given url in the HTTP/2 event loop (see _run_http2)
+
+    :param url: url to fetch
+    :param host: scheme and network location of the host
+    :param timeout: seconds to wait for every read, None to wait forever
+    :param headers: additional request headers
+    :return: response with its body still unread
+    """
+    client = _get_http2_client(host)
+
+    return await client.send(client.build_request("GET", url, headers=headers, timeout=timeout), stream=True)
+
+
+def _send_http2(
+    url: str, host: str, timeout: Optional[float], headers: Optional[Dict[str, str]] = None
+) -> requests.Response:
+    """
+    Send a request for a given url with the HTTP/2 transport, its response is read like the ones of requests. If the
+    host doesn't offer h2 the request is sent with HTTP/1.1, and the next ones with the HTTP/1.1 session (see _open)
+
+    :param url: url to fetch
+    :param host: scheme and network location of the host
+    :param timeout: seconds to wait for every read, None to wait forever
+    :param headers: additional request headers
+    :return: response to read the body from (see _iter_body), its connection is freed when it's closed
+    """
+    with _as_requests_errors():
+        http2_response = _run_http2(_send_http2_request(url, host, timeout, headers))
+    if http2_response.http_version != "HTTP/2":
+        _http1_hosts.add(host)
+
+    response = requests.Response()
+    response.url = url
+    response.status_code = http2_response.status_code
+    response.reason = http2_response.reason_phrase
+    response.headers = requests.structures.CaseInsensitiveDict(http2_response.headers)
+    response.encoding = http2_response.charset_encoding
+    response.raw = _HTTP2Body(http2_response)
+
+    return response
+
+
+@contextmanager
+def _open(url: str, headers: Optional[Dict[str, str]] = None) -> Iterator[requests.Response]:
+    """
+    Send a request for a given url without reading its body yet, giving up on it once the run deadline expires
+
+    :param url: url to fetch
+    :param headers: additional request headers (not sent to the --offline snapshot)
+    :return: response to read the body from (see _iter_body)
+    """
+    if _snapshot_offline:
+        yield _get_snapshot_response(url)
+        return
+
+    parsed_url = urlparse(url)
+    host = "{}://{}".format(parsed_url.scheme, parsed_url.netloc)
+    try:
+        # the slot is only taken until the response starts, the body is read at the pace of the caller
+        with _request_slot():
+            # h2 is only offered over https
+            if _http2 and parsed_url.scheme == "https" and host not in _http1_hosts:
+                started_response = _send_http2(url, host, _time_left(), headers)
+            else:
+                started_response = _get_session(host).get(url, headers=headers, timeout=_time_left(), stream=True)
+        with started_response as response:
+            response.raise_for_status()
+            if _snapshot_path is not None:
+                response = _record_snapshot_response(url, response)
+            yield response
+    except requests.Timeout as e:
+        raise DeadlineExceeded("Run deadline expired while fetching {}".format(url)) from e
+    except requests.RequestException as e:
+        # the read timeout of a body stalled past the deadline is raised as a connection error by iter_content, and
+        # any other error once the deadline expired is given up on the same way
+        if isinstance(e.args[0] if e.args else None, ReadTimeoutError) or (
+            _deadline is not None and time.monotonic() >= _deadline
+        ):
+            raise DeadlineExceeded("Run deadline expired while fetching {}".format(url)) from e
+        raise
+
+
+def _iter_body(response: requests.Response) -> Iterator[bytes]:
+    """
+    Read the body of a response in chunks as they arrive
+
+    :param response: response opened with _open
+    :return: body chunks
+    """
+    for chunk in response.iter_content(RESPONSE_CHUNK_SIZE):
+        # a slow body can't extend the run past the deadline either
+        _time_left()
+        yield chunk
+
+
+def _get(url: str) -> Tuple[bytes, Optional[str]]:
+    """
+    Fetch the body of a given url, giving up on it once the run deadline expires
+
+    :param url: url to fetch
+    :return: response body and its encoding (if the server sent one)
+    """
+    with _open(url) as response:
+        return b"".join(_iter_body(response)), response.encoding
+
+
+def _iter_json_items(chunks: Iterable[bytes]) -> Iterator[Any]:
+    """
+    Decode the items of a JSON list as its bytes arrive, only one item is kept in memory at a time
+
+    :param chunks: chunks of the JSON document
+    :return: decoded items
+    """
+    decoder = json.JSONDecoder()
+    text_decoder = codecs.getincrementaldecoder("utf-8")()
+    buffer, pos, started = "", 0, False
+
+    # a final None marks the end of the document
+    for chunk in chain(chunks, [None]):
+        final = chunk is None
+        buffer = buffer[pos:] + text_decoder.decode(chunk or b"", final=final)
+        pos = 0
+        while True:
+            pos = JSON_WHITESPACE_PATTERN.match(buffer, pos).end()
+            if pos == len(buffer):
+                break
+            if not started:
+                if buffer[pos] != "[":
+                    raise json.JSONDecodeError("Expecting a JSON list", buffer, pos)
+                started, pos = True, pos + 1
+            elif buffer[pos] == "]":
+                return
+            elif buffer[pos] == ",":
+                pos += 1
+            else:
+                try:
+                    item, end = decoder.raw_decode(buffer, pos)
+                except json.JSONDecodeError:
+                    # the item isn't complete yet
+                    break
+                next_pos = JSON_WHITESPACE_PATTERN.match(buffer, end).end()
+                if next_pos == len(buffer) or buffer[next_pos] not in ",]":
+                    # numbers could go on in the next chunk (e.g. 1 of 1.5), wait for the next item or the list end
+                    break
+                yield item
+                pos = next_pos
+
+    raise json.JSONDecodeError("Truncated or invalid JSON list", buffer, pos)
+
+
+def _get_json(url: str, item_reducer: Optional[Callable[[Dict], Dict]] = None) -> List[Dict]:
     """
     Fetch json data from a given url
 
     :param url: url to fetch json from
+    :param item_reducer: for JSON lists, function to keep only the needed parts of every item, the items are then
+        decoded and reduced as they arrive instead of decoding the whole response at once
     :return: json data
     """
-    response = requests.get(url)
-    response.raise_for_status()
+    if item_reducer is None:
+        body, _ = _get(url)
+        return json.loads(body)
+
+    with _open(url) as response:
+        return [item_reducer(item) for item in _iter_json_items(_iter_body(response))]
+
+
+def _get_page_url(url: str, page_size: int, offset: int) -> str:
+    """
+    Get the url of a page of a paginated listing
+
+    :param url: listing url
+    :param page_size: items in every page
+    :param offset: items before the page
+    :return: page url
+    """
+    return "{}{}limit={}&offset={}".format(url, "&" if "?" in url else "?", page_size, offset)
+
+
+def _iter_json_pages(
+    url: str, item_reducer: Optional[Callable[[Dict], Dict]] = None, page_size: int = OQA_PAGE_SIZE
+) -> Iterator[Dict]:
+    """
+    Fetch the items of a paginated JSON listing page by page, the next page is only fetched once all the items before
+    it are consumed, so callers can stop as soon as they have their answer
+
+    :param url: listing url
+    :param item_reducer: function to keep only the needed parts of every item (see _get_json)
+    :param page_size: items in every page
+    :return: iterator of the listing items, the first page is already fetched
+    """
+    first_page = _get_json(_get_page_url(url, page_size, 0), item_reducer)
+
+    def next_pages() -> Iterator[Dict]:
+        page, offset = first_page, 0
+        # a shorter page is the last one and a longer one means the server sent everything at once
+        while len(page) == page_size:
+            offset += page_size
+            next_page = _get_json(_get_page_url(url, page_size, offset), item_reducer)
+            if next_page == page:
+                # the server sent everything at once, and everything was exactly a page
+                return
+            page = next_page
+            yield from page
+
+    return chain(first_page, next_pages())
+
+
+def _get_json_pages(
+    url: str,
+    item_reducer: Optional[Callable[[Dict], Dict]] = None,
+    page_size: int = OQA_PAGE_SIZE,
+    workers: int = OQA_PAGE_WORKERS,
+) -> List[Dict]:
+    """
+    Fetch all the items of a paginated JSON listing, prefetching the pages after the first one concurrently
 
-    return response.json()
+    :param url: listing url
+    :param item_reducer: function to keep only the needed parts of every item (see _get_json)
+    :param page_size: items in every page
+    :param workers: pages to fetch concurrently
+    :return: listing items
+    """
+    pages = [_get_json(_get_page_url(url, page_size, 0), item_reducer)]
+    # a shorter page is the last one, a longer one (or the same one again) means the server sent everything at once
+    listing_over = len(pages[-1]) != page_size
+    while not listing_over:
+        offset = len(pages) * page_size
+        args_list = [(_get_page_url(url, page_size, offset + n * page_size), item_reducer) for n in range(workers)]
+        for future in _run_concurrently(_get_json, args_list, workers):
+            page = future.result()
+            listing_over = len(page) != page_size or page == pages[-1]
+            if page != pages[-1]:
+                pages.append(page)
+            if listing_over:
+                # the pages after this one are empty (or the same again)
+                break
+
+    return [item for page in pages for item in page]
 
 
 def _get_log_text(url: str) -> str:
@@ -179,10 +1211,9 @@ def _get_log_text(url: str) -> str:
     :param url: url to fetch log text from
     :return: log text
     """
-    response = requests.get(url)
-    response.raise_for_status()
+    body, encoding = _get(url)
 
-    return response.text
+    return body.decode(encoding or "utf-8", errors="replace")
 
 
 def _parse_update_id(update_id: str) -> Tuple[str, Union[int, str], int]:
@@ -252,307 +1283,2398 @@ def _get_effective_incident_id(incident_id: Union[int, str], request_id: int) ->
     return incident_id if isinstance(incident_id, int) else request_id
 
 
-# OPENQA JOB GROUPS MANAGEMENT FUNCTIONS
-@lru_cache(maxsize=None)  # cache the result
-def _fetch_openqa_groups() -> List[Dict]:
+# CACHE FUNCTIONS
+def set_cache_dir(path: Optional[str]) -> None:
     """
-    Helper to fetch and cache oQA job groups
+    Set the directory the caches are loaded from and saved to
 
-    :param match_text: text to match in the group name
-    :param exclude_list: list of words to exclude from the group name
+    :param path: cache directory, None to not cache anything
+    """
+    global _cache_dir
+    with _caches_lock:
+        _cache_dir = path
+        _caches.clear()
+        _changed_caches.clear()
+        _rechecked_builds.clear()
+
+
+def _get_cache(name: str) -> Optional[Dict[str, Dict[str, Any]]]:
+    """
+    Get a cache, loading it from the cache directory when first needed
+
+    :param name: cache name
+    :return: cache entries, None if caching is disabled
+    """
+    if _cache_dir is None:
+        return None
+
+    with _caches_lock:
+        if name not in _caches:
+            try:
+                with open(os.path.join(_cache_dir, name + ".json"), "r") as f:
+                    entries = json.load(f)
+            except (OSError, ValueError):
+                # not saved yet or unreadable, start over
+                entries = {}
+            now = time.time()
+            _caches[name] = {
+                key: entry for key, entry in entries.items() if entry["expires"] is None or entry["expires"] > now
+            }
+            if name in BUILD_CACHES:
+                oldest_date = (_now() - timedelta(AGGREGATED_MAX_DAYS)).strftime("%Y%m%d")
+                for key in list(_caches[name]):
+                    # the build is the third part of the key (see _get_build_cache_key)
+                    build_date = _get_aggregated_build_date(key.split(" ")[2])
+                    if build_date is not None and build_date < oldest_date:
+                        del _caches[name][key]
+            if len(_caches[name]) < len(entries):
+                _changed_caches.add(name)
+
+        return _caches[name]
+
+
+def _cache_get(name: str, key: str) -> Optional[Any]:
+    """
+    Get a cached value if it hasn't expired yet
+
+    :param name: cache name
+    :param key: entry key
+    :return: cached value, None if not cached
+    """
+    entry = (_get_cache(name) or {}).get(key)
+    if entry is None or (entry["expires"] is not None and entry["expires"] <= time.time()):
+        return None
+
+    return entry["value"]
+
+
+def _cache_set(name: str, key: str, value: Any, ttl: Optional[float] = None) -> None:
+    """
+    Cache a value, it's only persisted once the caches are saved (see _save_caches)
+
+    :param name: cache name
+    :param key: entry key
+    :param value: JSON serializable value
+    :param ttl: seconds the value is valid for, None for ever
+    """
+    cache = _get_cache(name)
+    if cache is not None:
+        # the background searches can still be setting values while the caches are saved
+        with _caches_lock:
+            cache[key] = {"value": value, "expires": None if ttl is None else time.time() + ttl}
+            _changed_caches.add(name)
+
+
+def _cache_delete(name: str, key: str) -> None:
+    """
+    Forget a cached value, it's only persisted once the caches are saved (see _save_caches)
+
+    :param name: cache name
+    :param key: entry key
+    """
+    cache = _get_cache(name)
+    if cache is not None:
+        with _caches_lock:
+            if cache.pop(key, None) is not None:
+                _changed_caches.add(name)
+
+
+def _save_caches() -> None:
+    """
+    Save the caches changed since they were last saved in the cache directory
+    """
+    with _caches_lock:
+        if _cache_dir is None or not _changed_caches:
+            return
+
+        try:
+            os.makedirs(_cache_dir, exist_ok=True)
+            for name in sorted(_changed_caches):
+                # write it whole first, so an interrupted save doesn't corrupt the cache
+                path = os.path.join(_cache_dir, name + ".json")
+                with open(path + ".tmp", "w") as f:
+                    json.dump(_caches[name], f)
+                os.replace(path + ".tmp", path)
+                _changed_caches.discard(name)
+        except OSError as e:
+            print_warn("Could not save the cache in {}: {}".format(_cache_dir, e))
+
+
+# HISTORY FUNCTIONS
+def set_history_db(path: Optional[str]) -> None:
+    """
+    Set the SQLite database the results of every search are added to
+
+    :param path: database path, None to not keep the results
+    """
+    global _history_db
+    _history_db = path
+    _history_rows.clear()
+
+
+def _connect_history(path: str) -> sqlite3.Connection:
+    """
+    Open the results history database, creating it if needed
+
+    :param path: database path
+    :return: database connection
+    """
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    connection = sqlite3.connect(path, timeout=10)
+    connection.executescript(HISTORY_SCHEMA)
+
+    return connection
+
+
+def _record_history(table: str, **row: Any) -> None:
+    """
+    Keep a result of the update being searched, it's only added to the database once the update is done (see
+    _save_history)
+
+    :param table: history table
+    :param row: column values (but the update ID and search time)
+    """
+    if _history_db is not None:
+        _history_rows.setdefault(table, []).append(row)
+
+
+def _save_history(update_id: str) -> None:
+    """
+    Add the results kept of an update to the history database
+
+    :param update_id: update ID, as SUSE:<product>:<incident>:<request>
+    """
+    rows = dict(_history_rows)
+    _history_rows.clear()
+    if _history_db is None or not rows:
+        return
+
+    searched_at = time.time()
+    try:
+        connection = _connect_history(_history_db)
+        with connection:
+            for table, table_rows in rows.items():
+                columns = ["update_id", "searched_at"] + list(table_rows[0])
+                connection.executemany(
+                    "INSERT INTO {} ({}) VALUES ({})".format(table, ", ".join(columns), ", ".join("?" * len(columns))),
+                    [[update_id, searched_at] + list(row.values()) for row in table_rows],
+                )
+        connection.close()
+    except (OSError, sqlite3.Error) as e:
+        print_warn("Could not save the results history in {}: {}".format(_history_db, e))
+
+
+def query_history(
+    path: str,
+    build_checks: bool = False,
+    update_ids: Optional[List[str]] = None,
+    versions: Optional[List[str]] = None,
+    section: Optional[str] = None,
+    group: Optional[str] = None,
+    status: Optional[str] = None,
+    since: Optional[float] = None,
+    last: Optional[int] = None,
+) -> List[sqlite3.Row]:
+    """
+    Get the last results of the updates in the history database, newest updates first
+
+    :param path: database path
+    :param build_checks: get the build checks results instead of the openQA ones
+    :param update_ids: only these updates
+    :param versions: only these versions (openQA results)
+    :param section: only this section, single or aggregated (openQA results)
+    :param group: only this job group, e.g. core (openQA results)
+    :param status: only this status, see HISTORY_STATUSES (the build checks are either passed or failed)
+    :param since: only results searched for after this time
+    :param last: only the last updates searched for
+    :return: results rows, with the columns of the table
+    """
+    table = "build_checks" if build_checks else "openqa_results"
+    key = "update_id, log" if build_checks else "update_id, url, section, group_name, version"
+    conditions = ["id IN (SELECT MAX(id) FROM {} GROUP BY {})".format(table, key)]
+    params: List[Any] = []
+    if update_ids:
+        conditions.append("update_id IN ({})".format(", ".join("?" * len(update_ids))))
+        params.extend(update_ids)
+    if versions and not build_checks:
+        conditions.append("version IN ({})".format(", ".join("?" * len(versions))))
+        params.extend(versions)
+    if section and not build_checks:
+        conditions.append("section = ?")
+        params.append(section)
+    if group and not build_checks:
+        conditions.append("group_name = ?")
+        params.append(group)
+    if status and build_checks:
+        conditions.append("failed = ?")
+        params.append(int(status == "failed"))
+    elif status:
+        conditions.append("status = ?")
+        params.append(status)
+    if since is not None:
+        conditions.append("searched_at >= ?")
+        params.append(since)
+
+    query = """
+        WITH matching AS (SELECT * FROM {} WHERE {})
+        SELECT * FROM matching WHERE update_id IN (
+            SELECT update_id FROM matching GROUP BY update_id ORDER BY MAX(searched_at) DESC LIMIT ?
+        )
+        ORDER BY searched_at DESC, id
+    """.format(table, " AND ".join(conditions))
+    params.append(-1 if last is None else last)
+
+    connection = _connect_history(path)
+    connection.row_factory = sqlite3.Row
+    try:
+        return connection.execute(query, params).fetchall()
+    finally:
+        connection.close()
+
+
+def print_history(args: argparse.Namespace) -> None:
+    """
+    Print the results in the history database matching the query command line arguments
+
+    :param args: parsed query command line arguments
+    """
+    since = None if args.since is None else time.time() - args.since * 24 * 60 * 60
+    try:
+        rows = query_history(
+            args.history_db,
+            args.build_checks,
+            args.update_id,
+            args.version,
+            args.section,
+            args.group,
+            args.status,
+            since,
+            args.last,
+        )
+    except (OSError, sqlite3.Error) as e:
+        print_warn("Could not read the results history in {}: {}".format(args.history_db, e))
+        return
+
+    for row in rows:
+        searched_at = datetime.fromtimestamp(row["searched_at"]).strftime("%Y-%m-%d %H:%M")
+        if args.build_checks:
+            text = "{} {} {}".format(searched_at, row["update_id"], row["log"])
+            if row["failed"]:
+                print_ko(text)
+            else:
+                print_ok(text)
+            print(row["results"], "\n")
+            continue
+
+        text = "{} {} {} - {} {} {} {}".format(
+            searched_at,
+            row["update_id"],
+            row["section"],
+            row["group_name"],
+            row["version"],
+            row["build"] or "-",
+            row["status"].upper(),
+        )
+        if row["status"] == "failed":
+            print_ko("{} ({} jobs)".format(text, row["failed_jobs"]))
+        elif row["status"] == "running":
+            print_warn("{} ({} jobs)".format(text, row["running_jobs"]))
+        elif row["status"] == "passed":
+            print_ok(text)
+        else:
+            print_warn(text)
+    if not rows:
+        print("No results in the history for this query")
+
+
+# SNAPSHOT FUNCTIONS
+def set_snapshot(path: Optional[str], offline: bool = False) -> None:
+    """
+    Set the snapshot the responses are recorded to (see prefetch) or, offline, answered from instead of the network
+
+    :param path: snapshot path, a new snapshot replaces any previous one there, None to only use the network
+    :param offline: answer all the requests from the snapshot, the ones not in it are incomplete (see NotInSnapshot)
+    :raises sqlite3.Error: if the snapshot can't be read
+    """
+    global _snapshot_path, _snapshot_offline, _snapshot_taken_at, _snapshot_connection
+    with _snapshot_lock:
+        if _snapshot_connection is not None:
+            _snapshot_connection.close()
+        _snapshot_path, _snapshot_offline, _snapshot_taken_at, _snapshot_connection = None, False, None, None
+        _snapshot_responses.clear()
+        if path is None:
+            return
+
+        if offline:
+            # the offline requests are sent from several threads, one at a time
+            connection = sqlite3.connect(path, check_same_thread=False)
+            try:
+                row = connection.execute("SELECT value FROM info WHERE name = 'taken_at'").fetchone()
+                if row is None:
+                    raise sqlite3.DatabaseError("Not a complete snapshot")
+            except sqlite3.Error:
+                connection.close()
+                raise
+            _snapshot_taken_at, _snapshot_connection = float(row[0]), connection
+        else:
+            if os.path.exists(path):
+                os.remove(path)
+            _snapshot_taken_at = time.time()
+        _snapshot_path, _snapshot_offline = path, offline
+
+
+def _now() -> datetime:
+    """
+    Get the current time, the offline runs are searched as of when their snapshot was taken
+
+    :return: current time, or the snapshot time offline
+    """
+    if _snapshot_offline and _snapshot_taken_at is not None:
+        return datetime.fromtimestamp(_snapshot_taken_at)
+
+    return datetime.now()
+
+
+def _make_response(url: str, body: bytes, encoding: Optional[str]) -> requests.Response:
+    """
+    Make a successful response with a known body, read like the ones from the network (see _iter_body)
+
+    :param url: requested URL
+    :param body: response body
+    :param encoding: response encoding
+    :return: response
+    """
+    response = requests.Response()
+    response.url = url
+    response.status_code = 200
+    response.encoding = encoding
+    response.raw = io.BytesIO(body)
+
+    return response
+
+
+def _record_snapshot_response(url: str, response: requests.Response) -> requests.Response:
+    """
+    Read a whole response to record it in the snapshot, it's only added to the file once the update is done (see
+    _save_snapshot)
+
+    :param url: requested URL
+    :param response: response opened with _open
+    :return: response with the same body, still unread
+    """
+    body = b"".join(_iter_body(response))
+    with _snapshot_lock:
+        _snapshot_responses[url] = (body, response.encoding)
+
+    return _make_response(url, body, response.encoding)
+
+
+def _get_snapshot_response(url: str) -> requests.Response:
+    """
+    Get a recorded response from the offline snapshot
+
+    :param url: requested URL
+    :return: response
+    :raises NotInSnapshot: if the response wasn't recorded
+    """
+    with _snapshot_lock:
+        row = _snapshot_connection.execute("SELECT body, encoding FROM responses WHERE url = ?", (url,)).fetchone()
+    if row is None:
+        raise NotInSnapshot("{} is not in the snapshot {}".format(url, _snapshot_path))
+
+    return _make_response(url, row[0], row[1])
+
+
+def _save_snapshot() -> None:
+    """
+    Add the responses recorded so far to the snapshot
+    """
+    with _snapshot_lock:
+        responses = dict(_snapshot_responses)
+        _snapshot_responses.clear()
+    if _snapshot_path is None or _snapshot_offline or not responses:
+        return
+
+    try:
+        connection = sqlite3.connect(_snapshot_path, timeout=10)
+        connection.executescript(SNAPSHOT_SCHEMA)
+        with connection:
+            connection.execute("INSERT OR REPLACE INTO info VALUES ('taken_at', ?)", (str(_snapshot_taken_at),))
+            connection.executemany(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?)",
+                [(url, body, encoding) for url, (body, encoding) in responses.items()],
+            )
+        connection.close()
+    except (OSError, sqlite3.Error) as e:
+        print_warn("Could not save the snapshot in {}: {}".format(_snapshot_path, e))
+
+
+def prefetch(args: argparse.Namespace) -> None:
+    """
+    Record everything the searches of some updates need in the snapshot (see set_snapshot), without printing their
+    results, to search them later with --offline
+
+    :param args: parsed prefetch command line arguments
+    """
+    for update_id in _as_list(args.update_id):
+        print(update_id)
+        with open(os.devnull, "w") as devnull, redirect_stdout(devnull):
+            search_update(update_id, args)
+
+    try:
+        connection = sqlite3.connect(args.snapshot)
+        responses, size = connection.execute(
+            "SELECT COUNT(*), COALESCE(SUM(LENGTH(body)), 0) FROM responses"
+        ).fetchone()
+        connection.close()
+    except sqlite3.Error as e:
+        print_warn("Could not read the snapshot {}: {}".format(args.snapshot, e))
+        return
+
+    print("{} responses ({:.1f} MiB) saved in {}".format(responses, size / 2**20, args.snapshot))
+
+
+# PROXY FUNCTIONS
+def _get_proxy_ttl(url: str, body: bytes) -> Optional[float]:
+    """
+    Get how long the proxy keeps a response, by the same rules as the caches of the searches
+
+    :param url: upstream URL
+    :param body: response body
+    :return: seconds, None for ever
+    """
+    parsed_url = urlparse(url)
+    if re.search(r"/build_checks/[^/]+$", parsed_url.path):
+        # the build checks logs don't change once written (unlike their index)
+        return None
+    if parsed_url.path.endswith("/api/v1/job_groups"):
+        return PROXY_JOB_GROUPS_TTL
+    if re.search(r"/api/v1/jobs(/\d+)?$", parsed_url.path):
+        # the finished jobs don't change anymore
+        try:
+            data = json.loads(body)
+            jobs = data["jobs"] if "jobs" in data else [data["job"]]
+        except (ValueError, TypeError, KeyError):
+            return PROXY_TTL
+        return None if jobs and all(job.get("state") in OQA_FINAL_STATES for job in jobs) else PROXY_TTL
+
+    # the job listings (e.g. overview queries) of any build change when its jobs are restarted
+    return PROXY_TTL
+
+
+def _proxy_cache_set(url: str, body: bytes, content_type: Optional[str]) -> None:
+    """
+    Keep a response in the proxy cache, the least recently used ones are dropped once it's full
+
+    :param url: upstream URL
+    :param body: response body
+    :param content_type: response content type
+    """
+    global _proxy_cache_size
+    ttl = _get_proxy_ttl(url, body)
+    with _proxy_lock:
+        previous = _proxy_cache.pop(url, None)
+        if previous is not None:
+            _proxy_cache_size -= len(previous[0])
+        _proxy_cache[url] = (body, content_type, None if ttl is None else time.time() + ttl)
+        _proxy_cache_size += len(body)
+        while _proxy_cache_size > _proxy_cache_max_size:
+            _, (dropped_body, _, _) = _proxy_cache.popitem(last=False)
+            _proxy_cache_size -= len(dropped_body)
+
+
+def _proxy_get(url: str) -> Tuple[bytes, Optional[str]]:
+    """
+    Get a response from the proxy cache or from its upstream, only one request is sent for the clients asking for the
+    same URL at once
+
+    :param url: upstream URL
+    :return: response body and content type
+    :raises requests.RequestException: if the upstream request failed
+    """
+    with _proxy_lock:
+        entry = _proxy_cache.get(url)
+        if entry is not None and (entry[2] is None or entry[2] > time.time()):
+            _proxy_cache.move_to_end(url)
+            return entry[0], entry[1]
+        future = _proxy_fetches.get(url)
+        fetching = future is None
+        if fetching:
+            future = _proxy_fetches[url] = Future()
+
+    if not fetching:
+        return future.result()
+
+    try:
+        with _open(url) as response:
+            result = b"".join(_iter_body(response)), response.headers.get("Content-Type")
+        _proxy_cache_set(url, *result)
+        future.set_result(result)
+    except Exception as e:
+        future.set_exception(e)
+        raise
+    finally:
+        with _proxy_lock:
+            del _proxy_fetches[url]
+
+    return result
+
+
+class _ProxyHandler(BaseHTTPRequestHandler):
+    """
+    Answer the clients of the proxy, every upstream is under its network location (e.g. /openqa.suse.de/api/v1/...)
+    """
+
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self) -> None:
+        # upstream URLs keyed by network location (see make_proxy_server)
+        upstreams: Dict[str, str] = getattr(self.server, "upstreams")
+        netloc, _, path = self.path.lstrip("/").partition("/")
+        if netloc not in upstreams:
+            self.send_error(404, "Unknown upstream {}".format(netloc))
+            return
+
+        try:
+            body, content_type = _proxy_get("{}/{}".format(upstreams[netloc], path))
+        except requests.HTTPError as e:
+            self.send_error(e.response.status_code if e.response is not None else 502)
+            return
+        except (requests.RequestException, DeadlineExceeded) as e:
+            self.send_error(502, str(e))
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", content_type or "application/octet-stream")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def make_proxy_server(
+    upstreams: List[str], bind: str = "127.0.0.1", port: int = DEFAULT_PROXY_PORT, cache_size: int = 0
+) -> ThreadingHTTPServer:
+    """
+    Make a caching HTTP proxy for the openQA, QAM dashboard and QAM servers, shared by the searches of all its clients
+    (see _get_proxy_ttl), every client request is answered in its own thread
+
+    :param upstreams: URLs of the servers to proxy
+    :param bind: address to listen at
+    :param port: port to listen at, 0 for any free one
+    :param cache_size: maximum size of the cached responses in MiB, 0 for the default one
+    :return: proxy server, not serving yet
+    """
+    global _proxy_cache_max_size
+    _proxy_cache_max_size = (cache_size or DEFAULT_PROXY_CACHE_SIZE) * 2**20
+    server = ThreadingHTTPServer((bind, port), _ProxyHandler)
+    setattr(server, "upstreams", {urlparse(url).netloc: url for url in upstreams})
+
+    return server
+
+
+def serve_proxy(args: argparse.Namespace) -> None:
+    """
+    Run the caching proxy until interrupted
+
+    :param args: parsed proxy command line arguments
+    """
+    set_http2(args.http2)
+    upstreams = [*args.url_openqa, args.url_dashboard_qam, args.url_qam]
+    server = make_proxy_server(upstreams, args.bind, args.port, args.cache_size)
+    host, port = server.server_address[:2]
+    for upstream in dict.fromkeys(upstreams):
+        print("{} -> http://{}:{}/{}".format(upstream, host, port, urlparse(upstream).netloc))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+# PROFILE FUNCTIONS
+def set_profile(path: Optional[str]) -> None:
+    """
+    Start sampling the stacks of all the threads to profile where their CPU time goes, until _save_profile writes it
+
+    :param path: file to write the profile to, None to stop profiling without writing anything
+    """
+    global _profile_path, _profile_thread
+    _profile_path = path
+    if path is None:
+        if _profile_thread is not None:
+            _profile_stop.set()
+            _profile_thread.join()
+            _profile_thread = None
+        return
+
+    if _profile_thread is None:
+        _profile_samples.clear()
+        _profile_stop.clear()
+        _profile_thread = threading.Thread(target=_sample_profile, name="oqa-search-profile", daemon=True)
+        _profile_thread.start()
+
+
+def _get_thread_cpu_time(thread_id: int) -> Optional[float]:
+    """
+    Get the CPU time a thread used so far
+
+    :param thread_id: thread identifier
+    :return: CPU seconds, None if the platform doesn't have per thread CPU clocks (or the thread is gone)
+    """
+    try:
+        return time.clock_gettime(time.pthread_getcpuclockid(thread_id))
+    except (AttributeError, OSError):
+        return None
+
+
+def _get_collapsed_stack(frame: Any) -> str:
+    """
+    Get the stack of a frame as a collapsed stack line (for flamegraph.pl or speedscope), under the phase it belongs to
+
+    :param frame: innermost frame of the stack
+    :return: phase (see PROFILE_PHASES) and frames from the outermost, separated by semicolons
+    """
+    phase = None
+    frames = []
+    while frame is not None:
+        code = frame.f_code
+        if phase is None and code.co_filename == __file__:
+            phase = PROFILE_PHASES.get(code.co_name)
+        frames.append("{}:{}".format(os.path.basename(code.co_filename), code.co_name))
+        frame = frame.f_back
+
+    return ";".join(["[{}]".format(phase or "other")] + frames[::-1])
+
+
+def _sample_profile() -> None:
+    """
+    Sample the stacks of all the other threads until the profile is stopped, weighted by the CPU time they used since
+    the previous sample, so the threads waiting for the network don't count
+    """
+    cpu_times: Dict[int, float] = {}
+    while not _profile_stop.wait(PROFILE_INTERVAL):
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id == threading.get_ident():
+                continue
+            cpu_time = _get_thread_cpu_time(thread_id)
+            if cpu_time is None:
+                # without per thread CPU clocks every sample counts, the profile is of wall time then
+                used = PROFILE_INTERVAL
+            else:
+                used = cpu_time - cpu_times.get(thread_id, cpu_time)
+                cpu_times[thread_id] = cpu_time
+            microseconds = round(used * 1e6)
+            if microseconds > 0:
+                _profile_samples[_get_collapsed_stack(frame)] += microseconds
+
+
+def _save_profile() -> None:
+    """
+    Stop profiling, write the profile (a "stack microseconds" line per collapsed stack) and print the CPU time of every
+    phase and of the top functions (in their own code, not in what they called)
+    """
+    path = _profile_path
+    if _profile_thread is None or path is None:
+        return
+    set_profile(None)
+
+    try:
+        with open(path, "w") as f:
+            for stack, microseconds in sorted(_profile_samples.items()):
+                f.write("{} {}\n".format(stack, microseconds))
+    except OSError as e:
+        print_warn("Could not write the profile to {}: {}".format(path, e))
+        return
+
+    phases: Counter = Counter()
+    functions: Counter = Counter()
+    for stack, microseconds in _profile_samples.items():
+        phase, *_, function = stack.split(";")
+        phases[phase] += microseconds
+        functions[phase, function] += microseconds
+    total = sum(phases.values()) or 1
+    print("\nProfile written to {} ({:.2f} s of CPU)".format(path, total / 1e6), file=sys.stderr)
+    for phase, microseconds in phases.most_common():
+        print("{:>9.3f} s {:>5.1f} % {}".format(microseconds / 1e6, 100 * microseconds / total, phase), file=sys.stderr)
+    print("Top functions:", file=sys.stderr)
+    for (phase, function), microseconds in functions.most_common(PROFILE_TOP):
+        print(
+            "{:>9.3f} s {:>5.1f} % {} {}".format(microseconds / 1e6, 100 * microseconds / total, phase, function),
+            file=sys.stderr,
+        )
+
+
+# the library API (and every command) is profiled as a whole with the environment variable, written when exiting
+if os.environ.get(PROFILE_ENV_VAR):
+    set_profile(os.environ[PROFILE_ENV_VAR])
+    atexit.register(_save_profile)
+
+
+# JOB SUMMARY FUNCTIONS
+def set_job_summary(enabled: bool) -> None:
+    """
+    Start (or stop) keeping the running and failed jobs of the builds printed to summarize them (see print_job_summary)
+
+    :param enabled: keep the jobs, they are forgotten otherwise
+    """
+    global _job_table
+    _job_table = _make_job_table() if enabled else None
+
+
+def _make_job_table() -> Dict[str, array.array]:
+    """
+    Make an empty job table: a column per job field, the job IDs as they are and the rest (JOB_TABLE_COLUMNS) coded as
+    integers (see _job_codes), a few bytes per job instead of a dict
+
+    :return: job IDs and coded columns keyed by column name
+    """
+    table = {"id": array.array("q")}
+    table.update((column, array.array("I")) for column in JOB_TABLE_COLUMNS)
+
+    return table
+
+
+def _get_job_code(column: str, value: Any) -> int:
+    """
+    Get the code of a job table column value, coding it first if new
+
+    :param column: job table column
+    :param value: column value
+    :return: integer code
+    """
+    codes = _job_codes[column]
+    code = codes.get(value)
+    if code is None:
+        code = codes[value] = len(codes)
+
+    return code
+
+
+def _add_job_results(table: Dict[str, array.array], jobs: List[Dict], version: str, group: str) -> None:
+    """
+    Add the jobs of an openQA build to a job table
+
+    :param table: job table (see _make_job_table)
+    :param jobs: jobs of the build with their state and result (see _get_openqa_jobs)
+    :param version: SLE version of the build
+    :param group: job group of the build
+    """
+    with _job_table_lock:
+        table["id"].extend(job["id"] for job in jobs)
+        table["state"].extend(_get_job_code("state", job["state"]) for job in jobs)
+        table["result"].extend(_get_job_code("result", job["result"]) for job in jobs)
+        table["version"].extend(array.array("I", [_get_job_code("version", version)]) * len(jobs))
+        table["group"].extend(array.array("I", [_get_job_code("group", group)]) * len(jobs))
+        # the machine is the end of the job name: <distri>-<version>-<flavor>-<arch>-Build<build>-<test>@<machine>
+        table["machine"].extend(_get_job_code("machine", job["name"].partition("@")[2]) for job in jobs)
+
+
+def _count_jobs(table: Dict[str, array.array], columns: List[str]) -> Dict[Tuple, int]:
+    """
+    Count the jobs of a job table by the values of some of its columns, like a SQL GROUP BY
+
+    :param table: job table (see _make_job_table)
+    :param columns: coded columns (see JOB_TABLE_COLUMNS) to group the jobs by
+    :return: number of jobs keyed by the values of the columns, most common first
+    """
+    with _job_table_lock:
+        values = [list(_job_codes[column]) for column in columns]
+        if numpy is None:
+            counts = Counter(zip(*(table[column] for column in columns))).items()
+        elif len(table["id"]):
+            # the codes of all the columns are combined in a single key per job to count them at once
+            keys = numpy.zeros(len(table["id"]), dtype=numpy.int64)
+            for column, column_values in zip(columns, values):
+                keys = keys * len(column_values) + numpy.frombuffer(table[column], dtype=table[column].typecode)
+            key_count = numpy.prod([len(column_values) for column_values in values], dtype=numpy.int64)
+            if key_count <= len(keys):
+                key_counts = numpy.bincount(keys)
+                unique_keys = numpy.flatnonzero(key_counts)
+                key_counts = key_counts[unique_keys]
+            else:
+                # too many combinations to count them all, only the existing ones are
+                unique_keys, key_counts = numpy.unique(keys, return_counts=True)
+            counts = []
+            for key, key_count in zip(unique_keys.tolist(), key_counts.tolist()):
+                codes = []
+                for column_values in reversed(values):
+                    key, code = divmod(key, len(column_values))
+                    codes.append(code)
+                counts.append((tuple(codes[::-1]), key_count))
+        else:
+            counts = []
+
+    return {
+        tuple(column_values[code] for column_values, code in zip(values, codes)): jobs
+        for codes, jobs in sorted(counts, key=lambda item: -item[1])
+    }
+
+
+def print_job_summary() -> None:
+    """
+    Print how many running and failed jobs the builds printed so far have per state, result, version, group and
+    machine
+    """
+    print_title("\nJob summary:\n############")
+    if _job_table is None or not _job_table["id"]:
+        print("No running or failed jobs")
+        return
+
+    print("{} running or failed jobs".format(len(_job_table["id"])))
+    for column in JOB_TABLE_COLUMNS:
+        counts = _count_jobs(_job_table, [column])
+        print(
+            "{}: {}".format(
+                column.title(), ", ".join("{} {}".format(value or "-", n) for (value,), n in counts.items())
+            )
+        )
+
+
+# GATE FUNCTIONS
+def set_gate(enabled: bool) -> None:
+    """
+    Set whether the search stops at the first failed result (see _record_gate)
+
+    :param enabled: stop at the first failed result
+    """
+    global _gate
+    _gate = enabled
+    _gate_statuses.clear()
+
+
+def _record_gate(status: str) -> None:
+    """
+    Keep the status of a result for the gate exit code
+
+    :param status: result status, see GATE_EXIT_CODES (passed otherwise)
+    :raises GateFailed: if the result failed in --gate mode
+    """
+    _gate_statuses.add(status)
+    _update_statuses.add(status)
+    if _gate and status == "failed":
+        raise GateFailed()
+
+
+def _get_gate_exit_code() -> int:
+    """
+    Get the exit code of the --gate mode for the results found so far
+
+    :return: exit code of the status with the highest priority (see GATE_EXIT_CODES), 0 if everything passed
+    """
+    return next((code for status, code in GATE_EXIT_CODES.items() if status in _gate_statuses), 0)
+
+
+def _cancel_requests() -> None:
+    """
+    Give up on all the outstanding requests (and any new one), the ones in flight stop at their next chunk
+    """
+    set_deadline(0)
+
+
+# FINGERPRINT FUNCTIONS
+def _get_digest(value: Any) -> str:
+    """
+    Get a digest of a value
+
+    :param value: JSON serializable value
+    :return: SHA-256 hex digest of its JSON
+    """
+    return hashlib.sha256(json.dumps(value, sort_keys=True).encode()).hexdigest()
+
+
+def _get_resource_fingerprint(url: str, previous: Optional[str] = None) -> str:
+    """
+    Get the fingerprint of a resource: its ETag if the server tags it, a digest of its body otherwise
+
+    :param url: resource URL
+    :param previous: fingerprint of the resource from a previous call, if it's an ETag the server only sends the
+        resource again if it changed
+    :return: fingerprint
+    """
+    headers = None
+    if previous is not None and previous.startswith("etag:"):
+        headers = {"If-None-Match": previous[len("etag:") :]}
+
+    digest = hashlib.sha256()
+    with _open(url, headers) as response:
+        if response.status_code == requests.codes.not_modified:
+            return previous
+        etag = response.headers.get("ETag")
+        for chunk in _iter_body(response):
+            digest.update(chunk)
+
+    return "etag:{}".format(etag) if etag else digest.hexdigest()
+
+
+def _get_update_fingerprint(update_id: str, args: argparse.Namespace, previous: Optional[Dict] = None) -> Dict:
+    """
+    Get the fingerprint of what the results of an update depend on besides its openQA jobs (see _get_jobs_fingerprint):
+    the search options, the incident settings, the aggregated updates builds including the incident (from the QAM
+    dashboard, whatever the backend) and the build checks logs index
+
+    :param update_id: update ID
+    :param args: parsed command line arguments
+    :param previous: fingerprint of the update from its last search, the resources the server tags are only fetched
+        again if they changed
+    :return: fingerprint
+    :raises requests.RequestException, ValueError, DeadlineExceeded: if it couldn't be fetched
+    """
+    product, incident_id, request_id = _parse_update_id(update_id)
+    effective_incident_id = _get_effective_incident_id(incident_id, request_id)
+    previous = previous or {}
+    options = [args.url_openqa, args.url_dashboard_qam, args.url_qam, args.no_aggregated, args.backend, args.details]
+    if not args.no_aggregated:
+        options.extend([args.days, args.aggregated_groups])
+
+    settings_url = "{}/api/incident_settings/{}".format(args.url_dashboard_qam, effective_incident_id)
+    build_checks_url = "{}/testreports/SUSE:{}:{}:{}/build_checks".format(
+        args.url_qam, product, incident_id, request_id
+    )
+    fingerprint = {
+        "options": _get_digest(options),
+        "settings": _get_resource_fingerprint(settings_url, previous.get("settings")),
+        "build_checks": _get_resource_fingerprint(build_checks_url, previous.get("build_checks")),
+    }
+    if not args.no_aggregated:
+        # the builds of the --days window: a new build including the incident or an old one leaving the window changes
+        # the aggregated updates results
+        aggregated_builds = _get_dashboard_aggregated_builds(args.url_dashboard_qam, effective_incident_id, args.days)
+        if aggregated_builds is None:
+            raise ValueError("The aggregated updates builds of the incident aren't available")
+        fingerprint["aggregated"] = _get_digest(aggregated_builds)
+
+    return fingerprint
+
+
+def _get_jobs_fingerprint(builds: List[Tuple[str, str, str, int]]) -> Dict[str, str]:
+    """
+    Get the fingerprints of the latest jobs of some openQA builds and of their running ones: a restarted job or a new
+    one has a new ID, and a running job that finishes keeps its ID but leaves the running ones
+
+    :param builds: openQA URL, version, build and group ID of every build
+    :return: digest of the job IDs and running job IDs of every build (of all its groups) keyed by openQA URL, version
+        and build
+    :raises requests.RequestException, ValueError, DeadlineExceeded: if they couldn't be fetched
+    """
+    # the groups of a build are asked for at once
+    searches: Dict[str, Tuple[str, str, str, List[int]]] = {}
+    for url_openqa, version, build, group_id in builds:
+        search = searches.setdefault(" ".join([url_openqa, version, build]), (url_openqa, version, build, []))
+        search[3].append(group_id)
+    queries = ["all", "running"]
+    args_list = [
+        (_get_openqa_build_url(query, url_openqa, _get_openqa_version(version), build, group_ids), _reduce_openqa_job)
+        for url_openqa, version, build, group_ids in searches.values()
+        for query in queries
+    ]
+    futures = _run_concurrently(_get_json_pages, args_list, OQA_JOBS_WORKERS)
+
+    return {
+        key: _get_digest(
+            {query: sorted(job["id"] for job in future.result()) for query, future in zip(queries, build_futures)}
+        )
+        for key, build_futures in zip(searches, zip(*[iter(futures)] * len(queries)))
+    }
+
+
+# OPENQA JOB GROUPS MANAGEMENT FUNCTIONS
+def _reduce_openqa_group(group: Dict) -> Dict:
+    """
+    Keep only the name, ID and template kind of an oQA job group, templates can be big and only the micro ones matter
+
+    :param group: oQA job group
+    :return: reduced oQA job group
+    """
+    template = group["template"]
+    if template:
+        template = MICRO_TEMPLATE_IDENTIFIER if MICRO_TEMPLATE_IDENTIFIER in template else "template"
+
+    return {"id": group["id"], "name": group["name"], "template": template}
+
+
+def _reduce_openqa_job(job: Dict) -> Dict:
+    """
+    Keep only the fields of an oQA job needed from job listings
+
+    :param job: oQA job
+    :return: reduced oQA job
+    """
+    return {k: job[k] for k in OQA_JOB_FIELDS if k in job}
+
+
+@lru_cache(maxsize=None)  # cache the result per openQA instance
+def _fetch_openqa_groups(url_openqa: str = DEFAULT_OPENQA_URL) -> List[Dict]:
+    """
+    Helper to fetch and cache oQA job groups
+
+    :param url_openqa: openQA URL
+    :return: dict of oQA job groups (name and IDs)
+    """
+    # returns cached value for all subsequent calls
+    return _get_json(url_openqa + "/api/v1/job_groups", _reduce_openqa_group)
+
+
+def _is_valid_template(group: Dict) -> bool:
+    """Check if group has a template and it's not for micro"""
+    template = group["template"]
+    return bool(template and MICRO_TEMPLATE_IDENTIFIER not in template)
+
+
+def _is_name_matching(group: Dict, match_terms: List[str], excluded_terms: List[str]) -> bool:
+    """Check if group name matches criteria"""
+    group_name = group["name"]
+    return bool(any(_ in group_name for _ in match_terms) and not any(_ in group_name for _ in excluded_terms))
+
+
+def _extract_version(name: str) -> str:
+    """
+    Extract SLE version from oQA job group names
+
+    :param name: oQA job group name containing version
+    :return: formatted version string like "12-SP5" or "12-SP3-TERADATA"
+    """
+    # space separated format (e.g. 12 SP5)
+    match = re.search(r"(\d+)\s*SP\s*(\d+)(?:\s+TERADATA)?", name)
+    if match:
+        base_version = f"{match.group(1)}-SP{match.group(2)}"
+        return f"{base_version}-TERADATA" if "TERADATA" in name else base_version
+
+    # if no match, use hyphen format (e.g. 12-SP3-TERADATA)
+    match = re.search(r"(\d+)-SP\d+(?:-TERADATA)?", name)
+    if match:
+        # return the full match (already meets the format)
+        return match.group(0)
+
+    # if no match, use dot versioning (e.g. 16.0)
+    match = re.search(r"(\d+\.\d+)", name)
+    if match:
+        # return the full match (already meets the format)
+        return match.group(0)
+
+    return ""
+
+
+def _extract_aggregated_name(name: str) -> str:
+    for k, v in AGGREGATED_NAME_MAP.items():
+        if k in name:
+            return v
+    return name.split()[0].lower()
+
+
+def _filter_openqa_groups(
+    match_text: List[str],
+    excluded_terms: List[str],
+    name_extractor: Callable,
+    url_openqa: str = DEFAULT_OPENQA_URL,
+) -> Dict[str, int]:
+    """
+    Filter and transform OpenQA groups based on specified criteria.
+
+    Args:
+        match_text: Text to match in group names
+        excluded_terms: Terms to exclude from group names
+        name_extractor: Function to extract key from group name
+        url_openqa: OpenQA instance the groups belong to
+
+    Returns:
+        Dictionary mapping extracted names to group IDs
+    """
+    return {
+        name_extractor(group["name"]): group["id"]
+        for group in _fetch_openqa_groups(url_openqa)
+        if _is_name_matching(group, match_text, excluded_terms) and _is_valid_template(group)
+    }
+
+
+def get_incident_groups(url_openqa: str = DEFAULT_OPENQA_URL):
+    """
+    Fetch oQA single incidents job group IDs
+
+    :param url_openqa: openQA URL
+    :return: dict of oQA single incidents job group IDs keyed by SLE version
+    """
+    return _filter_openqa_groups(SINGLE_INCIDENTS_TERMS, EXCLUDED_GROUPS, _extract_version, url_openqa)
+
+
+def get_aggregated_groups(url_openqa: str = DEFAULT_OPENQA_URL):
+    """
+    Fetch aggregated updates job group IDs
+
+    :param url_openqa: openQA URL
+    :return: dict of oQA aggregated updates job group IDs keyed by SLE version
+    """
+    return _filter_openqa_groups(AGGREGATED_GROUPS_TERMS, EXCLUDED_GROUPS, _extract_aggregated_name, url_openqa)
+
+
+# OPENQA JOB MANAGEMENT FUNCTIONS
+def _get_group_id(key: str, url_openqa: str = DEFAULT_OPENQA_URL) -> int:
+    """
+    Get the group ID for a given key
+
+    :param key: SLE version for single incidents and job group for aggregated updates
+    :param url_openqa: openQA URL
+    :return: group ID
+    """
+    try:
+        # single incidents
+        return get_incident_groups(url_openqa)[key]
+    except KeyError:
+        try:
+            # aggregated updates
+            return get_aggregated_groups(url_openqa)[key]
+        except KeyError as e:
+            raise ValueError(
+                "Not a valid version (single incident) or group (aggregated updates): {}".format(key)
+            ) from e
+
+
+def _get_instance_group_ids(keys: List[str], urls_openqa: List[str]) -> Dict[str, Dict[str, int]]:
+    """
+    Get the group IDs for some keys in every openQA instance, a key can be missing in some of them (e.g. a group only
+    found in a staging instance) but not in all
+
+    :param keys: SLE versions for single incidents or job groups for aggregated updates
+    :param urls_openqa: openQA URLs
+    :return: group IDs keyed by openQA URL and key, the keys missing in an instance are left out
+    :raises ValueError: if a key is missing in all the instances
+    """
+    group_ids: Dict[str, Dict[str, int]] = {url: {} for url in urls_openqa}
+    for key in keys:
+        error = None
+        for url in urls_openqa:
+            try:
+                group_ids[url][key] = _get_group_id(key, url)
+            except ValueError as e:
+                error = e
+        if error is not None and not any(key in instance_group_ids for instance_group_ids in group_ids.values()):
+            raise error
+
+    return group_ids
+
+
+def _get_openqa_job_issues(url_openqa: str, job_id: int) -> Set[int]:
+    """
+    Get all the test issues that are being tested in an openQA job
+
+    :param url_openqa: openQA URL
+    :param job_id: openQA job ID
+    :return: set of issues tested in the openQA job
+    """
+    issues_url = "{}/api/v1/jobs/{}".format(url_openqa, job_id)
+    issues_response = _get_json(issues_url)
+
+    return _get_job_issues(issues_response["job"])
+
+
+def _get_job_issues(job: Dict) -> Set[int]:
+    """
+    Get all the test issues in the settings of an openQA job
+
+    :param job: openQA job (with its settings)
+    :return: set of issues tested in the openQA job
+    """
+    # check if the job is testing the incident for this MU
+    issues = []
+    for k, v in job["settings"].items():
+        if "_TEST_ISSUES" in k.upper():
+            issues.extend([int(i) for i in v.split(",")])
+
+    # remove duplicates
+    return set(issues)
+
+
+def _get_openqa_print_url(url_openqa: str, version: str, build: str, group_id: int) -> str:
+    """
+    Get printable openQA url (not the API endpoint)
+
+    :param url_openqa: openQA URL
+    :param version: SLE version
+    :param build: build name
+    :param group_id: group ID
+    :return: printable openQA URL
+    """
+    return "{}/tests/overview?distri=sle&version={}&build={}&groupid={}".format(url_openqa, version, build, group_id)
+
+
+def _get_openqa_build_url(
+    state: str, url_openqa: str, version: str, build: str, group_id: Union[int, List[int]]
+) -> str:
+    """
+    Get the openQA build URL for a given version and build
+
+    :param state: job state (all, running, failed)
+    :param url_openqa: openQA URL
+    :param version: SLE version
+    :param build: build name
+    :param group_id: group ID or list of them to query for all at once
+    :return: job URL
+    """
+    group_ids = [group_id] if isinstance(group_id, int) else group_id
+    valid_group_ids = [*get_aggregated_groups(url_openqa).values(), *get_incident_groups(url_openqa).values()]
+    if not group_ids or any(i not in valid_group_ids for i in group_ids):
+        raise ValueError("Invalid openQA group ID")
+
+    base_url = "{}/api/v1/jobs/overview?distri=sle&version={}&build={}&{}".format(
+        url_openqa, version, build, "&".join("groupid={}".format(i) for i in group_ids)
+    )
+
+    try:
+        return base_url + OQA_QUERY_STRINGS[state]
+    except KeyError as e:
+        raise ValueError("Invalid openQA job state") from e
+
+
+def _get_openqa_version(version: str) -> str:
+    """
+    Get the version name openQA uses for a SLE version
+
+    :param version: SLE version
+    :return: openQA version
+    """
+    # workaround for error with 12-SP3-TERADATA openqa job url
+    return "12-SP3" if version == "12-SP3-TERADATA" else version
+
+
+def _get_build_cache_key(url_openqa: str, version: str, build: str, group_id: int) -> str:
+    """
+    Get the key of an openQA build in the caches
+
+    :param url_openqa: openQA URL
+    :param version: SLE version
+    :param build: build name
+    :param group_id: group ID
+    :return: cache key
+    """
+    return " ".join([url_openqa, version, build, str(group_id)])
 
-    :return: dict of oQA job groups (name and IDs)
+
+def _get_build_jobs_digest(url_openqa: str, version_oqa: str, build: str, group_id: int) -> Optional[str]:
+    """
+    Get the digest of the IDs of the latest jobs of an openQA build, a restarted job has a new ID (its clone) whether
+    it's still running or already finished
+
+    :param url_openqa: openQA URL
+    :param version_oqa: openQA version (see _get_openqa_version)
+    :param build: build name
+    :param group_id: group ID
+    :return: digest of the job IDs, None if the build has no jobs yet
     """
-    return _get_json(DEFAULT_OPENQA_URL + "/api/v1/job_groups")  # returns cached value for all subsequent calls
+    all_url = _get_openqa_build_url("all", url_openqa, version_oqa, build, group_id)
+    job_ids = sorted(job["id"] for job in _get_json_pages(all_url, _reduce_openqa_job))
 
+    return _get_digest(job_ids) if job_ids else None
 
-def _is_valid_template(group: Dict) -> bool:
-    """Check if group has a template and it's not for micro"""
-    template = group["template"]
-    return bool(template and MICRO_TEMPLATE_IDENTIFIER not in template)
 
+def _get_openqa_job_results(url_openqa: str, version: str, build: str, group_id: int) -> Tuple[List[Dict], List[Dict]]:
+    """
+    Query an openQA build for any running/scheduled or failed jobs, the results of finished builds are cached (and
+    checked once per run to be of the same jobs)
+
+    :param url_openqa: openQA URL
+    :param version: SLE version
+    :param build: build name
+    :param group_id: group ID
+    :return: running/scheduled jobs and failed jobs
+    """
+    version_oqa = _get_openqa_version(version)
+    cache_key = _get_build_cache_key(url_openqa, version, build, group_id)
+    cached_results = _cache_get(BUILD_RESULTS_CACHE, cache_key)
+    jobs_digest = None
+    if cached_results is not None and cache_key not in _rechecked_builds:
+        # the jobs restarted since (e.g. by a reviewer) have new IDs, the cached results are out of date even if they
+        # finished already
+        jobs_digest = _get_build_jobs_digest(url_openqa, version_oqa, build, group_id)
+        if cached_results[2:] != [jobs_digest]:
+            _cache_delete(BUILD_RESULTS_CACHE, cache_key)
+            cached_results = None
+        _rechecked_builds.add(cache_key)
+    if cached_results is not None:
+        running_results, failed_results = cached_results[:2]
+        return running_results, failed_results
+
+    if jobs_digest is None and _get_cache(BUILD_RESULTS_CACHE) is not None:
+        # taken before the results, so a job restarted while they're fetched changes it by the next run
+        jobs_digest = _get_build_jobs_digest(url_openqa, version_oqa, build, group_id)
+    running_url = _get_openqa_build_url("running", url_openqa, version_oqa, build, group_id)
+    failed_url = _get_openqa_build_url("failed", url_openqa, version_oqa, build, group_id)
+    running_results = _get_json_pages(running_url, _reduce_openqa_job)
+    failed_results = _get_json_pages(failed_url, _reduce_openqa_job)
+
+    # the results of a build without running/scheduled jobs don't change anymore, unless it has no jobs at all yet
+    if not running_results and jobs_digest is not None:
+        _cache_set(BUILD_RESULTS_CACHE, cache_key, [running_results, failed_results, jobs_digest])
+        _rechecked_builds.add(cache_key)
+
+    return running_results, failed_results
+
+
+def _print_openqa_job_results(
+    url_openqa: str,
+    version: str,
+    build: str,
+    group_id: int,
+    results: Optional[Future] = None,
+    aggregated_group: Optional[str] = None,
+) -> List[Dict]:
+    """
+    Print the openQA job results for a given version and build, and keep them in the results history
+
+    :param url_openqa: openQA URL
+    :param version: SLE version
+    :param build: build name
+    :param group_id: group ID
+    :param results: job results already being fetched (see _get_openqa_job_results), fetched here if not given
+    :param aggregated_group: aggregated updates group of the build, None for the single incidents ones
+    :return: failed jobs of the build
+    """
+    # print version and oQA build url
+    print("{} -> {}".format(version, _get_openqa_print_url(url_openqa, _get_openqa_version(version), build, group_id)))
+
+    try:
+        if results is None:
+            running_results, failed_results = _get_openqa_job_results(url_openqa, version, build, group_id)
+        else:
+            running_results, failed_results = results.result()
+    except DeadlineExceeded:
+        print_incomplete()
+        return []
+
+    # print oQA build results
+    if failed_results:
+        print_ko("FAILED ({} jobs)".format(len(failed_results)))
+        status = "failed"
+    elif running_results:
+        print_warn("RUNNING/SCHEDULED ({} jobs)".format(len(running_results)))
+        status = "running"
+    else:
+        print_ok("PASSED")
+        status = "passed"
+    _record_history(
+        "openqa_results",
+        url=url_openqa,
+        section="single" if aggregated_group is None else "aggregated",
+        group_name=aggregated_group or "core",
+        version=version,
+        group_id=group_id,
+        build=build,
+        status=status,
+        running_jobs=len(running_results),
+        failed_jobs=len(failed_results),
+    )
+    if _update_builds is not None:
+        _update_builds.append((url_openqa, version, build, group_id))
+    if _job_table is not None:
+        _add_job_details(_job_table, url_openqa, running_results + failed_results, version, aggregated_group or "core")
+    if running_results:
+        # a failed build with running jobs left isn't final either (see search_changed_update)
+        _update_statuses.add("running")
+    _record_gate(status)
+
+    return failed_results
+
+
+def _add_job_details(
+    table: Dict[str, array.array], url_openqa: str, results: List[Dict], version: str, group: str
+) -> None:
+    """
+    Add the running and failed jobs of an openQA build to a job table, with the state and result of their details as
+    the overview listings only give their ID and name
+
+    :param table: job table (see _make_job_table)
+    :param url_openqa: openQA URL
+    :param results: running and failed jobs of the build (see _get_openqa_job_results)
+    :param version: SLE version of the build
+    :param group: job group of the build
+    """
+    try:
+        jobs = _get_openqa_jobs(url_openqa, [job["id"] for job in results])
+    except DeadlineExceeded:
+        print_incomplete()
+        return
+
+    _add_job_results(table, jobs, version, group)
+
+
+def _get_openqa_jobs(url_openqa: str, job_ids: List[int]) -> List[Dict]:
+    """
+    Get openQA jobs along with their module results, asking for them in batches and caching the finished ones
+
+    :param url_openqa: openQA URL
+    :param job_ids: openQA job IDs
+    :return: openQA jobs
+    """
+    jobs = {
+        job_id: _finished_jobs[(url_openqa, job_id)] for job_id in job_ids if (url_openqa, job_id) in _finished_jobs
+    }
+    missing_ids = [job_id for job_id in job_ids if job_id not in jobs]
+    batch_urls = [
+        (
+            "{}/api/v1/jobs?ids={}".format(
+                url_openqa, ",".join(str(i) for i in missing_ids[n : n + OQA_JOBS_BATCH_SIZE])
+            ),
+        )
+        for n in range(0, len(missing_ids), OQA_JOBS_BATCH_SIZE)
+    ]
+
+    for future in _run_concurrently(_get_json, batch_urls, OQA_JOBS_WORKERS):
+        for job in future.result()["jobs"]:
+            jobs[job["id"]] = job
+            if job["state"] in OQA_FINAL_STATES:
+                _finished_jobs[(url_openqa, job["id"])] = job
+
+    return [jobs[job_id] for job_id in job_ids if job_id in jobs]
+
+
+def _group_failed_modules(jobs: List[Dict]) -> Dict[str, List[str]]:
+    """
+    Group the failed modules of some openQA jobs by test suite
+
+    :param jobs: openQA jobs (with their module results)
+    :return: failed modules keyed by test suite, or the job result for jobs without failed modules (e.g. incomplete)
+    """
+    failures: Dict[str, List[str]] = {}
+    for job in jobs:
+        failed_modules = [m["name"] for m in job.get("modules", []) if m["result"] == "failed"] or [job["result"]]
+        suite_failures = failures.setdefault(job["test"], [])
+        suite_failures.extend(m for m in failed_modules if m not in suite_failures)
+
+    return failures
+
+
+def _print_failed_job_details(url_openqa: str, failed_results: List[Dict]) -> None:
+    """
+    Print the failed modules of the failed jobs of an openQA build grouped by test suite
+
+    :param url_openqa: openQA URL
+    :param failed_results: failed jobs of the build (see _get_openqa_job_results)
+    """
+    try:
+        jobs = _get_openqa_jobs(url_openqa, [job["id"] for job in failed_results])
+    except DeadlineExceeded:
+        print_incomplete()
+        return
+
+    for suite, modules in sorted(_group_failed_modules(jobs).items()):
+        print("  {}: {}".format(suite, ", ".join(modules)))
+
+
+# QAM DASHBOARD JOB FUNCTIONS
+def _get_dashboard_job_results(
+    url_dashboard_qam: str, incident_id: Union[int, str]
+) -> Dict[Tuple[str, int], Tuple[List[Dict], List[Dict]]]:
+    """
+    Get the single incidents job results of an incident from the openQA jobs tracked by the QAM dashboard
+
+    :param url_dashboard_qam: qam dashboard URL
+    :param incident_id: incident ID
+    :return: running/scheduled jobs and failed jobs (as in _get_openqa_job_results) keyed by version and group ID,
+        empty if the dashboard has no jobs for the incident
+    """
+    url = "{}/api/jobs/incident/{}".format(url_dashboard_qam, incident_id)
+    try:
+        jobs = _get_json(url)
+    except (requests.RequestException, ValueError, DeadlineExceeded):
+        # not available, everything is queried from openQA instead
+        return {}
+
+    results: Dict[Tuple[str, int], Tuple[List[Dict], List[Dict]]] = {}
+    for job in jobs:
+        if job.get("obsolete"):
+            continue
+
+        version = "{}-TERADATA".format(job["version"]) if "TERADATA" in job["flavor"] else job["version"]
+        running_results, failed_results = results.setdefault((version, job["group_id"]), ([], []))
+        if job["status"] in DASHBOARD_RUNNING_STATUSES:
+            running_results.append({"id": job["job_id"], "name": job["name"]})
+        elif job["status"] in DASHBOARD_FAILED_STATUSES:
+            failed_results.append({"id": job["job_id"], "name": job["name"]})
+
+    return results
+
+
+def _get_dashboard_aggregated_builds(
+    url_dashboard_qam: str, incident_id: Union[int, str], days: int
+) -> Optional[Dict[str, List[str]]]:
+    """
+    Get the aggregated updates builds that include an incident from the QAM dashboard
+
+    :param url_dashboard_qam: qam dashboard URL
+    :param incident_id: incident ID
+    :param days: how many days to go back for
+    :return: build names of the last days (newest first) keyed by version, None if the dashboard isn't available
+    """
+    url = "{}/api/update_settings/{}".format(url_dashboard_qam, incident_id)
+    try:
+        update_settings = _get_json(url)
+    except (requests.RequestException, ValueError, DeadlineExceeded):
+        # not available, the usual build names are searched for instead
+        return None
+
+    oldest_date = (_now() - timedelta(days - 1)).strftime("%Y%m%d")
+    builds: Dict[str, List[str]] = {}
+    for update in update_settings:
+        match = AGGREGATED_BUILD_PATTERN.match(update["build"])
+        if update["settings"].get("DISTRI") != "sle" or not match or match.group(1) < oldest_date:
+            continue
+
+        version_builds = builds.setdefault(update["settings"]["VERSION"], [])
+        if update["build"] not in version_builds:
+            version_builds.append(update["build"])
+
+    for version_builds in builds.values():
+        version_builds.sort(reverse=True)
+
+    return builds
+
+
+# BUILD CHECKS FUNCTIONS
+def extract_test_results(log_text: str) -> List[str]:
+    """
+    Extract test results from build check logs
+    The summary of the test framework is looked for from the end of the log (see extract_testsuite_summary), only
+    logs of unknown test frameworks are searched whole (see extract_test_results_from_lines)
+
+    :param log_text: log text content to search through
+    :return: list of matched lines containing test results
+    """
+    lines = log_text.splitlines()
+    summary = extract_testsuite_summary(reversed(lines))
+    if summary is None:
+        return extract_test_results_from_lines(lines)
+
+    return summary
+
+
+def extract_testsuite_summary(reversed_lines: Iterable[str]) -> Optional[List[str]]:
+    """
+    Extract the summary of the test framework of a build check log, reading it backward from its end
+    The framework is the one of the last summary line found (see TESTSUITE_SUMMARY_PATTERNS), the reading stops at the
+    start of the %check section or once no more summary lines of that framework follow
+
+    :param reversed_lines: log lines, from the last one to the first one
+    :return: summary lines in log order, None if no known test framework summary was found
+    """
+    # one search per line until the framework is known
+    any_summary_pattern = re.compile(
+        "|".join("(?P<{}>{})".format(name, pattern.pattern) for name, pattern in TESTSUITE_SUMMARY_PATTERNS.items())
+    )
+    framework_pattern: Optional[Pattern] = None
+    summary: List[str] = []
+    gap = 0
+    for line in reversed_lines:
+        if TESTSUITE_SECTION_START in line:
+            break
+        # remove timestamp
+        content = line.split("]", 1)[-1].strip()
+        if framework_pattern is None:
+            match = any_summary_pattern.match(content)
+            if match:
+                framework_pattern = TESTSUITE_SUMMARY_PATTERNS[match.lastgroup]
+                summary.append(line)
+        elif framework_pattern.match(content):
+            summary.append(line)
+            gap = 0
+        else:
+            gap += 1
+            if gap > TESTSUITE_SUMMARY_MAX_GAP:
+                break
+
+    if framework_pattern is None:
+        return None
+    summary.reverse()
+    return summary
+
+
+def extract_test_results_from_lines(lines: Iterable[str]) -> List[str]:
+    """
+    Extract test results from the lines of a build check log of an unknown test framework as they are read
+    Only include lines that have standalone numbers and test related keywords while excluding blocked words
+
+    :param lines: log lines
+    :return: list of matched lines containing test results
+    """
+    matches = []
+    for line in lines:
+        # remove timestamp
+        lower = line.lower().split("]")[1]
+        # skip if it has no standalone numbers
+        if not TESTSUITE_NUMBERS_PATTERN.search(lower):
+            continue
+        if any(blocked_word in lower for blocked_word in TESTSUITE_WORDS_BLOCKLIST):
+            continue
+        if any(word in lower for word in TESTSUITE_WORDS):
+            matches.append(line)
+
+    return matches
+
+
+# MAIN FEATURE FUNCTIONS
+def _get_group_jobs(url_openqa: str, job_ids: Iterable[int], group_ids: List[int]) -> Dict[int, Dict]:
+    """
+    Get one job of every given job group out of a list of jobs from several groups
+
+    :param url_openqa: openQA URL
+    :param job_ids: openQA job IDs, only consumed until every group is found
+    :param group_ids: job group IDs to look for
+    :return: first job of each group keyed by group ID (groups without jobs are left out)
+    """
+    group_jobs: Dict[int, Dict] = {}
+    job_ids = iter(job_ids)
+    # the overview doesn't include the job group, ask for the job details until every group is found. A job per group
+    # is asked for first (a single group needs a single job), full batches only if some groups weren't among them
+    batch_size = min(len(group_ids), OQA_JOBS_BATCH_SIZE)
+    while len(group_jobs) < len(group_ids):
+        batch = list(islice(job_ids, batch_size))
+        if not batch:
+            break
+        for job in _get_openqa_jobs(url_openqa, batch):
+            if job["group_id"] in group_ids:
+                group_jobs.setdefault(job["group_id"], job)
+        batch_size = OQA_JOBS_BATCH_SIZE
+
+    return group_jobs
+
+
+def _get_aggregated_build_names(days: int) -> List[str]:
+    """
+    Get the usual aggregated updates build names for the last days
+
+    :param days: how many days to go back for
+    :return: build names, newest first
+    """
+    return ["{}-1".format((_now() - timedelta(i)).strftime("%Y%m%d")) for i in range(days)]
+
+
+def _get_aggregated_build_ttl(build: str) -> Optional[float]:
+    """
+    Get how long the tested issues of an aggregated updates build can be cached for
+
+    :param build: build name
+    :return: seconds, None for ever (past days don't get new builds anymore)
+    """
+    match = AGGREGATED_BUILD_PATTERN.match(build)
+    if match and match.group(1) < _now().strftime("%Y%m%d"):
+        return None
+
+    return AGGREGATED_BUILDS_TODAY_TTL
+
+
+def _get_aggregated_build_date(build: str) -> Optional[str]:
+    """
+    Get the date of an aggregated updates build
+
+    :param build: build name
+    :return: date as YYYYMMDD, None if the build name isn't the usual one
+    """
+    match = AGGREGATED_BUILD_PATTERN.match(build)
+
+    return match.group(1) if match else None
+
+
+def _get_aggregated_build_issues(
+    url_openqa: str, version: str, build: str, group_ids: List[int]
+) -> Dict[int, List[int]]:
+    """
+    Get the issues tested by an aggregated updates build in several job groups at once
+
+    :param url_openqa: openQA URL
+    :param version: SLE version
+    :param build: build name
+    :param group_ids: aggregated updates group IDs
+    :return: tested issues keyed by group ID, empty for the groups without the build
+    """
+    # the groups builds already known (or known not to exist) don't need to be queried again
+    cache_keys = {group_id: _get_build_cache_key(url_openqa, version, build, group_id) for group_id in group_ids}
+    issues = {group_id: _cache_get(AGGREGATED_BUILDS_CACHE, key) for group_id, key in cache_keys.items()}
+    query_group_ids = [group_id for group_id in group_ids if issues[group_id] is None]
+
+    if query_group_ids:
+        # check if there's a build with this name in any of the groups still pending
+        job_url = _get_openqa_build_url("all", url_openqa, version, build, query_group_ids)
+        # the overview pages are only fetched until a job of every group is found
+        job_ids = (job["id"] for job in _iter_json_pages(job_url, _reduce_openqa_job))
+        group_jobs = _get_group_jobs(url_openqa, job_ids, query_group_ids)
+        for group_id in query_group_ids:
+            issues[group_id] = sorted(_get_job_issues(group_jobs[group_id])) if group_id in group_jobs else []
+            _cache_set(
+                AGGREGATED_BUILDS_CACHE, cache_keys[group_id], issues[group_id], _get_aggregated_build_ttl(build)
+            )
+
+    return issues
+
+
+def _find_aggregated_builds(
+    incident_id: int,
+    version: str,
+    days: int,
+    group_ids: List[int],
+    url_openqa: str,
+    candidate_builds: Optional[List[str]] = None,
+    date_affinity: Optional[Dict[str, str]] = None,
+) -> Dict[int, str]:
+    """
+    Search back for the most recent aggregated updates builds testing an incident in several job groups at once
+
+    :param incident_id: incident ID
+    :param version: SLE version
+    :param days: how many days to search back for
+    :param group_ids: aggregated updates group IDs
+    :param url_openqa: openQA URL
+    :param candidate_builds: builds to look in (newest first), by default the usual build names of the last days
+    :param date_affinity: build date that first tested the incident in other searches keyed by openQA URL, it's
+        looked in at once with the newer builds and it's set here if not known yet
+    :return: build names keyed by group ID (groups without a build testing the incident are left out)
+    """
+    if candidate_builds is None:
+        candidate_builds = _get_aggregated_build_names(days)
+    if date_affinity is None:
+        date_affinity = {}
+
+    # the builds of a day are usually created for all the versions and groups together, so the date found by other
+    # searches most likely has the builds testing the incident too. A newer build could still test it, so the builds
+    # up to that date are looked in concurrently and the newest one testing the incident is taken as usual, the older
+    # ones are only looked in for the groups without a build testing it
+    preferred_date = date_affinity.get(url_openqa)
+    dates = [_get_aggregated_build_date(candidate) for candidate in candidate_builds]
+    started_builds: Dict[str, Future] = {}
+    if preferred_date in dates:
+        first_builds = candidate_builds[: len(dates) - dates[::-1].index(preferred_date)]
+        args_list = [(url_openqa, version, build, group_ids) for build in first_builds]
+        futures = _run_concurrently(_get_aggregated_build_issues, args_list, len(args_list))
+        started_builds = dict(zip(first_builds, futures))
+
+    builds: Dict[int, str] = {}
+    for build in candidate_builds:
+        pending_group_ids = [group_id for group_id in group_ids if group_id not in builds]
+        if not pending_group_ids:
+            break
+
+        if build in started_builds:
+            issues = started_builds[build].result()
+        else:
+            issues = _get_aggregated_build_issues(url_openqa, version, build, pending_group_ids)
+
+        # check if the groups builds for this date are testing the incident for this MU
+        for group_id in pending_group_ids:
+            if incident_id in issues[group_id]:
+                builds[group_id] = build
+                build_date = _get_aggregated_build_date(build)
+                if build_date is not None:
+                    date_affinity.setdefault(url_openqa, build_date)
+
+    return builds
+
+
+def _find_aggregated_job_results(
+    incident_id: int,
+    version: str,
+    days: int,
+    group_ids: List[int],
+    url_openqa: str,
+    candidate_builds: Optional[List[str]] = None,
+    date_affinity: Optional[Dict[str, str]] = None,
+) -> Dict[int, Tuple[str, Tuple[List[Dict], List[Dict]]]]:
+    """
+    Search for the aggregated updates builds testing an incident and query their job results
+
+    :param incident_id: incident ID
+    :param version: SLE version
+    :param days: how many days to search back for
+    :param group_ids: aggregated updates group IDs
+    :param url_openqa: openQA URL
+    :param candidate_builds: builds to look in (see _find_aggregated_builds)
+    :param date_affinity: build dates to look in first (see _find_aggregated_builds)
+    :return: build names and their job results (see _get_openqa_job_results) keyed by group ID
+    """
+    builds = _find_aggregated_builds(
+        incident_id,
+        version,
+        days,
+        group_ids,
+        url_openqa,
+        candidate_builds=candidate_builds,
+        date_affinity=date_affinity,
+    )
+
+    return {
+        group_id: (build, _get_openqa_job_results(url_openqa, version, build, group_id))
+        for group_id, build in builds.items()
+    }
+
+
+def single_incidents(
+    build: str,
+    versions: List[str],
+    url_openqa: Union[str, List[str]],
+    details: bool = False,
+    dashboard_results: Optional[Dict[Tuple[str, int], Tuple[List[Dict], List[Dict]]]] = None,
+) -> None:
+    """
+    Print the openQA job results under the Single Incidents - Core Incidents section for an update
+
+    :param build: build name
+    :param versions: SLE versions
+    :param url_openqa: openQA URL or list of them to search in concurrently
+    :param details: print the failed test suites and modules of failed builds
+    :param dashboard_results: job results of the first openQA instance already known from the QAM dashboard (see
+        _get_dashboard_job_results), openQA is queried for the rest
+    """
+    print_title("Single incidents - Core")
+    urls_openqa = _as_list(url_openqa)
+    # version check is already done in _get_group_id, the versions missing in some instances are only searched in the
+    # rest of them
+    group_ids = _get_instance_group_ids(versions, urls_openqa)
+    searches = [
+        (url, version, build, group_ids[url][version])
+        for version in versions
+        for url in urls_openqa
+        if version in group_ids[url]
+    ]
+
+    # the QAM dashboard only tracks the jobs of the main openQA instance
+    dashboard_results = dashboard_results or {}
+    known_results = {
+        search: _get_results_future(dashboard_results[(search[1], search[3])])
+        for search in searches
+        if search[0] == urls_openqa[0] and (search[1], search[3]) in dashboard_results
+    }
+
+    # query all the versions (and instances) concurrently, the requests of the results printed first are sent first
+    # (see _request_slot), every result is printed as soon as it and the ones before it are fetched. In gate mode the
+    # requests still outstanding after a failed one are cancelled (see _cancel_requests)
+    pending_searches = [search for search in searches if search not in known_results]
+    args_list = [
+        ((PRIORITY_SINGLE_INCIDENTS, searches.index(search)), _get_openqa_job_results) + search
+        for search in pending_searches
+    ]
+    futures = _run_concurrently(_call_with_priority, args_list, len(args_list))
+    known_results.update(zip(pending_searches, futures))
+
+    for version in versions:
+        for url in urls_openqa:
+            if version not in group_ids[url]:
+                print_warn("{} -> Not available in {}".format(version, url))
+                continue
+
+            search = (url, version, build, group_ids[url][version])
+            if search in known_results:
+                failed_results = _print_openqa_job_results(*search, known_results[search])
+            else:
+                failed_results = _print_openqa_job_results(*search)
+            if details and failed_results:
+                _print_failed_job_details(url, failed_results)
+
+
+def _get_aggregated_searches(
+    versions: List[str],
+    aggregated_groups: Union[str, List],
+    url_openqa: Union[str, List[str]],
+    dashboard_builds: Optional[Dict[str, List[str]]] = None,
+) -> Tuple[List[Tuple[str, str]], Dict[str, Dict[str, int]], Dict[Tuple[str, str], Optional[List[str]]]]:
+    """
+    Get the aggregated updates searches of an update, see aggregated_updates
+
+    :param versions: SLE versions with aggregated updates builds
+    :param aggregated_groups: groups under aggregated updates to search for builds in
+    :param url_openqa: openQA URL or list of them
+    :param dashboard_builds: builds of the first openQA instance known to include the incident from the QAM dashboard
+    :return: version and openQA URL of every search in output order, the group IDs of every URL keyed by group (the
+        groups missing in an instance are left out) and the builds to look in for every search (see
+        _find_aggregated_builds)
+    """
+    urls_openqa = _as_list(url_openqa)
+    searches = [(version, url) for version in versions for url in urls_openqa]
+    # all the selected groups are searched for at once for every version
+    group_ids = _get_instance_group_ids(_as_list(aggregated_groups), urls_openqa)
+    # the QAM dashboard only tracks the builds of the main openQA instance
+    candidate_builds = {
+        (version, url): (
+            dashboard_builds.get(version, []) if dashboard_builds is not None and url == urls_openqa[0] else None
+        )
+        for version, url in searches
+    }
+
+    return searches, group_ids, candidate_builds
+
+
+def _start_aggregated_searches(
+    incident_id: int,
+    versions: List[str],
+    days: int,
+    aggregated_groups: Union[str, List],
+    url_openqa: Union[str, List[str]],
+    dashboard_builds: Optional[Dict[str, List[str]]] = None,
+) -> Dict[Tuple[str, str], Future]:
+    """
+    Start searching for the aggregated updates builds of an update and their job results in the background, their
+    requests are sent after the ones of the single incidents (see _request_slot)
+
+    :param incident_id: incident ID
+    :param versions: SLE versions
+    :param days: how many days to search back for
+    :param aggregated_groups: groups under aggregated updates to search for builds in
+    :param url_openqa: openQA URL or list of them to search in concurrently
+    :param dashboard_builds: builds of the first openQA instance known to include the incident from the QAM dashboard
+    :return: futures of the results of _find_aggregated_job_results keyed by version and openQA URL
+    """
+    versions = [v for v in versions if not any(_ in v for _ in AGGREGATED_EXCLUDED_VERSIONS)]
+    searches, group_ids, candidate_builds = _get_aggregated_searches(
+        versions, aggregated_groups, url_openqa, dashboard_builds
+    )
+    # the date of the first build found testing the incident is looked in first by the next searches, so the versions
+    # are searched one after the other in every instance
+    date_affinity: Dict[str, str] = {}
+    args_list = [
+        (
+            (PRIORITY_AGGREGATED_UPDATES, n),
+            _find_aggregated_job_results,
+            incident_id,
+            version,
+            days,
+            list(group_ids[url].values()),
+            url,
+            candidate_builds[(version, url)],
+            date_affinity,
+        )
+        for n, (version, url) in enumerate(searches)
+    ]
+
+    return dict(zip(searches, _run_concurrently(_call_with_priority, args_list, len(_as_list(url_openqa)))))
+
+
+def aggregated_updates(
+    incident_id: int,
+    versions: List[str],
+    days: int,
+    aggregated_groups: Union[str, List],
+    url_openqa: Union[str, List[str]],
+    details: bool = False,
+    dashboard_builds: Optional[Dict[str, List[str]]] = None,
+    started_searches: Optional[Dict[Tuple[str, str], Future]] = None,
+) -> None:
+    """
+    Print the openQA job results under the Aggregated Updates section for an update
+
+    :param incident_id: incident ID
+    :param versions: SLE versions
+    :param days: how many days to search back for
+    :param aggregated_groups: groups under aggregated updates to search for builds in
+    :param url_openqa: openQA URL or list of them to search in concurrently
+    :param details: print the failed test suites and modules of failed builds
+    :param dashboard_builds: builds of the first openQA instance known to include the incident from the QAM dashboard
+        (see _get_dashboard_aggregated_builds), only those are looked in instead of the usual build names
+    :param started_searches: searches already started with the same arguments (see _start_aggregated_searches)
+    """
+    # no teradata or sle16 builds under aggregated updates
+    versions = [v for v in versions if not any(_ in v for _ in AGGREGATED_EXCLUDED_VERSIONS)]
+
+    if not versions:
+        print_warn("No aggregated updates builds available for this incident")
+        return
+
+    urls_openqa = _as_list(url_openqa)
+    searches, group_ids, _ = _get_aggregated_searches(versions, aggregated_groups, urls_openqa, dashboard_builds)
+
+    # search in the background and print every result as soon as it and the ones before it are found, in gate mode the
+    # searches still outstanding after a failed result are cancelled (see _cancel_requests)
+    futures = started_searches or _start_aggregated_searches(
+        incident_id, versions, days, aggregated_groups, urls_openqa, dashboard_builds
+    )
+
+    found: Dict[Tuple[str, str], Dict] = {}
+    for group in _as_list(aggregated_groups):
+        print_title("\nAggregated updates - {}".format(group.title()))
+        for version, url in searches:
+            group_id = group_ids[url].get(group)
+            if group_id is None:
+                print_warn("{} -> Not available in {}".format(version, url))
+                continue
+
+            try:
+                if (version, url) not in found:
+                    found[(version, url)] = futures[(version, url)].result()
+            except DeadlineExceeded:
+                # the remaining days can't be checked anymore
+                print_incomplete(version)
+                continue
+
+            if group_id not in found[(version, url)]:
+                print_warn(
+                    "{} -> No aggregated updates build for this incident in the last {} days".format(version, days)
+                )
+                _record_history(
+                    "openqa_results",
+                    url=url,
+                    section="aggregated",
+                    group_name=group,
+                    version=version,
+                    group_id=group_id,
+                    build=None,
+                    status="no build",
+                    running_jobs=0,
+                    failed_jobs=0,
+                )
+                _record_gate("no build")
+                continue
 
-def _is_name_matching(group: Dict, match_terms: List[str], excluded_terms: List[str]) -> bool:
-    """Check if group name matches criteria"""
-    group_name = group["name"]
-    return bool(any(_ in group_name for _ in match_terms) and not any(_ in group_name for _ in excluded_terms))
+            build, results = found[(version, url)][group_id]
+            failed_results = _print_openqa_job_results(
+                url, version, build, group_id, _get_results_future(results), group
+            )
+            if details and failed_results:
+                _print_failed_job_details(url, failed_results)
 
 
-def _extract_version(name: str) -> str:
+def _iter_log_lines(raw_lines: Iterable[bytes]) -> Iterator[str]:
     """
-    Extract SLE version from oQA job group names
+    Decode the lines of a build check log one at a time, split as str.splitlines would split the whole log
 
-    :param name: oQA job group name containing version
-    :return: formatted version string like "12-SP5" or "12-SP3-TERADATA"
+    :param raw_lines: raw log lines, split at new lines
+    :return: log lines
     """
-    # space separated format (e.g. 12 SP5)
-    match = re.search(r"(\d+)\s*SP\s*(\d+)(?:\s+TERADATA)?", name)
-    if match:
-        base_version = f"{match.group(1)}-SP{match.group(2)}"
-        return f"{base_version}-TERADATA" if "TERADATA" in name else base_version
+    for raw_line in raw_lines:
+        yield from raw_line.decode("utf-8", errors="replace").splitlines()
 
-    # if no match, use hyphen format (e.g. 12-SP3-TERADATA)
-    match = re.search(r"(\d+)-SP\d+(?:-TERADATA)?", name)
-    if match:
-        # return the full match (already meets the format)
-        return match.group(0)
 
-    # if no match, use dot versioning (e.g. 16.0)
-    match = re.search(r"(\d+\.\d+)", name)
-    if match:
-        # return the full match (already meets the format)
-        return match.group(0)
+def _iter_log_lines_reversed(mapped_file: mmap.mmap) -> Iterator[str]:
+    """
+    Decode the lines of a mapped build check log one at a time from its end, see _iter_log_lines
 
-    return ""
+    :param mapped_file: mapped log file
+    :return: log lines, from the last one to the first one
+    """
+    end = len(mapped_file)
+    while end > 0:
+        # the line ends with its new line, look for the one of the line before
+        start = mapped_file.rfind(b"\n", 0, end - 1) + 1
+        yield from reversed(mapped_file[start:end].decode("utf-8", errors="replace").splitlines())
+        end = start
 
 
-def _extract_aggregated_name(name: str) -> str:
-    for k, v in AGGREGATED_NAME_MAP.items():
-        if k in name:
-            return v
-    return name.split()[0].lower()
+def _has_suffix(name: str, suffixes: List[str]) -> bool:
+    return any(name.endswith(suffix) for suffix in suffixes)
 
 
-def _filter_openqa_groups(
-    match_text: List[str],
-    excluded_terms: List[str],
-    name_extractor: Callable,
-) -> Dict[str, int]:
+@contextmanager
+def _open_decompressed(log_file: BinaryIO, name: str) -> Iterator[BinaryIO]:
     """
-    Filter and transform OpenQA groups based on specified criteria.
-
-    Args:
-        match_text: Text to match in group names
-        excluded_terms: Terms to exclude from group names
-        name_extractor: Function to extract key from group name
+    Get the decompressed content of a local build check log (or archive), decompressing it on the fly if needed
 
-    Returns:
-        Dictionary mapping extracted names to group IDs
+    :param log_file: file opened in binary mode
+    :param name: file name, its suffix tells its compression
+    :return: file to read the decompressed content from
     """
-    return {
-        name_extractor(group["name"]): group["id"]
-        for group in _fetch_openqa_groups()
-        if _is_name_matching(group, match_text, excluded_terms) and _is_valid_template(group)
-    }
+    if _has_suffix(name, GZIP_SUFFIXES):
+        with gzip.GzipFile(fileobj=log_file) as decompressed_file:
+            yield decompressed_file
+    elif _has_suffix(name, ZSTD_SUFFIXES):
+        if zstandard is None:
+            raise ValueError("The zstandard package is needed to read {}".format(name))
+        with zstandard.ZstdDecompressor().stream_reader(log_file) as reader:
+            yield io.BufferedReader(reader)
+    else:
+        yield log_file
 
 
-def get_incident_groups():
+@contextmanager
+def _open_archive(path: str) -> Iterator[tarfile.TarFile]:
     """
-    Fetch oQA single incidents job group IDs
+    Open a tar archive as a stream, so compressed archives are only decompressed once while going through them
 
-    :return: dict of oQA single incidents job group IDs keyed by SLE version
+    :param path: archive path
+    :return: archive to iterate the members of
     """
-    return _filter_openqa_groups(SINGLE_INCIDENTS_TERMS, EXCLUDED_GROUPS, _extract_version)
+    with open(path, "rb") as archive_file:
+        if _has_suffix(path, ZSTD_SUFFIXES):
+            with _open_decompressed(archive_file, path) as reader, tarfile.open(fileobj=reader, mode="r|") as archive:
+                yield archive
+        else:
+            with tarfile.open(fileobj=archive_file, mode="r|*") as archive:
+                yield archive
 
 
-def get_aggregated_groups():
+def _extract_log(log_file: BinaryIO, name: str, temp_dir: str) -> str:
     """
-    Fetch aggregated updates job group IDs
+    Write the decompressed content of a local build check log (or archive member) to a temporary plain file, so it
+    can be mapped and read backward like the plain ones
 
-    :return: dict of oQA aggregated updates job group IDs keyed by SLE version
+    :param log_file: log file opened in binary mode
+    :param name: log file name, its suffix tells its compression
+    :param temp_dir: directory to write the plain log in, removed by the caller
+    :return: plain log path
     """
-    return _filter_openqa_groups(AGGREGATED_GROUPS_TERMS, EXCLUDED_GROUPS, _extract_aggregated_name)
+    fd, plain_path = tempfile.mkstemp(suffix=".log", dir=temp_dir)
+    with open(fd, "wb") as plain_file, _open_decompressed(log_file, name) as decompressed_file:
+        shutil.copyfileobj(decompressed_file, plain_file)
 
+    return plain_path
 
-# OPENQA JOB MANAGEMENT FUNCTIONS
-def _get_group_id(key: str) -> int:
+
+def _get_line_chunks(path: str, chunk_size: int) -> List[Tuple[int, int]]:
     """
-    Get the group ID for a given key
+    Split a plain log file in chunks of about the same size at line boundaries
 
-    :param key: SLE version for single incidents and job group for aggregated updates
-    :return: group ID
+    :param path: log path
+    :param chunk_size: minimum size of every chunk but the last one
+    :return: start and end offsets of every chunk, there's always at least one
     """
-    try:
-        # single incidents
-        return get_incident_groups()[key]
-    except KeyError:
-        try:
-            # aggregated updates
-            return get_aggregated_groups()[key]
-        except KeyError as e:
-            raise ValueError(
-                "Not a valid version (single incident) or group (aggregated updates): {}".format(key)
-            ) from e
+    size = os.path.getsize(path)
+    if not size:
+        return [(0, 0)]
 
+    chunks = []
+    with open(path, "rb") as log_file, mmap.mmap(log_file.fileno(), 0, access=mmap.ACCESS_READ) as mapped_file:
+        start = 0
+        while start < size:
+            newline = mapped_file.find(b"\n", min(start + chunk_size, size) - 1)
+            end = size if newline == -1 else newline + 1
+            chunks.append((start, end))
+            start = end
 
-def _get_openqa_job_issues(url_openqa: str, job_id: int) -> Set[int]:
-    """
-    Get all the test issues that are being tested in an openQA job
+    return chunks
 
-    :param url_openqa: openQA URL
-    :param job_id: openQA job ID
-    :return: set of issues tested in the openQA job
+
+def _scan_log_summary(path: str) -> Optional[List[str]]:
     """
-    issues_url = "{}/api/v1/jobs/{}".format(url_openqa, job_id)
-    issues_response = _get_json(issues_url)
+    Look for the test framework summary of a plain local build check log from its end, see extract_testsuite_summary
 
-    # check if the job is testing the incident for this MU
-    issues = []
-    for k, v in issues_response["job"]["settings"].items():
-        if "_TEST_ISSUES" in k.upper():
-            issues.extend([int(i) for i in v.split(",")])
+    :param path: log path
+    :return: summary lines, None if no known test framework summary was found
+    """
+    if not os.path.getsize(path):
+        return None
 
-    # remove duplicates
-    return set(issues)
+    # the page cache is read directly, without copying the log in memory
+    with open(path, "rb") as log_file, mmap.mmap(log_file.fileno(), 0, access=mmap.ACCESS_READ) as mapped_file:
+        return extract_testsuite_summary(_iter_log_lines_reversed(mapped_file))
 
 
-def _get_openqa_print_url(url_openqa: str, version: str, build: str, group_id: int) -> str:
+def _scan_log_file(path: str, start: int, end: int) -> List[str]:
     """
-    Get printable openQA url (not the API endpoint)
+    Scan a chunk of a plain local build check log of an unknown test framework for test results
 
-    :param url_openqa: openQA URL
-    :param version: SLE version
-    :param build: build name
-    :param group_id: group ID
-    :return: printable openQA URL
+    :param path: log path
+    :param start: offset of the first line to scan
+    :param end: offset after the last line to scan
+    :return: matched lines containing test results
     """
-    return "{}/tests/overview?distri=sle&version={}&build={}&groupid={}".format(url_openqa, version, build, group_id)
+    if start == end:
+        return []
+
+    with open(path, "rb") as log_file, mmap.mmap(log_file.fileno(), 0, access=mmap.ACCESS_READ) as mapped_file:
+        mapped_file.seek(start)
+        raw_lines = iter(mapped_file.readline, b"")
+        return extract_test_results_from_lines(
+            _iter_log_lines(takewhile(lambda _: mapped_file.tell() <= end, raw_lines))
+        )
 
 
-def _get_openqa_build_url(state: str, url_openqa: str, version: str, build: str, group_id: int) -> str:
+@lru_cache(maxsize=None)
+def _get_scan_pool(workers: int) -> ProcessPoolExecutor:
     """
-    Get the openQA build URL for a given version and build
+    Get the pool of processes the build checks logs are scanned in, shared by all the updates
 
-    :param state: job state (all, running, failed)
-    :param url_openqa: openQA URL
-    :param version: SLE version
-    :param build: build name
-    :param group_id: group ID
-    :return: job URL
+    :param workers: number of processes
+    :return: process pool
     """
-    if group_id not in [*get_aggregated_groups().values(), *get_incident_groups().values()]:
-        raise ValueError("Invalid openQA group ID")
-
-    base_url = "{}/api/v1/jobs/overview?distri=sle&version={}&build={}&groupid={}".format(
-        url_openqa, version, build, group_id
-    )
-
-    try:
-        return base_url + OQA_QUERY_STRINGS[state]
-    except KeyError as e:
-        raise ValueError("Invalid openQA job state") from e
+    return ProcessPoolExecutor(max_workers=workers)
 
 
-def _print_openqa_job_results(url_openqa: str, version: str, build: str, group_id: int) -> None:
+def _map_in_processes(tasks: Iterable[Tuple[Any, Callable, Tuple]], workers: int) -> Iterator[Tuple[Any, Any]]:
     """
-    Print the openQA job results for a given version and build
+    Call functions in a pool of processes and get their results in the same order they were called
 
-    :param url_openqa: openQA URL
-    :param version: SLE version
-    :param build: build name
-    :param group_id: group ID
+    :param tasks: key, function and positional arguments of every call, only consumed as the processes get free
+    :param workers: number of processes, the calls are made one after the other in this process if just one
+    :return: key and result of every call
     """
-    # workaround for error with 12-SP3-TERADATA openqa job url
-    version_oqa = "12-SP3" if version == "12-SP3-TERADATA" else version
+    if workers <= 1:
+        for key, func, args in tasks:
+            yield key, func(*args)
+        return
 
-    # print version and oQA build url
-    print("{} -> {}".format(version, _get_openqa_print_url(url_openqa, version_oqa, build, group_id)))
+    pool = _get_scan_pool(workers)
+    pending: Deque[Tuple[Any, Future]] = deque()
+    for key, func, args in tasks:
+        pending.append((key, pool.submit(func, *args)))
+        # only a few calls per process are queued, the tasks (e.g. read chunks) aren't all kept in memory
+        if len(pending) >= SCAN_QUEUED_PER_WORKER * workers:
+            key, future = pending.popleft()
+            yield key, future.result()
+    while pending:
+        key, future = pending.popleft()
+        yield key, future.result()
 
-    # query oQA build for any failed or running/scheduled jobs
-    running_url = _get_openqa_build_url("running", url_openqa, version_oqa, build, group_id)
-    failed_url = _get_openqa_build_url("failed", url_openqa, version_oqa, build, group_id)
 
-    running_results = _get_json(running_url)
-    failed_results = _get_json(failed_url)
+def _iter_plain_log_scan_tasks(log_path: str, plain_path: str) -> Iterator[Tuple[str, Callable, Tuple]]:
+    """
+    Get the scanning tasks of a plain local build check log
 
-    # print oQA build results
-    if failed_results:
-        print_ko("FAILED ({} jobs)".format(len(failed_results)))
-    elif running_results:
-        print_warn("RUNNING/SCHEDULED ({} jobs)".format(len(running_results)))
-    else:
-        print_ok("PASSED")
+    :param log_path: log path to report the results with
+    :param plain_path: plain log path
+    :return: log path, function and arguments to scan every chunk of the log, in order
+    """
+    # summaries are at the end, looking for them here is cheap, only the logs without any are shared to scan whole
+    summary = _scan_log_summary(plain_path)
+    if summary is not None:
+        yield log_path, list, (summary,)
+        return
+    for start, end in _get_line_chunks(plain_path, SCAN_CHUNK_SIZE):
+        yield log_path, _scan_log_file, (plain_path, start, end)
 
 
-# BUILD CHECKS FUNCTIONS
-def extract_test_results(log_text: str) -> List[str]:
+def _iter_log_scan_tasks(
+    path: str, update_dir: str, log_pattern: Pattern, temp_dir: str
+) -> Iterator[Tuple[str, Callable, Tuple]]:
     """
-    Extract test results from build check logs
-    Only include lines that have standalone numbers and test related keywords while
-    excluding blocked words
+    Get the scanning tasks of the build checks logs of an update in a local mirror of the QAM test reports
 
-    :param log_text: log text content to search through
-    :return: list of matched lines containing test results
+    :param path: test reports directory or tar archive (see _scan_local_build_checks)
+    :param update_dir: build checks directory of the update
+    :param log_pattern: pattern of the update logs names (without compression suffixes)
+    :param temp_dir: directory to decompress the compressed logs and the archive members in
+    :return: log path, function and arguments to scan every chunk of every log, in order
     """
-    matches = []
-    for line in log_text.splitlines():
-        # remove timestamp
-        lower = line.lower().split("]")[1]
-        # skip if it has no standalone numbers
-        if not TESTSUITE_NUMBERS_PATTERN.search(lower):
-            continue
-        if any(blocked_word in lower for blocked_word in TESTSUITE_WORDS_BLOCKLIST):
-            continue
-        if any(word in lower for word in TESTSUITE_WORDS):
-            matches.append(line)
+    compression_pattern = re.compile("({})$".format("|".join(re.escape(i) for i in GZIP_SUFFIXES + ZSTD_SUFFIXES)))
+
+    if os.path.isdir(path):
+        logs_dir = os.path.join(path, update_dir)
+        names = sorted(os.listdir(logs_dir)) if os.path.isdir(logs_dir) else []
+        for name in names:
+            if not log_pattern.fullmatch(compression_pattern.sub("", name)):
+                continue
+            log_path = os.path.join(logs_dir, name)
+            plain_path = log_path
+            if compression_pattern.search(name):
+                with open(log_path, "rb") as log_file:
+                    plain_path = _extract_log(log_file, name, temp_dir)
+            yield from _iter_plain_log_scan_tasks(log_path, plain_path)
+        return
 
-    return matches
+    # the archive is only read in this process, its logs are extracted to be scanned like the plain ones
+    with _open_archive(path) as archive:
+        for member in archive:
+            directory, name = posixpath.split(member.name)
+            if (
+                member.isfile()
+                and directory.endswith(update_dir)
+                and log_pattern.fullmatch(compression_pattern.sub("", name))
+            ):
+                plain_path = _extract_log(archive.extractfile(member), name, temp_dir)
+                yield from _iter_plain_log_scan_tasks("{}:{}".format(path, member.name), plain_path)
+
+
+def _scan_local_build_checks(
+    path: str, product: str, incident_id: int, request_id: int, package_name: str, workers: int = 1
+) -> Iterator[Tuple[str, List[str]]]:
+    """
+    Scan the build checks logs of an update in a local mirror of the QAM test reports
 
+    :param path: test reports directory (with SUSE:<product>:<incident>:<request>/build_checks directories inside) or
+        a tar archive of it
+    :param product: product
+    :param incident_id: incident ID
+    :param request_id: request ID
+    :param package_name: package name
+    :param workers: processes to scan the logs in, big logs without a known summary are split in chunks at line
+        boundaries to share them
+    :return: paths of the logs (archive members after the archive path) and their test results
+    """
+    update_dir = "SUSE:{}:{}:{}/build_checks".format(product, incident_id, request_id)
+    log_pattern = re.compile("{}{}".format(package_name, LOGFILE_REGEX_PATTERN))
+
+    # the results of the chunks of every log come one after the other, the extracted logs are kept until all are done
+    with tempfile.TemporaryDirectory(prefix="oqa-search-") as temp_dir:
+        log_path, matches = None, []
+        for chunk_log_path, chunk_matches in _map_in_processes(
+            _iter_log_scan_tasks(path, update_dir, log_pattern, temp_dir), workers
+        ):
+            if chunk_log_path != log_path:
+                if log_path is not None:
+                    yield log_path, matches
+                log_path, matches = chunk_log_path, []
+            matches.extend(chunk_matches)
+        if log_path is not None:
+            yield log_path, matches
+
+
+def _record_build_checks(log: str, matches: List[str]) -> None:
+    """
+    Keep the test results of a build check log in the results history
 
-# MAIN FEATURE FUNCTIONS
-def single_incidents(build: str, versions: List[str], url_openqa: str) -> None:
+    :param log: log URL or local path
+    :param matches: test results lines
     """
-    Print the openQA job results under the Single Incidents - Core Incidents section for an update
+    failed = any(TESTSUITE_FAILURE_PATTERN.search(line.split("]", 1)[-1].strip()) for line in matches)
+    _record_history("build_checks", log=log, failed=int(failed), results="\n".join(matches))
+    _record_gate("failed" if failed else "passed")
 
-    :param build: build name
-    :param versions: SLE versions
-    :param url_openqa: openQA URL
+
+def _get_build_checks(
+    product: str, incident_id: int, request_id: int, package_name: str, url_qam: str
+) -> List[Tuple[str, Optional[List[str]]]]:
     """
-    print_title("Single incidents - Core")
+    Download the build checks logs of the update and look for their test results
 
-    for version in versions:
-        # version check is already done in _get_group_id
-        _print_openqa_job_results(url_openqa, version, build, _get_group_id(version))
+    :param product: product
+    :param incident_id: incident ID
+    :param request_id: request ID
+    :param package_name: package name
+    :param url_qam: qam url
+    :return: log URLs and their test results (see extract_test_results), None for the logs not downloaded in time
+    :raises DeadlineExceeded: if not even the logs index could be downloaded in time
+    """
+    base_url = "{}/testreports/SUSE:{}:{}:{}/build_checks".format(url_qam, product, incident_id, request_id)
 
+    # check if any build checks were run by looking for logs
+    text = _get_log_text(base_url)
+    logfiles = set(re.findall("{}{}".format(package_name, LOGFILE_REGEX_PATTERN), text, re.MULTILINE))
 
-def aggregated_updates(
-    incident_id: int, versions: List[str], days: int, aggregated_groups: Union[str, List], url_openqa: str
-) -> None:
+    results: List[Tuple[str, Optional[List[str]]]] = []
+    for log in logfiles:
+        log_url = "{}/{}".format(base_url, log)
+        try:
+            log_text = _get_log_text(log_url)
+        except DeadlineExceeded:
+            results.append((log_url, None))
+            continue
+
+        # check for testsuite results
+        results.append((log_url, extract_test_results(log_text)))
+
+    return results
+
+
+def _start_build_checks(product: str, incident_id: int, request_id: int, build: str, url_qam: str) -> Future:
     """
-    Print the openQA job results under the Aggregated Updates section for an update
+    Start downloading the build checks logs of the update in the background, their requests are sent after the ones of
+    all the openQA results (see _request_slot)
 
+    :param product: product
     :param incident_id: incident ID
-    :param versions: SLE versions
-    :param days: how many days to search back for
-    :param aggregated_groups: groups under aggregated updates to search for builds in
-    :param url_openqa: openQA URL
+    :param request_id: request ID
+    :param build: build name
+    :param url_qam: qam url
+    :return: future of the results of _get_build_checks
     """
-    # no teradata or sle16 builds under aggregated updates
-    versions = [v for v in versions if not any(_ in v for _ in AGGREGATED_EXCLUDED_VERSIONS)]
-
-    if not versions:
-        print_warn("No aggregated updates builds available for this incident")
-        return
-    for group in aggregated_groups:
-        print_title("\nAggregated updates - {}".format(group.title()))
-        for version in versions:
-            for i in range(days):
-                # check if there's a build for this date
-                build = "{}-1".format((datetime.now() - timedelta(i)).strftime("%Y%m%d"))
-                job_url = _get_openqa_build_url("all", url_openqa, version, build, _get_group_id(group))
+    args = ((PRIORITY_BUILD_CHECKS,), _get_build_checks, product, incident_id, request_id, build.split(":")[2], url_qam)
 
-                try:
-                    # build for this date available
-                    # check if it's testing the incident for this MU
-                    job_id = _get_json(job_url)[0]["id"]
-                    issues = _get_openqa_job_issues(url_openqa, job_id)
-
-                    if incident_id in issues:
-                        _print_openqa_job_results(url_openqa, version, build, _get_group_id(group))
-                        break
-                    else:
-                        # this build does not test the incident for this MU
-                        continue
-                except IndexError:
-                    # no build for this date yet
-                    continue
-            else:
-                print_warn(
-                    "{} -> No aggregated updates build for this incident in the last {} days".format(version, days)
-                )
+    return _run_concurrently(_call_with_priority, [args], 1)[0]
 
 
-def build_checks(product: str, incident_id: int, request_id: int, build: str, url_qam: str) -> None:
+def build_checks(
+    product: str,
+    incident_id: int,
+    request_id: int,
+    build: str,
+    url_qam: str,
+    build_checks_dir: Optional[str] = None,
+    scan_workers: int = 1,
+    started_build_checks: Optional[Future] = None,
+) -> None:
     """
     Print the link and results of any build checks available for the update
 
@@ -560,48 +3682,314 @@ def build_checks(product: str, incident_id: int, request_id: int, build: str, ur
     :param request_id: request ID
     :param build: build name
     :param url_qam: qam url
+    :param build_checks_dir: local mirror of the QAM test reports to read the logs from instead (see
+        _scan_local_build_checks)
+    :param scan_workers: processes to scan the local logs in, 0 for one per CPU
+    :param started_build_checks: logs download already started (see _start_build_checks)
     """
     print_title("\nBuild checks:\n#############")
     package_name = build.split(":")[2]
-    base_url = "{}/testreports/SUSE:{}:{}:{}/build_checks".format(url_qam, product, incident_id, request_id)
-
-    # check if any build checks were run by looking for logs
-    text = _get_log_text(base_url)
-    logfiles = set(re.findall("{}{}".format(package_name, LOGFILE_REGEX_PATTERN), text, re.MULTILINE))
 
-    if logfiles:
-        for log in logfiles:
-            # print log url
-            log_url = "{}/{}".format(base_url, log)
-            log_text = _get_log_text(log_url)
-            print(log_url)
+    if build_checks_dir:
+        try:
+            workers = scan_workers or os.cpu_count() or 1
+            local_results = list(
+                _scan_local_build_checks(build_checks_dir, product, incident_id, request_id, package_name, workers)
+            )
+        except (OSError, ValueError, tarfile.TarError) as e:
+            print_warn("Could not read the build checks in {}: {}".format(build_checks_dir, e))
+            return
 
-            # check for testsuite results
-            matches = extract_test_results(log_text)
+        for log_path, matches in local_results:
+            print(log_path)
             print("\n".join(matches), "\n")
-    else:
+            _record_build_checks(log_path, matches)
+        if not local_results:
+            print("No build checks for this incident")
+        return
+
+    try:
+        if started_build_checks is not None:
+            results = started_build_checks.result()
+        else:
+            results = _get_build_checks(product, incident_id, request_id, package_name, url_qam)
+    except DeadlineExceeded:
+        print_incomplete()
+        return
+
+    for log_url, matches in results:
+        # print log url
+        print(log_url)
+        if matches is None:
+            print_incomplete()
+            continue
+
+        print("\n".join(matches), "\n")
+        _record_build_checks(log_url, matches)
+    if not results:
         print("No build checks for this incident")
 
 
-def main():
-    args = _parser(argv[1:])
+def search_update(update_id: str, args: argparse.Namespace) -> None:
+    """
+    Print the openQA results and build checks of an update
 
+    :param update_id: update ID
+    :param args: parsed command line arguments
+    """
     # get RR and II
-    product, incident_id, request_id = _parse_update_id(args.update_id)
+    product, incident_id, request_id = _parse_update_id(update_id)
+    effective_incident_id = _get_effective_incident_id(incident_id, request_id)
     print_title("OpenQA:\n#######")
     # get build name and versions
-    build, versions = _get_incident_info(args.url_dashboard_qam, _get_effective_incident_id(incident_id, request_id))
-    if versions:
-        single_incidents(build, versions, args.url_openqa)
-        if not args.no_aggregated:
-            print("-------")
-            aggregated_updates(incident_id, versions, args.days, args.aggregated_groups, args.url_openqa)
-    else:
-        print_warn("No openQA builds for this incident yet")
+    try:
+        build, versions = _get_incident_info(args.url_dashboard_qam, effective_incident_id)
+    except DeadlineExceeded:
+        # without the incident settings there's nothing else to look for
+        print_incomplete()
+        print("-------")
+        print_title("\nBuild checks:\n#############")
+        print_incomplete()
+        return
+
+    # the sections printed later are fetched in the background meanwhile, their requests are only sent when the ones
+    # of the sections printed before leave a free slot (see _request_slot). In gate mode whatever is still outstanding
+    # after a failed result is cancelled (see _cancel_requests)
+    started_searches = None
+    started_build_checks = None
+    if versions and not args.no_aggregated and args.backend == "openqa":
+        started_searches = _start_aggregated_searches(
+            incident_id, versions, args.days, args.aggregated_groups, args.url_openqa
+        )
+    if not args.build_checks_dir:
+        started_build_checks = _start_build_checks(product, incident_id, request_id, build, args.url_qam)
+
+    try:
+        if versions:
+            dashboard_results = None
+            if args.backend == "dashboard":
+                dashboard_results = _get_dashboard_job_results(args.url_dashboard_qam, effective_incident_id)
+            single_incidents(build, versions, args.url_openqa, args.details, dashboard_results)
+            if not args.no_aggregated:
+                print("-------")
+                dashboard_builds = None
+                if args.backend == "dashboard":
+                    dashboard_builds = _get_dashboard_aggregated_builds(
+                        args.url_dashboard_qam, effective_incident_id, args.days
+                    )
+                aggregated_updates(
+                    incident_id,
+                    versions,
+                    args.days,
+                    args.aggregated_groups,
+                    args.url_openqa,
+                    args.details,
+                    dashboard_builds,
+                    started_searches,
+                )
+        else:
+            print_warn("No openQA builds for this incident yet")
+            _record_gate("no build")
+
+        print("-------")
+        build_checks(
+            product,
+            incident_id,
+            request_id,
+            build,
+            args.url_qam,
+            args.build_checks_dir,
+            args.scan_workers,
+            started_build_checks,
+        )
+    except GateFailed:
+        # the background searches are given up before saving what was found
+        _cancel_requests()
+        raise
+    finally:
+        # what was found is kept even if the search stopped early (see --gate)
+        _save_caches()
+        _save_history("SUSE:{}:{}:{}".format(product, incident_id, request_id))
+        _save_snapshot()
+
+
+def search_changed_update(update_id: str, args: argparse.Namespace) -> bool:
+    """
+    Print the openQA results and build checks of an update (see search_update), unless nothing they depend on changed
+    since its last search with final results. The fingerprint of the update is kept in the cache if its results are
+    final
+
+    :param update_id: update ID
+    :param args: parsed command line arguments
+    :return: whether the update was searched, it's skipped if unchanged
+    """
+    global _update_builds
+    last_search = _cache_get(FINGERPRINTS_CACHE, update_id)
+    try:
+        fingerprint = _get_update_fingerprint(update_id, args, last_search and last_search["fingerprint"])
+        jobs = None if last_search is None else _get_jobs_fingerprint(last_search["builds"])
+        if last_search is not None and fingerprint == last_search["fingerprint"] and jobs == last_search["jobs"]:
+            searched_at = datetime.fromtimestamp(last_search["searched_at"]).strftime("%Y-%m-%d %H:%M")
+            text = "Unchanged since its search on {} ({}), skipped".format(
+                searched_at, ", ".join(last_search["statuses"])
+            )
+            if "failed" in last_search["statuses"]:
+                print_ko(text)
+            elif "no build" in last_search["statuses"]:
+                print_warn(text)
+            else:
+                print_ok(text)
+            for status in last_search["statuses"]:
+                _record_gate(status)
+            return False
+    except (requests.RequestException, ValueError, DeadlineExceeded):
+        # can't tell, searched again as usual
+        fingerprint = jobs = None
+
+    if last_search is not None:
+        # the cached results of the builds with new jobs (e.g. restarted ones) are out of date
+        for url_openqa, version, build, group_id in last_search["builds"]:
+            key = " ".join([url_openqa, version, build])
+            if jobs is None or jobs.get(key) != last_search["jobs"].get(key):
+                _cache_delete(BUILD_RESULTS_CACHE, _get_build_cache_key(url_openqa, version, build, group_id))
+
+    _update_builds = []
+    _update_statuses.clear()
+    try:
+        search_update(update_id, args)
+        if fingerprint is None or not _update_statuses.issubset(FINAL_STATUSES):
+            return True
+        try:
+            last_search = {
+                "fingerprint": fingerprint,
+                "builds": _update_builds,
+                "jobs": _get_jobs_fingerprint(_update_builds),
+                "statuses": sorted(_update_statuses),
+                "searched_at": time.time(),
+            }
+        except (requests.RequestException, ValueError, DeadlineExceeded):
+            return True
+        _cache_set(FINGERPRINTS_CACHE, update_id, last_search, FINGERPRINTS_TTL)
+        _save_caches()
+    finally:
+        _update_builds = None
+
+    return True
+
+
+def _print_gate_result() -> int:
+    """
+    Print the result of the --gate mode
 
+    :return: exit code (see GATE_EXIT_CODES)
+    """
+    exit_code = _get_gate_exit_code()
+    status = next((status for status, code in GATE_EXIT_CODES.items() if code == exit_code), "passed")
     print("-------")
-    build_checks(product, incident_id, request_id, build, args.url_qam)
+    if exit_code == 0:
+        print_ok("GATE: PASSED")
+    elif status == "failed":
+        print_ko("GATE: FAILED")
+    else:
+        print_warn("GATE: {}".format(status.upper()))
+
+    return exit_code
+
+
+def main() -> Optional[int]:
+    if argv[1:2] == ["query"]:
+        print_history(_query_parser(argv[2:]))
+        return None
+    if argv[1:2] == ["proxy"]:
+        serve_proxy(_proxy_parser(argv[2:]))
+        return None
+
+    prefetching = argv[1:2] == ["prefetch"]
+    parser_args = argv[2:] if prefetching else argv[1:]
+
+    # start the clock before parsing, the job groups needed to validate the arguments count towards the deadline (and
+    # are recorded in or answered from the snapshot)
+    early_parser = argparse.ArgumentParser(add_help=False, allow_abbrev=False)
+    early_parser.add_argument("--deadline", type=float, default=None)
+    early_parser.add_argument("--gate", action="store_true")
+    early_parser.add_argument("--snapshot", type=str, default=None)
+    early_parser.add_argument("--offline", type=_check_path, default=None)
+    early_parser.add_argument("--http2", action="store_true")
+    early_parser.add_argument("--profile", type=str, default=None)
+    early_args = early_parser.parse_known_args(parser_args)[0]
+    if early_args.profile is not None:
+        set_profile(early_args.profile)
+    try:
+        return _run(parser_args, prefetching, early_parser, early_args)
+    finally:
+        _save_profile()
+
+
+def _run(
+    parser_args: List[str], prefetching: bool, early_parser: argparse.ArgumentParser, early_args: argparse.Namespace
+) -> Optional[int]:
+    """
+    Run a search (or prefetch) from its command line arguments
+
+    :param parser_args: command line arguments
+    :param prefetching: run the prefetch command
+    :param early_parser: parser of the arguments needed before parsing the rest (see main)
+    :param early_args: arguments parsed by early_parser
+    :return: exit code of the --gate mode, None otherwise
+    """
+    set_deadline(early_args.deadline)
+    set_gate(early_args.gate and not prefetching)
+    if early_args.http2 and httpx is None:
+        early_parser.error(HTTP2_MISSING_TEXT)
+    set_http2(early_args.http2)
+    try:
+        if prefetching and early_args.snapshot is not None:
+            set_snapshot(early_args.snapshot)
+        elif not prefetching and early_args.offline is not None:
+            set_snapshot(early_args.offline, offline=True)
+    except (OSError, sqlite3.Error) as e:
+        early_parser.error("Could not use the snapshot: {}".format(e))
+
+    try:
+        args = _parser(parser_args, prefetching)
+    except DeadlineExceeded:
+        print_incomplete()
+        return _print_gate_result() if early_args.gate else None
+
+    if prefetching:
+        prefetch(args)
+        return None
+
+    # the cached results are shared by all the updates. The snapshots are prefetched without the cache, so offline
+    # runs don't use it either: they'd ask for what it needs (e.g. checking the cached results) instead
+    set_cache_dir(None if args.no_cache or args.offline else args.cache_dir)
+    set_history_db(None if args.no_history else args.history_db)
+
+    update_ids = _as_list(args.update_id)
+    set_job_summary(args.summary)
+    skipped_ids = []
+    try:
+        for n, update_id in enumerate(update_ids):
+            if len(update_ids) > 1:
+                print_title("{}{}\n{}".format("\n" if n else "", update_id, "=" * len(update_id)))
+            if not args.changed_only:
+                search_update(update_id, args)
+            elif not search_changed_update(update_id, args):
+                skipped_ids.append(update_id)
+    except GateFailed:
+        # the failed result is definitive, whatever is still being fetched can't change it
+        _cancel_requests()
+    if skipped_ids:
+        print_title(
+            "\nSkipped {} of {} updates, unchanged since their last search:".format(len(skipped_ids), len(update_ids))
+        )
+        print("\n".join(skipped_ids))
+    if args.summary:
+        print_job_summary()
+        set_job_summary(False)
+
+    return _print_gate_result() if args.gate else None
 
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
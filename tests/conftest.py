@@ -1,5 +1,10 @@
 from glob import iglob
-from typing import Dict, List, Optional
+from typing import Callable, Dict, List, Optional
+
+import mock
+import pytest
+
+from oqa_search import oqa_search
 
 MOCK_URL = "https://fake.test.url"
 
@@ -53,14 +58,44 @@ def mock_openqa_job_json(issues: str, **kwargs) -> Dict[str, Dict]:
     return {"job": {"settings": {"BASE_TEST_ISSUES": issues, **kwargs}}}
 
 
+def mock_openqa_group_job(group_id: int, issues: str, **kwargs) -> Dict:
+    return {"id": group_id, "group_id": group_id, "state": "done", **mock_openqa_job_json(issues, **kwargs)["job"]}
+
+
 def mock_openqa_job_results(jobs: int) -> List[Dict[str, str]]:
     return [{"id": i, "name": "somejob-{}".format(i)} for i in range(jobs)]
 
 
+def mock_openqa_job_details(
+    id: int, test: str = "sometest", state: str = "done", result: str = "failed", failed_modules: List[str] = []
+) -> Dict:
+    modules = [{"name": "boot", "result": "passed"}] + [{"name": m, "result": "failed"} for m in failed_modules]
+    return {"id": id, "test": test, "state": state, "result": result, "modules": modules}
+
+
 def mock_openqa_job_group(id: int = 123, name: str = "somename", template: str = "sometemplate"):
     return {"id": id, "name": name, "template": template}
 
 
+def mock_dashboard_job_json(
+    job_id: int, version: str, group_id: int, status: str = "passed", flavor: str = "Server-DVD-Incidents", **kwargs
+) -> Dict:
+    return {
+        "job_id": job_id,
+        "name": "somejob-{}".format(job_id),
+        "version": version,
+        "flavor": flavor,
+        "group_id": group_id,
+        "status": status,
+        "obsolete": False,
+        **kwargs,
+    }
+
+
+def mock_dashboard_update_settings_json(build: str, version: str, distri: str = "sle") -> Dict:
+    return {"build": build, "settings": {"DISTRI": distri, "VERSION": version}}
+
+
 def mock_build_checks_index(package: str) -> str:
     path = "tests/fixtures/{}_build_checks_index.html".format(package)
 
@@ -93,3 +128,38 @@ def get_expected_log_matches(package: str) -> List[List[str]]:
     logs_text = [open(path, "r").read().splitlines() for path in paths]
 
     return logs_text
+
+
+def _reset_main() -> None:
+    # everything a run keeps in memory for the next ones in the same process or leaves set
+    oqa_search._fetch_openqa_groups.cache_clear()
+    oqa_search._finished_jobs.clear()
+    oqa_search.set_cache_dir(None)
+    oqa_search.set_history_db(None)
+    oqa_search.set_snapshot(None)
+    oqa_search.set_job_summary(False)
+    oqa_search.set_deadline(None)
+    oqa_search.set_gate(False)
+    oqa_search.set_http2(False)
+
+
+@pytest.fixture
+def run_main() -> Callable[..., Optional[int]]:
+    """
+    Run the command line like a new process, only the files written by the runs before (cache, history, snapshots...)
+    are kept. The given server URL (e.g. of a FakeServer) is used for openQA, the QAM dashboard and QAM
+    """
+
+    def run(args: List[str], server_url: Optional[str] = None) -> Optional[int]:
+        argv = ["oqa-search"] + args
+        if server_url is not None:
+            for option in ["--url-openqa", "--url-dashboard-qam", "--url-qam"]:
+                argv.extend([option, server_url])
+        _reset_main()
+        try:
+            with mock.patch("oqa_search.oqa_search.argv", argv):
+                return oqa_search.main()
+        finally:
+            _reset_main()
+
+    return run
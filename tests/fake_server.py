@@ -0,0 +1,580 @@
+"""
+Synthetic stand-in for the openQA, QAM dashboard and QAM servers, all served from the same local URL
+
+The data is generated from a few scale parameters (job groups, versions, jobs per build, log sizes...) so the whole
+tool can be run against it at any scale, with some latency and error rate injected if needed. It can be served over
+HTTPS (with a self signed certificate made by the openssl command) and over HTTP/2 (with the h2 package).
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import random
+import re
+import ssl
+import subprocess
+import tempfile
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, unquote, urlparse
+
+try:
+    import h2.config
+    import h2.connection
+    import h2.events
+    import h2.exceptions
+except ImportError:
+    # only needed to serve over HTTP/2
+    h2 = None
+
+FAKE_AGGREGATED_GROUPS = ["Core", "Containers", "YaST", "Security"]
+
+FAKE_LOG_ARCHS = ["x86_64", "aarch64", "s390x", "ppc64le"]
+
+# other incidents tested along with the searched one in the aggregated updates builds
+FAKE_OTHER_ISSUES = "11111,22222,33333"
+
+
+class FakeServer:
+    """
+    Local HTTP server answering the openQA, QAM dashboard and QAM requests made for a single update
+
+    The requests answered are counted by endpoint in `requests` and the bytes sent for them in `bytes_sent`, the
+    connections the clients opened in `connections`.
+    """
+
+    def __init__(
+        self,
+        groups: int = 50,
+        versions: int = 2,
+        aggregated_day: Optional[int] = 1,
+        jobs_per_build: int = 10,
+        failed_jobs: int = 1,
+        running_jobs: int = 0,
+        template_size: int = 200,
+        logs: int = 1,
+        log_size: int = 16 * 1024,
+        latency: float = 0.0,
+        stall: float = 0.0,
+        error_rate: float = 0.0,
+        incident_id: int = 12345,
+        request_id: int = 67890,
+        package: str = "foo",
+        seed: int = 0,
+        tls: bool = False,
+        http2: bool = False,
+    ):
+        """
+        :param groups: job groups in the openQA instance, besides the single incidents and aggregated updates ones
+        :param versions: SLE versions affected by the incident (15-SP0, 15-SP1...)
+        :param aggregated_day: days back of the aggregated updates builds including the incident, None for no build
+        :param jobs_per_build: jobs of every build in every job group
+        :param failed_jobs: failed jobs of every build, the build checks logs have a failed test too if any
+        :param running_jobs: running jobs of every build
+        :param template_size: size of every job group template
+        :param logs: build checks logs of the update
+        :param log_size: size of every build checks log
+        :param latency: seconds to wait before answering every request
+        :param stall: seconds every build checks log stalls for in the middle of its body (HTTP/1.1 only)
+        :param error_rate: ratio of requests answered with a server error
+        :param incident_id: incident ID of the update
+        :param request_id: request ID of the update
+        :param package: package of the update
+        :param seed: seed of the injected errors
+        :param tls: serve over HTTPS, the clients have to trust `cert_file`
+        :param http2: serve over HTTPS and HTTP/2 only (no HTTP/1.1 offered)
+        """
+        self.groups = groups
+        self.versions = ["15-SP{}".format(i) for i in range(versions)]
+        self.jobs_per_build = jobs_per_build
+        self.failed_jobs = failed_jobs
+        self.running_jobs = running_jobs
+        self.template_size = template_size
+        self.logs = logs
+        self.log_size = log_size
+        self.latency = latency
+        self.stall = stall
+        self.error_rate = error_rate
+        self.incident_id = incident_id
+        self.request_id = request_id
+        self.package = package
+        self.build = ":{}:{}".format(incident_id, package)
+        self.aggregated_build = (
+            None
+            if aggregated_day is None
+            else "{}-1".format((datetime.now() - timedelta(aggregated_day)).strftime("%Y%m%d"))
+        )
+        self.tls = tls or http2
+        self.http2 = http2
+        self.requests: Counter = Counter()
+        self.bytes_sent: Counter = Counter()
+        self.connections = 0
+        self.cert_file: Optional[str] = None
+
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        # jobs keyed by ID and the job IDs of every build keyed by version, build and group ID, made when first asked
+        self._jobs: Dict[int, Dict] = {}
+        self._build_jobs: Dict[Tuple[str, str, int], List[int]] = {}
+        self._incident_group_ids = {version: 10000 + i for i, version in enumerate(self.versions)}
+        self._aggregated_group_ids = [20000 + i for i in range(len(FAKE_AGGREGATED_GROUPS))]
+        self._routes = [
+            (re.compile(r"^/api/v1/job_groups$"), "job_groups", self._job_groups),
+            (re.compile(r"^/api/v1/jobs/overview$"), "jobs_overview", self._jobs_overview),
+            (re.compile(r"^/api/v1/jobs$"), "jobs", self._jobs_details),
+            (re.compile(r"^/api/v1/jobs/(\d+)$"), "job", self._job),
+            (re.compile(r"^/api/incident_settings/(\d+)$"), "incident_settings", self._incident_settings),
+            (re.compile(r"^/api/incidents/(\d+)$"), "incidents", self._incidents),
+            (re.compile(r"^/api/jobs/incident/(\d+)$"), "dashboard_jobs", self._dashboard_jobs),
+            (re.compile(r"^/api/update_settings/(\d+)$"), "update_settings", self._update_settings),
+            (re.compile(r"^/testreports/[^/]+/build_checks/?$"), "build_checks_index", self._build_checks_index),
+            (re.compile(r"^/testreports/[^/]+/build_checks/([^/]+)$"), "build_checks_log", self._build_checks_log),
+        ]
+        self._cache: Dict[str, bytes] = {}
+        self._server: Optional[ThreadingHTTPServer] = None
+        self._address: Optional[Tuple[str, int]] = None
+        self._temp_dir: Optional[tempfile.TemporaryDirectory] = None
+        # the HTTP/2 streams are answered in threads of their own, like the HTTP/1.1 requests
+        self._http2_loop: Optional[asyncio.AbstractEventLoop] = None
+        self._http2_thread: Optional[threading.Thread] = None
+        self._http2_executor: Optional[ThreadPoolExecutor] = None
+
+    @property
+    def url(self) -> str:
+        assert self._address, "The server isn't running"
+        return "{}://{}:{}".format("https" if self.tls else "http", *self._address)
+
+    @property
+    def log_names(self) -> List[str]:
+        return [
+            "{}-testsuite{}.SUSE_SLE-15_Update.{}.log".format(self.package, n // len(FAKE_LOG_ARCHS) or "", arch)
+            for n, arch in zip(range(self.logs), FAKE_LOG_ARCHS * self.logs)
+        ]
+
+    def start(self) -> "FakeServer":
+        ssl_context = self._make_ssl_context() if self.tls else None
+        if self.http2:
+            self._start_http2(ssl_context)
+            return self
+
+        handler = type("FakeHandler", (_FakeHandler,), {"fake": self})
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+        self._server.daemon_threads = True
+        if ssl_context:
+            self._server.socket = ssl_context.wrap_socket(self._server.socket, server_side=True)
+        self._address = self._server.server_address[:2]
+        threading.Thread(target=self._server.serve_forever, args=(0.05,), daemon=True).start()
+        return self
+
+    def stop(self) -> None:
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+        if self._http2_loop:
+            self._http2_loop.call_soon_threadsafe(self._http2_loop.stop)
+            self._http2_thread.join()
+            self._http2_executor.shutdown(wait=False)
+        if self._temp_dir:
+            self._temp_dir.cleanup()
+
+    def __enter__(self) -> "FakeServer":
+        return self.start()
+
+    def __exit__(self, *_) -> None:
+        self.stop()
+
+    def answer(self, url: str, if_none_match: Optional[str] = None) -> Tuple[int, Dict[str, str], bytes]:
+        """
+        Get the answer to a request
+
+        :param url: requested path and query
+        :param if_none_match: ETag of the version of the resource the client has, if any
+        :return: status code, headers (but the content length) and body
+        """
+        if self.latency:
+            time.sleep(self.latency)
+
+        parsed_url = urlparse(url)
+        for pattern, endpoint, get_body in self._routes:
+            match = pattern.match(unquote(parsed_url.path))
+            if match:
+                break
+        else:
+            return 404, {"Content-Type": "text/plain"}, b"Not found"
+
+        with self._lock:
+            self.requests[endpoint] += 1
+            failed = self._random.random() < self.error_rate
+        if failed:
+            return 503, {"Content-Type": "text/plain"}, b"Service unavailable"
+
+        body = get_body(*match.groups(), query=parse_qs(parsed_url.query))
+        content_type = "application/json"
+        if endpoint == "build_checks_index":
+            content_type = "text/html"
+        elif endpoint == "build_checks_log":
+            content_type = "text/plain; charset=utf-8"
+        if not isinstance(body, bytes):
+            body = json.dumps(body).encode()
+        headers = {"Content-Type": content_type}
+        if endpoint == "build_checks_index":
+            # like the static files of the QAM server, the logs index is tagged and only sent again if it changed
+            headers["ETag"] = '"{}"'.format(hashlib.sha1(body).hexdigest()[:16])
+            if if_none_match == headers["ETag"]:
+                return 304, headers, b""
+
+        with self._lock:
+            self.bytes_sent[endpoint] += len(body)
+
+        return 200, headers, body
+
+    def stalls(self, url: str) -> bool:
+        """
+        Whether the body of the answer to a request stalls in the middle (see `stall`)
+
+        :param url: requested path and query
+        """
+        return bool(self.stall) and bool(re.match(r"^/testreports/[^/]+/build_checks/[^/]+$", urlparse(url).path))
+
+    def restart_job(self, job_id: int) -> int:
+        """
+        Restart a job like openQA does: a clone of it takes its place in its build, scheduled
+
+        :param job_id: ID of the job to restart
+        :return: ID of the new job
+        """
+        with self._lock:
+            job = self._jobs[job_id]
+            clone = {**job, "id": len(self._jobs) + 1, "state": "scheduled", "result": "none"}
+            self._jobs[clone["id"]] = clone
+            for job_ids in self._build_jobs.values():
+                if job_id in job_ids:
+                    job_ids[job_ids.index(job_id)] = clone["id"]
+            return clone["id"]
+
+    def count_connection(self) -> None:
+        with self._lock:
+            self.connections += 1
+
+    def _make_ssl_context(self) -> ssl.SSLContext:
+        self._temp_dir = tempfile.TemporaryDirectory(prefix="fake-server-")
+        self.cert_file = os.path.join(self._temp_dir.name, "cert.pem")
+        key_file = os.path.join(self._temp_dir.name, "key.pem")
+        subprocess.run(
+            ["openssl", "req", "-x509", "-newkey", "ec", "-pkeyopt", "ec_paramgen_curve:prime256v1", "-nodes"]
+            + ["-keyout", key_file, "-out", self.cert_file, "-days", "1", "-subj", "/CN=127.0.0.1"]
+            + ["-addext", "subjectAltName=IP:127.0.0.1"],
+            check=True,
+            capture_output=True,
+        )
+        context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+        context.load_cert_chain(self.cert_file, key_file)
+        context.set_alpn_protocols(["h2" if self.http2 else "http/1.1"])
+        return context
+
+    def _start_http2(self, ssl_context: ssl.SSLContext) -> None:
+        assert h2, "The h2 package is needed to serve over HTTP/2"
+        self._http2_executor = ThreadPoolExecutor(max_workers=64)
+        self._http2_loop = asyncio.new_event_loop()
+        server = self._http2_loop.run_until_complete(
+            self._http2_loop.create_server(lambda: _FakeHTTP2Protocol(self), "127.0.0.1", 0, ssl=ssl_context)
+        )
+        self._address = server.sockets[0].getsockname()[:2]
+
+        def serve() -> None:
+            asyncio.set_event_loop(self._http2_loop)
+            self._http2_loop.run_forever()
+            server.close()
+            # the streams still being answered are given up
+            tasks = asyncio.all_tasks(self._http2_loop)
+            for task in tasks:
+                task.cancel()
+            self._http2_loop.run_until_complete(asyncio.gather(*tasks, return_exceptions=True))
+            self._http2_loop.close()
+
+        self._http2_thread = threading.Thread(target=serve, daemon=True)
+        self._http2_thread.start()
+
+    def _cached(self, key: str, make) -> bytes:
+        with self._lock:
+            if key not in self._cache:
+                self._cache[key] = make()
+            return self._cache[key]
+
+    def _get_build_jobs(self, version: str, build: str, group_id: int) -> List[int]:
+        with self._lock:
+            key = (version, build, group_id)
+            if key not in self._build_jobs:
+                self._build_jobs[key] = []
+                for n in range(self.jobs_per_build):
+                    job = self._make_job(len(self._jobs) + 1, n, version, build, group_id)
+                    self._jobs[job["id"]] = job
+                    self._build_jobs[key].append(job["id"])
+            return self._build_jobs[key]
+
+    def _make_job(self, job_id: int, n: int, version: str, build: str, group_id: int) -> Dict:
+        if n < self.failed_jobs:
+            state, result = "done", "failed"
+        elif n < self.failed_jobs + self.running_jobs:
+            state, result = "running", "none"
+        else:
+            state, result = "done", "passed"
+
+        settings = {"BUILD": build, "DISTRI": "sle", "VERSION": version}
+        if build == self.build:
+            settings["INCIDENT_ID"] = str(self.incident_id)
+            settings["BASE_TEST_ISSUES"] = str(self.incident_id)
+        elif build == self.aggregated_build:
+            settings["OS_TEST_ISSUES"] = "{},{}".format(FAKE_OTHER_ISSUES, self.incident_id)
+        else:
+            settings["OS_TEST_ISSUES"] = FAKE_OTHER_ISSUES
+
+        test = "mau-test{}".format(n)
+        modules = [{"name": "boot", "result": "passed"}, {"name": "module{}".format(n), "result": result}]
+        return {
+            "id": job_id,
+            "name": "sle-{}-Server-DVD-x86_64-Build{}-{}@64bit".format(version, build, test),
+            "test": test,
+            "group_id": group_id,
+            "state": state,
+            "result": result,
+            "settings": settings,
+            "modules": modules,
+        }
+
+    def _builds_in_group(self, version: str, build: str, group_id: int) -> bool:
+        if version not in self.versions:
+            return False
+        if group_id in self._aggregated_group_ids:
+            return bool(re.match(r"^\d{8}-\d+$", build))
+        return group_id == self._incident_group_ids[version] and build == self.build
+
+    # OPENQA ENDPOINTS
+    def _job_groups(self, query) -> bytes:
+        template = "scenarios:\n" + "x" * self.template_size
+        groups = [
+            {"id": group_id, "name": "Maintenance: SLE 15 SP{} Core Incidents".format(version.split("SP")[1])}
+            for version, group_id in self._incident_group_ids.items()
+        ]
+        groups.extend(
+            {"id": group_id, "name": "{} Maintenance Updates".format(name)}
+            for name, group_id in zip(FAKE_AGGREGATED_GROUPS, self._aggregated_group_ids)
+        )
+        groups.extend({"id": 30000 + n, "name": "Development group {}".format(n)} for n in range(self.groups))
+        return self._cached(
+            "job_groups",
+            lambda: json.dumps(
+                [{**group, "template": template, "description": group["name"]} for group in groups]
+            ).encode(),
+        )
+
+    def _jobs_overview(self, query) -> List[Dict]:
+        version, build = query["version"][0], query["build"][0]
+        jobs = []
+        for group_id in (int(i) for i in query.get("groupid", [])):
+            if self._builds_in_group(version, build, group_id):
+                jobs.extend(self._jobs[i] for i in self._get_build_jobs(version, build, group_id))
+
+        jobs = [
+            {"id": job["id"], "name": job["name"]}
+            for job in jobs
+            if ("result" not in query or job["result"] in query["result"])
+            and ("state" not in query or job["state"] in query["state"])
+        ]
+        if "limit" in query:
+            offset = int(query.get("offset", ["0"])[0])
+            jobs = jobs[offset : offset + int(query["limit"][0])]
+
+        return jobs
+
+    def _jobs_details(self, query) -> Dict[str, List[Dict]]:
+        job_ids = [int(i) for i in query["ids"][0].split(",")]
+        return {"jobs": [self._jobs[i] for i in job_ids if i in self._jobs]}
+
+    def _job(self, job_id: str, query) -> Dict[str, Dict]:
+        return {"job": self._jobs[int(job_id)]}
+
+    # QAM DASHBOARD ENDPOINTS
+    def _incident_settings(self, incident_id: str, query) -> List[Dict]:
+        if int(incident_id) != self.incident_id:
+            return []
+        return [
+            {"version": version, "flavor": "Server-DVD-Incidents", "settings": {"BUILD": self.build, "DISTRI": "sle"}}
+            for version in self.versions
+        ]
+
+    def _incidents(self, incident_id: str, query) -> Dict[str, List[str]]:
+        return {"packages": [self.package]}
+
+    def _dashboard_jobs(self, incident_id: str, query) -> List[Dict]:
+        if int(incident_id) != self.incident_id:
+            return []
+        jobs = []
+        for version, group_id in self._incident_group_ids.items():
+            for job_id in self._get_build_jobs(version, self.build, group_id):
+                job = self._jobs[job_id]
+                jobs.append(
+                    {
+                        "job_id": job_id,
+                        "name": job["name"],
+                        "version": version,
+                        "flavor": "Server-DVD-Incidents",
+                        "group_id": group_id,
+                        "status": job["result"] if job["state"] == "done" else job["state"],
+                        "obsolete": False,
+                    }
+                )
+        return jobs
+
+    def _update_settings(self, incident_id: str, query) -> List[Dict]:
+        if int(incident_id) != self.incident_id or not self.aggregated_build:
+            return []
+        return [
+            {"build": self.aggregated_build, "settings": {"DISTRI": "sle", "VERSION": version}}
+            for version in self.versions
+        ]
+
+    # QAM ENDPOINTS
+    def _build_checks_index(self, query) -> bytes:
+        links = "".join(
+            '<a href="{0}">{0}</a>   13-Nov-2024 17:06   {1}\n'.format(log, self.log_size) for log in self.log_names
+        )
+        return '<html><body><pre><a href="../">../</a>\n{}</pre></body></html>'.format(links).encode()
+
+    def _build_checks_log(self, log: str, query) -> bytes:
+        if log not in self.log_names:
+            return b""
+        return self._cached("log", self._make_log)
+
+    def _make_log(self) -> bytes:
+        lines = []
+        size, n = 0, 0
+        while size < self.log_size:
+            line = "[{:>6}s] compiling src/file{}.c".format(n // 100, n)
+            lines.append(line)
+            size += len(line) + 1
+            n += 1
+        failed = int(self.failed_jobs > 0)
+        lines.extend(
+            [
+                "[{:>6}s] # TOTAL: 100".format(n),
+                "[{:>6}s] # PASS:  {}".format(n, 100 - failed),
+                "[{:>6}s] # FAIL:  {}".format(n, failed),
+            ]
+        )
+        return "\n".join(lines).encode()
+
+
+class _FakeHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # headers and body are written separately, don't wait for the client acks in between
+    disable_nagle_algorithm = True
+    fake: FakeServer
+
+    def setup(self) -> None:
+        super().setup()
+        self.fake.count_connection()
+
+    def do_GET(self) -> None:
+        status, headers, body = self.fake.answer(self.path, self.headers.get("If-None-Match"))
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if self.fake.stalls(self.path):
+            self.wfile.write(body[: len(body) // 2])
+            self.wfile.flush()
+            time.sleep(self.fake.stall)
+            body = body[len(body) // 2 :]
+        self.wfile.write(body)
+
+    def log_message(self, *_) -> None:
+        # keep the test and benchmark output clean
+        pass
+
+
+class _FakeHTTP2Protocol(asyncio.Protocol):
+    """HTTP/2 connection to the fake server, all its streams are answered at once"""
+
+    def __init__(self, fake: FakeServer):
+        self.fake = fake
+        self.connection = h2.connection.H2Connection(
+            config=h2.config.H2Configuration(client_side=False, header_encoding="utf-8")
+        )
+        self.transport: Optional[asyncio.Transport] = None
+        # streams waiting for the client to open their flow control window
+        self.window_waiters: Dict[int, asyncio.Future] = {}
+
+    def connection_made(self, transport: asyncio.Transport) -> None:
+        self.fake.count_connection()
+        self.transport = transport
+        self.connection.initiate_connection()
+        transport.write(self.connection.data_to_send())
+
+    def connection_lost(self, exc: Optional[Exception]) -> None:
+        for waiter in self.window_waiters.values():
+            waiter.cancel()
+
+    def data_received(self, data: bytes) -> None:
+        try:
+            events = self.connection.receive_data(data)
+        except h2.exceptions.ProtocolError:
+            self.transport.write(self.connection.data_to_send())
+            self.transport.close()
+            return
+
+        for event in events:
+            if isinstance(event, h2.events.RequestReceived):
+                asyncio.ensure_future(self._answer(event.stream_id, dict(event.headers)))
+            elif isinstance(event, h2.events.WindowUpdated):
+                for stream_id, waiter in self.window_waiters.items():
+                    if event.stream_id in (0, stream_id) and not waiter.done():
+                        waiter.set_result(None)
+            elif isinstance(event, h2.events.StreamReset) and event.stream_id in self.window_waiters:
+                self.window_waiters[event.stream_id].cancel()
+            elif isinstance(event, h2.events.ConnectionTerminated):
+                self.transport.close()
+        self.transport.write(self.connection.data_to_send())
+
+    async def _answer(self, stream_id: int, request_headers: Dict[str, str]) -> None:
+        loop = asyncio.get_event_loop()
+        try:
+            status, response_headers, body = await loop.run_in_executor(
+                self.fake._http2_executor,
+                self.fake.answer,
+                request_headers[":path"],
+                request_headers.get("if-none-match"),
+            )
+        except Exception:
+            # unlike the HTTP/1.1 connection, the HTTP/2 one is still used by the other streams
+            status, response_headers, body = 500, {"Content-Type": "text/plain"}, b"Internal server error"
+        headers = [(":status", str(status))] + [(name.lower(), value) for name, value in response_headers.items()]
+        headers.append(("content-length", str(len(body))))
+        try:
+            self.connection.send_headers(stream_id, headers, end_stream=not body)
+            self.transport.write(self.connection.data_to_send())
+            view, offset = memoryview(body), 0
+            while offset < len(body):
+                window = self.connection.local_flow_control_window(stream_id)
+                if window < 1:
+                    waiter = self.window_waiters[stream_id] = loop.create_future()
+                    try:
+                        await waiter
+                    finally:
+                        del self.window_waiters[stream_id]
+                    continue
+                size = min(window, len(body) - offset, self.connection.max_outbound_frame_size)
+                end_stream = offset + size == len(body)
+                self.connection.send_data(stream_id, bytes(view[offset : offset + size]), end_stream=end_stream)
+                self.transport.write(self.connection.data_to_send())
+                offset += size
+        except (h2.exceptions.StreamClosedError, asyncio.CancelledError):
+            # the client went away or gave up on the stream
+            pass
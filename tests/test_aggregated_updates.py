@@ -4,7 +4,28 @@ import mock
 import pytest
 
 from oqa_search import oqa_search
-from tests.conftest import MOCK_AGGREGATED_GROUPS, MOCK_URL, mock_openqa_job_results
+from tests.conftest import (
+    MOCK_AGGREGATED_GROUPS,
+    MOCK_INCIDENT_GROUPS,
+    MOCK_URL,
+    mock_dashboard_update_settings_json,
+    mock_openqa_group_job,
+    mock_openqa_job_results,
+)
+
+
+def _mock_tested_issues(mock_get_json, mock_get_group_jobs, builds, tested_issues):
+    """Mock the probes of aggregated updates builds, tested_issues keyed by build (index) and group ID"""
+    # the overview of every build has a single job, with the build index as ID
+    mock_get_json.side_effect = lambda url, _: [{"id": builds.index(url.split("&build=")[1].split("&")[0])}]
+
+    def get_group_jobs(url, job_ids, group_ids):
+        issues = tested_issues.get(next(iter(job_ids)), {})
+        return {
+            group_id: mock_openqa_group_job(group_id, issues[group_id]) for group_id in group_ids if group_id in issues
+        }
+
+    mock_get_group_jobs.side_effect = get_group_jobs
 
 
 @pytest.mark.parametrize(
@@ -16,27 +37,30 @@ from tests.conftest import MOCK_AGGREGATED_GROUPS, MOCK_URL, mock_openqa_job_res
     ],
 )
 @mock.patch("oqa_search.oqa_search._print_openqa_job_results")
-@mock.patch("oqa_search.oqa_search._get_openqa_job_issues")
+@mock.patch("oqa_search.oqa_search._get_openqa_job_results")
+@mock.patch("oqa_search.oqa_search._get_group_jobs")
 @mock.patch("oqa_search.oqa_search._get_json")
+@mock.patch("oqa_search.oqa_search.get_incident_groups")
 @mock.patch("oqa_search.oqa_search.get_aggregated_groups")
 def test_aggregated_updates(
     mock_get_aggregated_groups,
+    mock_get_incident_groups,
     mock_get_json,
-    mock_get_openqa_job_issues,
+    mock_get_group_jobs,
+    mock_get_openqa_job_results,
     mock_print_openqa_job_results,
     versions,
     days,
     aggregated_groups,
 ):
     actual_versions = [v for v in versions if "TERADATA" not in v]
-    mock_get_json.return_value = mock_openqa_job_results(1)
-    mock_issues = []
-    for _ in range(len(aggregated_groups) * len(actual_versions)):
-        for i in range(days - 1):
-            mock_issues.append([i])
-        mock_issues.append([12345])
-    mock_get_openqa_job_issues.side_effect = mock_issues
+    group_ids = [MOCK_AGGREGATED_GROUPS[group] for group in aggregated_groups]
+    builds = ["{}-1".format((datetime.now() - timedelta(i)).strftime("%Y%m%d")) for i in range(days)]
+    # only the oldest build tests the incident
+    tested_issues = {i: {group_id: "12345" if i == days - 1 else str(i) for group_id in group_ids} for i in range(days)}
+    _mock_tested_issues(mock_get_json, mock_get_group_jobs, builds, tested_issues)
     mock_get_aggregated_groups.return_value = MOCK_AGGREGATED_GROUPS
+    mock_get_incident_groups.return_value = MOCK_INCIDENT_GROUPS
 
     oqa_search.aggregated_updates(12345, versions, days, aggregated_groups, MOCK_URL)
 
@@ -46,6 +70,8 @@ def test_aggregated_updates(
             version,
             "{}-1".format((datetime.now() - timedelta(days - 1)).strftime("%Y%m%d")),
             MOCK_AGGREGATED_GROUPS[group],
+            mock.ANY,
+            group,
         )
         for version in actual_versions
         for group in aggregated_groups
@@ -53,6 +79,13 @@ def test_aggregated_updates(
     mock_print_openqa_job_results.assert_has_calls(calls, any_order=True)
     expected_call_count = len(aggregated_groups) * len(actual_versions)
     assert mock_print_openqa_job_results.call_count == expected_call_count
+    # the job results are fetched in the background before being printed
+    assert mock_get_openqa_job_results.call_count == expected_call_count
+    assert [c.args[4].result() for c in mock_print_openqa_job_results.call_args_list] == [
+        mock_get_openqa_job_results.return_value
+    ] * expected_call_count
+    # all the groups are queried at once, the newer builds are looked in too
+    assert mock_get_json.call_count == days * len(actual_versions)
 
 
 @mock.patch("oqa_search.oqa_search._print_openqa_job_results")
@@ -63,19 +96,23 @@ def test_aggregated_updates_teradata_versions_only(mock_print_openqa_job_results
 
 @mock.patch("oqa_search.oqa_search.print_warn")
 @mock.patch("oqa_search.oqa_search._print_openqa_job_results")
-@mock.patch("oqa_search.oqa_search._get_openqa_job_issues")
+@mock.patch("oqa_search.oqa_search._get_group_jobs")
 @mock.patch("oqa_search.oqa_search._get_json")
+@mock.patch("oqa_search.oqa_search.get_incident_groups")
 @mock.patch("oqa_search.oqa_search.get_aggregated_groups")
 def test_aggregated_updates_no_builds(
     mock_get_aggregated_groups,
+    mock_get_incident_groups,
     mock_get_json,
-    mock_get_openqa_job_issues,
+    mock_get_group_jobs,
     mock_print_openqa_job_results,
     mock_print_warn,
 ):
+    core_id = MOCK_AGGREGATED_GROUPS["core"]
     mock_get_json.return_value = mock_openqa_job_results(1)
-    mock_get_openqa_job_issues.side_effect = [[i] for i in range(5)]
+    mock_get_group_jobs.side_effect = [{core_id: mock_openqa_group_job(core_id, str(i))} for i in range(5)]
     mock_get_aggregated_groups.return_value = MOCK_AGGREGATED_GROUPS
+    mock_get_incident_groups.return_value = MOCK_INCIDENT_GROUPS
     oqa_search.aggregated_updates(12345, ["15-SP4"], 5, ["core"], MOCK_URL)
 
     mock_print_openqa_job_results.assert_not_called()
@@ -83,3 +120,287 @@ def test_aggregated_updates_no_builds(
     mock_print_warn.assert_has_calls(
         [mock.call("15-SP4 -> No aggregated updates build for this incident in the last 5 days")]
     )
+
+
+@mock.patch("oqa_search.oqa_search.print_warn")
+@mock.patch("oqa_search.oqa_search._print_openqa_job_results")
+@mock.patch("oqa_search.oqa_search._get_json")
+@mock.patch("oqa_search.oqa_search.get_incident_groups")
+@mock.patch("oqa_search.oqa_search.get_aggregated_groups")
+def test_aggregated_updates_deadline(
+    mock_get_aggregated_groups, mock_get_incident_groups, mock_get_json, mock_print_openqa_job_results, mock_print_warn
+):
+    mock_get_json.side_effect = oqa_search.DeadlineExceeded()
+    mock_get_aggregated_groups.return_value = MOCK_AGGREGATED_GROUPS
+    mock_get_incident_groups.return_value = MOCK_INCIDENT_GROUPS
+    oqa_search.aggregated_updates(12345, ["15-SP4", "15-SP5"], 5, ["core"], MOCK_URL)
+
+    mock_print_openqa_job_results.assert_not_called()
+    mock_print_warn.assert_has_calls(
+        [mock.call("{} -> {}".format(v, oqa_search.INCOMPLETE_TEXT)) for v in ["15-SP4", "15-SP5"]]
+    )
+    assert mock_print_warn.call_count == 2
+
+
+@mock.patch("oqa_search.oqa_search.print_title")
+@mock.patch("oqa_search.oqa_search.print_ok")
+@mock.patch("oqa_search.oqa_search.print_warn")
+@mock.patch("oqa_search.oqa_search.print")
+@mock.patch("oqa_search.oqa_search._find_aggregated_builds")
+@mock.patch("oqa_search.oqa_search._get_openqa_job_results")
+@mock.patch("oqa_search.oqa_search.get_incident_groups")
+@mock.patch("oqa_search.oqa_search.get_aggregated_groups")
+def test_aggregated_updates_multiple_instances(
+    mock_get_aggregated_groups,
+    mock_get_incident_groups,
+    mock_get_openqa_job_results,
+    mock_find_aggregated_builds,
+    mock_print,
+    mock_print_warn,
+    mock_print_ok,
+    mock_print_title,
+):
+    staging_url = "https://fake.staging.url"
+    mock_get_aggregated_groups.return_value = MOCK_AGGREGATED_GROUPS
+    mock_get_incident_groups.return_value = MOCK_INCIDENT_GROUPS
+    mock_get_openqa_job_results.return_value = ([], [])
+    # only the main instance has a build testing the incident
+    mock_find_aggregated_builds.side_effect = lambda *args, **kwargs: (
+        {MOCK_AGGREGATED_GROUPS["core"]: "20241120-1"} if args[-1] == MOCK_URL else {}
+    )
+
+    oqa_search.aggregated_updates(12345, ["15-SP5", "15-SP6"], 5, ["core"], [MOCK_URL, staging_url])
+
+    assert mock_print.call_args_list == [
+        mock.call(
+            "{} -> {}/tests/overview?distri=sle&version={}&build=20241120-1&groupid={}".format(
+                v, MOCK_URL, v, MOCK_AGGREGATED_GROUPS["core"]
+            )
+        )
+        for v in ["15-SP5", "15-SP6"]
+    ]
+    assert mock_print_ok.call_count == 2
+    assert mock_print_warn.call_args_list == [
+        mock.call("{} -> No aggregated updates build for this incident in the last 5 days".format(v))
+        for v in ["15-SP5", "15-SP6"]
+    ]
+
+
+@mock.patch("oqa_search.oqa_search.print_title")
+@mock.patch("oqa_search.oqa_search.print_warn")
+@mock.patch("oqa_search.oqa_search._print_openqa_job_results")
+@mock.patch("oqa_search.oqa_search._find_aggregated_job_results")
+@mock.patch("oqa_search.oqa_search.get_incident_groups")
+@mock.patch("oqa_search.oqa_search.get_aggregated_groups")
+def test_aggregated_updates_missing_in_instance(
+    mock_get_aggregated_groups,
+    mock_get_incident_groups,
+    mock_find_aggregated_job_results,
+    mock_print_openqa_job_results,
+    mock_print_warn,
+    mock_print_title,
+):
+    staging_url = "https://fake.staging.url"
+    # the staging group is only in the staging instance, which has no core group
+    mock_get_aggregated_groups.side_effect = lambda url: (
+        {"staging": 123} if url == staging_url else MOCK_AGGREGATED_GROUPS
+    )
+    mock_get_incident_groups.return_value = {}
+    mock_find_aggregated_job_results.side_effect = lambda incident_id, version, days, group_ids, url, *_: {
+        group_id: ("20241120-1", ([], [])) for group_id in group_ids
+    }
+
+    oqa_search.aggregated_updates(12345, ["15-SP5"], 5, ["core", "staging"], [MOCK_URL, staging_url])
+
+    # every instance is only searched for its own groups
+    assert [c.args[3] for c in mock_find_aggregated_job_results.call_args_list] == [
+        [MOCK_AGGREGATED_GROUPS["core"]],
+        [123],
+    ]
+    assert [c.args[:4] for c in mock_print_openqa_job_results.call_args_list] == [
+        (MOCK_URL, "15-SP5", "20241120-1", MOCK_AGGREGATED_GROUPS["core"]),
+        (staging_url, "15-SP5", "20241120-1", 123),
+    ]
+    assert mock_print_warn.call_args_list == [
+        mock.call("15-SP5 -> Not available in {}".format(staging_url)),
+        mock.call("15-SP5 -> Not available in {}".format(MOCK_URL)),
+    ]
+
+
+@mock.patch("oqa_search.oqa_search._get_openqa_jobs")
+def test_get_group_jobs(mock_get_openqa_jobs):
+    core_id, yast_id = MOCK_AGGREGATED_GROUPS["core"], MOCK_AGGREGATED_GROUPS["yast"]
+    job_ids = list(range(oqa_search.OQA_JOBS_BATCH_SIZE * 3))
+    mock_get_openqa_jobs.side_effect = lambda url, ids: [
+        {"id": i, "group_id": core_id if i % 2 else yast_id, "settings": {}} for i in ids
+    ]
+
+    group_jobs = oqa_search._get_group_jobs(MOCK_URL, job_ids, [core_id, yast_id])
+
+    assert group_jobs == {
+        core_id: {"id": 1, "group_id": core_id, "settings": {}},
+        yast_id: {"id": 0, "group_id": yast_id, "settings": {}},
+    }
+    # a job per group is asked for first, no need to look any further once every group is found
+    mock_get_openqa_jobs.assert_called_once_with(MOCK_URL, job_ids[:2])
+
+    # a single group needs a single job
+    mock_get_openqa_jobs.reset_mock()
+    assert oqa_search._get_group_jobs(MOCK_URL, job_ids, [yast_id]) == {
+        yast_id: {"id": 0, "group_id": yast_id, "settings": {}}
+    }
+    mock_get_openqa_jobs.assert_called_once_with(MOCK_URL, job_ids[:1])
+
+    # full batches once a group is missing in the first jobs
+    mock_get_openqa_jobs.reset_mock()
+    group_jobs = oqa_search._get_group_jobs(MOCK_URL, job_ids, [core_id, 999])
+    assert group_jobs == {core_id: {"id": 1, "group_id": core_id, "settings": {}}}
+    batch_sizes = [len(c.args[1]) for c in mock_get_openqa_jobs.call_args_list]
+    assert batch_sizes == [2, 50, 50, 48]
+
+
+@mock.patch("oqa_search.oqa_search._get_json")
+def test_get_dashboard_aggregated_builds(mock_get_json):
+    today = datetime.now().strftime("%Y%m%d")
+    yesterday = (datetime.now() - timedelta(1)).strftime("%Y%m%d")
+    too_old = (datetime.now() - timedelta(5)).strftime("%Y%m%d")
+    mock_get_json.return_value = [
+        mock_dashboard_update_settings_json("{}-1".format(yesterday), "15-SP6"),
+        mock_dashboard_update_settings_json("{}-2".format(today), "15-SP6"),
+        mock_dashboard_update_settings_json("{}-2".format(today), "15-SP6"),
+        mock_dashboard_update_settings_json("{}-1".format(today), "15-SP5"),
+        mock_dashboard_update_settings_json("{}-1".format(too_old), "15-SP5"),
+        mock_dashboard_update_settings_json("{}-1".format(today), "15-SP6", distri="sle-micro"),
+        mock_dashboard_update_settings_json(":12345:foo", "15-SP6"),
+    ]
+
+    assert oqa_search._get_dashboard_aggregated_builds(MOCK_URL, 12345, 5) == {
+        "15-SP6": ["{}-2".format(today), "{}-1".format(yesterday)],
+        "15-SP5": ["{}-1".format(today)],
+    }
+    mock_get_json.assert_called_once_with("{}/api/update_settings/12345".format(MOCK_URL))
+
+    # the usual build names are searched for when the dashboard isn't available
+    mock_get_json.side_effect = oqa_search.requests.ConnectionError
+    assert oqa_search._get_dashboard_aggregated_builds(MOCK_URL, 12345, 5) is None
+
+
+@mock.patch("oqa_search.oqa_search._print_openqa_job_results")
+@mock.patch("oqa_search.oqa_search._get_openqa_job_results")
+@mock.patch("oqa_search.oqa_search._get_group_jobs")
+@mock.patch("oqa_search.oqa_search._get_json")
+@mock.patch("oqa_search.oqa_search.get_incident_groups")
+@mock.patch("oqa_search.oqa_search.get_aggregated_groups")
+def test_aggregated_updates_dashboard_builds(
+    mock_get_aggregated_groups,
+    mock_get_incident_groups,
+    mock_get_json,
+    mock_get_group_jobs,
+    mock_get_openqa_job_results,
+    mock_print_openqa_job_results,
+):
+    core_id = MOCK_AGGREGATED_GROUPS["core"]
+    mock_get_aggregated_groups.return_value = MOCK_AGGREGATED_GROUPS
+    mock_get_incident_groups.return_value = MOCK_INCIDENT_GROUPS
+    mock_get_json.return_value = mock_openqa_job_results(1)
+    mock_get_group_jobs.return_value = {core_id: mock_openqa_group_job(core_id, "12345")}
+
+    oqa_search.aggregated_updates(
+        12345, ["15-SP5", "15-SP6"], 5, ["core"], MOCK_URL, dashboard_builds={"15-SP6": ["20241120-2"]}
+    )
+
+    # only the build known to the dashboard is queried, versions missing in the dashboard aren't searched for
+    mock_get_json.assert_called_once()
+    assert "&build=20241120-2&" in mock_get_json.call_args[0][0]
+    mock_print_openqa_job_results.assert_called_once_with(MOCK_URL, "15-SP6", "20241120-2", core_id, mock.ANY, "core")
+    mock_get_openqa_job_results.assert_called_once_with(MOCK_URL, "15-SP6", "20241120-2", core_id)
+
+
+@mock.patch("oqa_search.oqa_search._get_group_jobs")
+@mock.patch("oqa_search.oqa_search._get_json")
+@mock.patch("oqa_search.oqa_search.get_incident_groups")
+@mock.patch("oqa_search.oqa_search.get_aggregated_groups")
+def test_find_aggregated_builds_cache(
+    mock_get_aggregated_groups, mock_get_incident_groups, mock_get_json, mock_get_group_jobs, tmp_path
+):
+    core_id, yast_id = MOCK_AGGREGATED_GROUPS["core"], MOCK_AGGREGATED_GROUPS["yast"]
+    mock_get_aggregated_groups.return_value = MOCK_AGGREGATED_GROUPS
+    mock_get_incident_groups.return_value = MOCK_INCIDENT_GROUPS
+    mock_get_json.return_value = mock_openqa_job_results(1)
+    # today: only a core build not testing the incident, yesterday: both builds testing it, before: no builds
+    mock_group_jobs = [
+        {core_id: mock_openqa_group_job(core_id, "1")},
+        {group_id: mock_openqa_group_job(group_id, "12345") for group_id in [core_id, yast_id]},
+    ]
+    mock_get_group_jobs.side_effect = mock_group_jobs
+    yesterday_build = "{}-1".format((datetime.now() - timedelta(1)).strftime("%Y%m%d"))
+    expected_builds = {core_id: yesterday_build, yast_id: yesterday_build}
+
+    oqa_search.set_cache_dir(str(tmp_path))
+    try:
+        assert oqa_search._find_aggregated_builds(12345, "15-SP6", 5, [core_id, yast_id], MOCK_URL) == expected_builds
+        oqa_search._save_caches()
+        # the same builds are known for the next runs without querying openQA
+        oqa_search.set_cache_dir(str(tmp_path))
+        mock_get_json.reset_mock()
+        assert oqa_search._find_aggregated_builds(12345, "15-SP6", 5, [core_id, yast_id], MOCK_URL) == expected_builds
+        mock_get_json.assert_not_called()
+
+        # today's builds are queried again once their short lifetime is over, the past days ones aren't
+        with mock.patch("oqa_search.oqa_search.time.time", return_value=oqa_search.time.time() + 3600):
+            mock_get_group_jobs.side_effect = [{}]
+            oqa_search._find_aggregated_builds(12345, "15-SP6", 5, [core_id, yast_id], MOCK_URL)
+        mock_get_json.assert_called_once()
+        assert "&build={}-1&".format(datetime.now().strftime("%Y%m%d")) in mock_get_json.call_args[0][0]
+    finally:
+        oqa_search.set_cache_dir(None)
+
+
+@mock.patch("oqa_search.oqa_search._get_group_jobs")
+@mock.patch("oqa_search.oqa_search._get_json")
+@mock.patch("oqa_search.oqa_search.get_incident_groups")
+@mock.patch("oqa_search.oqa_search.get_aggregated_groups")
+def test_find_aggregated_builds_date_affinity(
+    mock_get_aggregated_groups, mock_get_incident_groups, mock_get_json, mock_get_group_jobs
+):
+    core_id, yast_id = MOCK_AGGREGATED_GROUPS["core"], MOCK_AGGREGATED_GROUPS["yast"]
+    mock_get_aggregated_groups.return_value = MOCK_AGGREGATED_GROUPS
+    mock_get_incident_groups.return_value = MOCK_INCIDENT_GROUPS
+    builds = ["{}-1".format((datetime.now() - timedelta(i)).strftime("%Y%m%d")) for i in range(5)]
+    date_affinity = {}
+
+    def probed_builds():
+        return sorted(
+            builds.index(call.args[0].split("&build=")[1].split("&")[0]) for call in mock_get_json.call_args_list
+        )
+
+    # the first search goes back day by day until the incident is found
+    _mock_tested_issues(mock_get_json, mock_get_group_jobs, builds, {2: {core_id: "12345"}, 3: {core_id: "12345"}})
+    assert oqa_search._find_aggregated_builds(12345, "15-SP5", 5, [core_id], MOCK_URL, date_affinity=date_affinity) == {
+        core_id: builds[2]
+    }
+    assert date_affinity == {MOCK_URL: builds[2][:8]}
+    assert probed_builds() == [0, 1, 2]
+
+    # the next ones look in that date along with the newer ones, the newest build testing the incident is still the
+    # one found, then in the rest of the window for the groups still without a build
+    mock_get_json.reset_mock()
+    _mock_tested_issues(
+        mock_get_json,
+        mock_get_group_jobs,
+        builds,
+        {0: {core_id: "12345"}, 2: {core_id: "12345", yast_id: "1"}, 3: {yast_id: "12345"}},
+    )
+    assert oqa_search._find_aggregated_builds(
+        12345, "15-SP6", 5, [core_id, yast_id], MOCK_URL, date_affinity=date_affinity
+    ) == {core_id: builds[0], yast_id: builds[3]}
+    assert probed_builds() == [0, 1, 2, 3]
+    assert date_affinity == {MOCK_URL: builds[2][:8]}
+
+    # the same as without the date found first
+    mock_get_json.reset_mock()
+    assert oqa_search._find_aggregated_builds(12345, "15-SP6", 5, [core_id, yast_id], MOCK_URL) == {
+        core_id: builds[0],
+        yast_id: builds[3],
+    }
+    assert probed_builds() == [0, 1, 2, 3]
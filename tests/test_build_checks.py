@@ -1,3 +1,8 @@
+import gzip
+import mmap
+import tarfile
+from pathlib import Path
+
 import mock
 import pytest
 
@@ -68,3 +73,203 @@ def test_build_checks(
     assert mock_print.call_count == len(calls)
     assert mock_extract_test_results.call_count == len(mock_logs)
     mock_print.assert_has_calls(calls, any_order=True)
+
+
+@mock.patch("oqa_search.oqa_search._get_log_text")
+@mock.patch("oqa_search.oqa_search.print")
+@mock.patch("oqa_search.oqa_search.print_title")
+@mock.patch("oqa_search.oqa_search.print_warn")
+def test_build_checks_deadline(mock_print_warn, mock_print_title, mock_print, mock_get_log_text):
+    # index fetched in time, but none of the logs
+    mock_get_log_text.side_effect = [mock_build_checks_index("automake")] + [oqa_search.DeadlineExceeded()] * len(
+        get_mock_log_filenames("automake")
+    )
+    oqa_search.build_checks("Maintenance", 1234, 56789, ":1234:automake", MOCK_URL)
+
+    assert mock_print.call_count == len(get_mock_log_filenames("automake"))
+    assert mock_print_warn.call_count == len(get_mock_log_filenames("automake"))
+    mock_print_warn.assert_called_with(oqa_search.INCOMPLETE_TEXT)
+
+    # not even the index
+    mock_print_warn.reset_mock()
+    mock_get_log_text.side_effect = oqa_search.DeadlineExceeded()
+    oqa_search.build_checks("Maintenance", 1234, 56789, ":1234:automake", MOCK_URL)
+
+    mock_print_warn.assert_called_once_with(oqa_search.INCOMPLETE_TEXT)
+
+
+def _mirror_build_checks(path: Path, package: str, compression: str) -> Path:
+    logs_dir = path / "SUSE:Maintenance:1234:56789" / "build_checks"
+    logs_dir.mkdir(parents=True)
+    for name, log_text in zip(get_mock_log_filenames(package), mock_log_text(package)):
+        log = log_text.encode()
+        if compression == ".gz":
+            log = gzip.compress(log)
+        elif compression == ".zst":
+            log = pytest.importorskip("zstandard").ZstdCompressor().compress(log)
+        (logs_dir / (name + compression)).write_bytes(log)
+    # logs of other updates and packages are left out
+    (path / "SUSE:Maintenance:1234:11111" / "build_checks").mkdir(parents=True)
+    (logs_dir / "other.SUSE_SLE-15_Update.x86_64.log").write_text("[ 1s] 1 test passed")
+
+    return path
+
+
+@pytest.mark.parametrize("package", ["automake", "python"])
+@pytest.mark.parametrize("compression", ["", ".gz", ".zst"])
+@pytest.mark.parametrize("archive", [None, "w:", "w:gz"])
+@pytest.mark.parametrize("workers", [1, 2])
+@mock.patch("oqa_search.oqa_search.SCAN_CHUNK_SIZE", 4096)
+@mock.patch("oqa_search.oqa_search._get_log_text")
+@mock.patch("oqa_search.oqa_search.print")
+@mock.patch("oqa_search.oqa_search.print_title")
+def test_build_checks_local(
+    mock_print_title, mock_print, mock_get_log_text, tmp_path, package, compression, archive, workers
+):
+    mirror = _mirror_build_checks(tmp_path / "testreports", package, compression)
+    if archive:
+        with tarfile.open(tmp_path / "testreports.tar", archive) as tar:
+            tar.add(mirror, arcname="testreports")
+        mirror = tmp_path / "testreports.tar"
+
+    # the logs are split in several chunks, their results are merged back in order
+    oqa_search.build_checks(
+        "Maintenance", 1234, 56789, ":1234:{}".format(package), MOCK_URL, str(mirror), scan_workers=workers
+    )
+
+    # same results as from the QAM logs, without fetching anything
+    mock_get_log_text.assert_not_called()
+    logs = [str(call.args[0]) for call in mock_print.call_args_list[::2]]
+    assert [log.rsplit("/", 1)[1] for log in logs] == [name + compression for name in get_mock_log_filenames(package)]
+    assert mock_print.call_args_list[1::2] == [
+        mock.call("\n".join(matches), "\n") for matches in get_expected_log_matches(package)
+    ]
+
+
+@mock.patch("oqa_search.oqa_search.print")
+@mock.patch("oqa_search.oqa_search.print_title")
+def test_build_checks_local_missing(mock_print_title, mock_print, tmp_path):
+    oqa_search.build_checks("Maintenance", 1234, 56789, ":1234:automake", MOCK_URL, str(tmp_path))
+
+    mock_print.assert_called_once_with("No build checks for this incident")
+
+
+@mock.patch("oqa_search.oqa_search.zstandard", None)
+@mock.patch("oqa_search.oqa_search.print")
+@mock.patch("oqa_search.oqa_search.print_title")
+@mock.patch("oqa_search.oqa_search.print_warn")
+def test_build_checks_local_without_zstandard(mock_print_warn, mock_print_title, mock_print, tmp_path):
+    logs_dir = tmp_path / "SUSE:Maintenance:1234:56789" / "build_checks"
+    logs_dir.mkdir(parents=True)
+    (logs_dir / "automake-testsuite.SUSE_SLE-15_Update.x86_64.log.zst").write_bytes(b"")
+
+    oqa_search.build_checks("Maintenance", 1234, 56789, ":1234:automake", MOCK_URL, str(tmp_path))
+
+    mock_print.assert_not_called()
+    assert "zstandard" in mock_print_warn.call_args[0][0]
+
+
+@pytest.mark.parametrize("chunk_size", [1, 10, 4096])
+def test_get_line_chunks(tmp_path, chunk_size):
+    log = tmp_path / "somelog.log"
+    log.write_bytes(b"first line\nsecond line\n\nlast line without new line")
+
+    chunks = oqa_search._get_line_chunks(str(log), chunk_size)
+    data = log.read_bytes()
+
+    assert b"".join(data[start:end] for start, end in chunks) == data
+    assert all(data[end - 1 : end] == b"\n" for _, end in chunks[:-1])
+
+    log.write_bytes(b"")
+    assert oqa_search._get_line_chunks(str(log), chunk_size) == [(0, 0)]
+
+
+@pytest.mark.parametrize(
+    "data",
+    [b"first line\nsecond line\n\nlast line without new line", b"first line\r\nsecond\rline\n\n", b"\n", b"x"],
+)
+def test_iter_log_lines_reversed(tmp_path, data):
+    log = tmp_path / "somelog.log"
+    log.write_bytes(data)
+
+    with open(log, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped_file:
+        assert list(oqa_search._iter_log_lines_reversed(mapped_file)) == data.decode().splitlines()[::-1]
+
+
+@pytest.mark.parametrize(
+    ("log_lines", "expected_value"),
+    [
+        (
+            ["Finished in 1.2 seconds", "97 examples, 0 failures", "+ exit 0"],
+            ["97 examples, 0 failures"],
+        ),
+        (
+            ["test_a.py ...", "======== 3 passed, 1 skipped in 0.12s ========", "+ exit 0"],
+            ["======== 3 passed, 1 skipped in 0.12s ========"],
+        ),
+        (
+            ["100% tests passed, 0 tests failed out of 42", "Total Test time (real) =   1.03 sec"],
+            ["100% tests passed, 0 tests failed out of 42"],
+        ),
+        (
+            ["All tests successful.", "Files=3, Tests=57,  1 wallclock secs", "Result: PASS"],
+            ["Files=3, Tests=57,  1 wallclock secs", "Result: PASS"],
+        ),
+        # the framework is the one of the last summary, other frameworks lines don't count
+        (
+            ["Ok: 2", "# TOTAL: 3", "some line", "# PASS: 3", "Fail: 0"],
+            ["Ok: 2", "Fail: 0"],
+        ),
+        (["make check", "3 results", "+ exit 0"], None),
+    ],
+)
+def test_extract_testsuite_summary(log_lines, expected_value):
+    log_lines = ["Executing(%check): /bin/sh -e /var/tmp/rpm-tmp.foo"] + log_lines
+
+    value = oqa_search.extract_testsuite_summary(reversed(["[  10s] {}".format(line) for line in log_lines]))
+
+    assert value == (None if expected_value is None else ["[  10s] {}".format(line) for line in expected_value])
+
+
+def test_extract_testsuite_summary_stops():
+    log_lines = ["[ 1s] Executing(%check)", "[ 2s] 1 example, 0 failures"] + ["[ 3s] noise"] * 1000
+    log_lines += ["[ 4s] 1 example, 1 failure"] + ["[ 5s] noise"] * 10 + ["[ 6s] 2 examples, 0 failures"]
+    log_lines += ["[ 7s] Executing(%check)", "[ 8s] + exit 0"]
+    read_lines = []
+
+    def reversed_lines():
+        for line in reversed(log_lines):
+            read_lines.append(line)
+            yield line
+
+    # the summaries before the %check section and after a long gap are left out
+    assert oqa_search.extract_testsuite_summary(reversed(log_lines[:-2])) == [
+        "[ 4s] 1 example, 1 failure",
+        "[ 6s] 2 examples, 0 failures",
+    ]
+    assert oqa_search.extract_testsuite_summary(reversed_lines()) is None
+    assert len(read_lines) == 2
+
+
+def test_extract_test_results_unknown_framework():
+    log_text = "[ 1s] Executing(%check)\n[ 2s] 3 tests passed\n[ 3s] + make -j4\n[ 4s] 0 failures"
+
+    assert oqa_search.extract_test_results(log_text) == ["[ 2s] 3 tests passed", "[ 4s] 0 failures"]
+
+
+@pytest.mark.parametrize("compression", ["", ".gz"])
+@pytest.mark.parametrize("workers", [1, 2])
+@mock.patch("oqa_search.oqa_search.SCAN_CHUNK_SIZE", 64)
+def test_scan_local_build_checks_unknown_framework(tmp_path, compression, workers):
+    logs_dir = tmp_path / "SUSE:Maintenance:1234:56789" / "build_checks"
+    logs_dir.mkdir(parents=True)
+    log_lines = ["[ 1s] Executing(%check)"] + ["[ 2s] {} tests passed".format(n) for n in range(100)]
+    log = "\n".join(log_lines).encode()
+    (logs_dir / ("foo.SUSE_SLE-15_Update.x86_64.log" + compression)).write_bytes(
+        gzip.compress(log) if compression else log
+    )
+
+    # the logs without a known summary are searched whole, in chunks
+    results = list(oqa_search._scan_local_build_checks(str(tmp_path), "Maintenance", 1234, 56789, "foo", workers))
+
+    assert [matches for _, matches in results] == [log_lines[1:]]
@@ -0,0 +1,132 @@
+from datetime import datetime
+
+import mock
+import pytest
+
+from oqa_search import oqa_search
+from tests.fake_server import FakeServer
+
+UPDATE_ID = "SUSE:Maintenance:12345:67890"
+OTHER_UPDATE_ID = "SUSE:Maintenance:23456:78901"
+
+SKIPPED_TEXT = "skipped"
+
+
+@pytest.fixture
+def search(capsys, tmp_path, run_main):
+    def run(server, update_ids=None, args=None):
+        server.requests.clear()
+        server.bytes_sent.clear()
+        options = ["--no-history", "--cache-dir", str(tmp_path), "--changed-only"] + (args or [])
+        exit_code = run_main((update_ids or [UPDATE_ID]) + options, server.url)
+        return capsys.readouterr().out, exit_code
+
+    return run
+
+
+def test_main_changed_only_fake_server(search):
+    with FakeServer(versions=2, failed_jobs=1) as server:
+        first_output, _ = search(server)
+        second_output, _ = search(server, [OTHER_UPDATE_ID, UPDATE_ID])
+        assert SKIPPED_TEXT not in first_output
+        assert first_output.count("FAILED (1 jobs)") == 4
+        # the unchanged update is skipped, the other one is searched as usual
+        assert "Unchanged since its search on {}".format(datetime.now().strftime("%Y-%m-%d")) in second_output
+        assert second_output.endswith(
+            "Skipped 1 of 2 updates, unchanged since their last search:\x1b[0m\n{}\n".format(UPDATE_ID)
+        )
+        assert "No openQA builds for this incident yet" in second_output.split(UPDATE_ID)[0]
+
+        # only the incident settings, aggregated updates builds, latest jobs and build checks logs index are checked
+        search(server)
+        assert set(server.requests) == {
+            "job_groups",
+            "incident_settings",
+            "update_settings",
+            "jobs_overview",
+            "build_checks_index",
+        }
+        # all the jobs and the running ones of both builds
+        assert server.requests["jobs_overview"] == 8
+        # the build checks logs index is tagged, it's only sent again if it changed
+        assert server.bytes_sent["build_checks_index"] == 0
+
+        # a job restarted since, its build is searched again without its cached results
+        server.restart_job(server._get_build_jobs("15-SP1", server.build, 10001)[0])
+        third_output, _ = search(server)
+        fourth_output, _ = search(server)
+
+    assert SKIPPED_TEXT not in third_output
+    assert "RUNNING/SCHEDULED (1 jobs)" in third_output
+    # the running job could still change the results
+    assert fourth_output == third_output
+
+
+def test_main_changed_only_failed_running(search):
+    with FakeServer(versions=2, failed_jobs=1, running_jobs=1) as server:
+        first_output, _ = search(server)
+        second_output, _ = search(server)
+        build = (server.url, "15-SP1", server.build, 10001)
+        running_fingerprint = oqa_search._get_jobs_fingerprint([build])
+
+        # the running jobs finish, keeping their IDs
+        for job in server._jobs.values():
+            if job["state"] == "running":
+                job.update(state="done", result="passed")
+        assert oqa_search._get_jobs_fingerprint([build]) != running_fingerprint
+        third_output, _ = search(server)
+        fourth_output, _ = search(server)
+
+    # failed, but the running jobs could still change the results
+    assert "FAILED (1 jobs)" in first_output
+    assert SKIPPED_TEXT not in second_output
+    assert SKIPPED_TEXT not in third_output
+    assert SKIPPED_TEXT in fourth_output
+
+
+@pytest.mark.parametrize("change", ["build_checks", "aggregated", "options"])
+def test_main_changed_only_changes(search, change):
+    with FakeServer(versions=2, failed_jobs=0, aggregated_day=2) as server:
+        first_output, _ = search(server)
+        args = []
+        if change == "build_checks":
+            server.logs = 2
+        elif change == "aggregated":
+            # the incident is in a newer aggregated updates build
+            server.aggregated_build = "{}-1".format(datetime.now().strftime("%Y%m%d"))
+        else:
+            args = ["--aggregated-groups", "core", "yast"]
+        second_output, _ = search(server, args=args)
+        third_output, _ = search(server, args=args)
+
+    assert "PASSED" in first_output
+    # searched again once, then skipped while unchanged
+    assert SKIPPED_TEXT not in second_output
+    assert SKIPPED_TEXT in third_output
+
+
+def test_main_changed_only_gate(search):
+    with FakeServer(versions=2, failed_jobs=1) as server:
+        _, first_exit_code = search(server, args=["--gate"])
+        output, second_exit_code = search(server, args=["--gate"])
+
+    # the skipped update still fails the gate
+    assert first_exit_code == second_exit_code == oqa_search.GATE_EXIT_CODES["failed"]
+    assert "GATE: FAILED" in output
+
+
+@pytest.mark.parametrize("option", [["--no-cache"], ["--build-checks-dir", "."]])
+def test_main_changed_only_needs(capsys, run_main, option):
+    args = [UPDATE_ID, "--changed-only", "--url-openqa", "http://localhost:1"] + option
+    with mock.patch("oqa_search.oqa_search.get_aggregated_groups", return_value={"core": 1}), pytest.raises(SystemExit):
+        run_main(args)
+
+    assert "--changed-only needs" in capsys.readouterr().err
+
+
+def test_parser_changed_only_offline(capsys, tmp_path):
+    with mock.patch("oqa_search.oqa_search.get_aggregated_groups", return_value={"core": 1}), pytest.raises(SystemExit):
+        oqa_search._parser([UPDATE_ID, "--changed-only", "--offline", str(tmp_path)])
+
+    # offline runs don't use the cache
+    assert "--changed-only needs" in capsys.readouterr().err
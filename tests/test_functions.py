@@ -1,4 +1,8 @@
 import copy
+import json
+import time
+from datetime import datetime, timedelta
+from itertools import islice
 
 import mock
 import pytest
@@ -10,6 +14,7 @@ from tests.conftest import (
     MOCK_URL,
     mock_incident_info_json,
     mock_incident_settings_json,
+    mock_openqa_job_details,
     mock_openqa_job_group,
     mock_openqa_job_json,
     mock_openqa_job_results,
@@ -270,6 +275,24 @@ def test_get_openqa_build_url(mock_get_incident_groups, mock_get_aggregated_grou
         oqa_search._get_openqa_build_url("foo", MOCK_URL, version, build, group_id)
 
 
+@mock.patch("oqa_search.oqa_search.get_incident_groups")
+@mock.patch("oqa_search.oqa_search.get_aggregated_groups")
+def test_get_openqa_build_url_multiple_groups(mock_get_aggregated_groups, mock_get_incident_groups):
+    mock_get_incident_groups.return_value = MOCK_INCIDENT_GROUPS
+    mock_get_aggregated_groups.return_value = MOCK_AGGREGATED_GROUPS
+    expected_value = (
+        "{}/api/v1/jobs/overview?distri=sle&version=15-SP6&build=20241120-1&groupid=414&groupid=417".format(MOCK_URL)
+    )
+    actual_value = oqa_search._get_openqa_build_url("all", MOCK_URL, "15-SP6", "20241120-1", [414, 417])
+
+    assert actual_value == expected_value
+
+    with pytest.raises(ValueError):
+        oqa_search._get_openqa_build_url("all", MOCK_URL, "15-SP6", "20241120-1", [414, 000])
+    with pytest.raises(ValueError):
+        oqa_search._get_openqa_build_url("all", MOCK_URL, "15-SP6", "20241120-1", [])
+
+
 @pytest.mark.parametrize(
     ("base_issues", "ltss_issues"),
     [
@@ -324,7 +347,9 @@ def test_openqa_job_results(
         mock_print_ok.assert_has_calls([mock.call("PASSED")])
 
 
-def test_parser():
+@mock.patch("oqa_search.oqa_search.get_aggregated_groups")
+def test_parser(mock_get_aggregated_groups):
+    mock_get_aggregated_groups.return_value = MOCK_AGGREGATED_GROUPS
     mock_update_id = "S:M:12345:56789"
     with pytest.raises(SystemExit):
         oqa_search._parser([mock_update_id, "--url-qam", "not.an.url"])
@@ -337,3 +362,416 @@ def test_parser():
         oqa_search._parser([mock_update_id, "--aggregated-groups", "core", "foo"])
         oqa_search._parser([mock_update_id, "--aggregated-groups", "bar", "baz"])
         oqa_search._parser([mock_update_id, "--aggregated-groups", "foobar", "yast"])
+
+
+def test_deadline():
+    oqa_search.set_deadline(None)
+    assert oqa_search._time_left() is None
+
+    oqa_search.set_deadline(60)
+    assert 0 < oqa_search._time_left() <= 60
+
+    oqa_search.set_deadline(-1)
+    with pytest.raises(oqa_search.DeadlineExceeded):
+        oqa_search._time_left()
+
+    oqa_search.set_deadline(None)
+
+
+@mock.patch("oqa_search.oqa_search._get_session")
+def test_get_deadline(mock_get_session):
+    mock_requests_get = mock_get_session.return_value.get
+    mock_requests_get.side_effect = oqa_search.requests.Timeout()
+    oqa_search.set_deadline(60)
+
+    with pytest.raises(oqa_search.DeadlineExceeded):
+        oqa_search._get_json(MOCK_URL)
+
+    # no request is even attempted once the deadline expired
+    mock_requests_get.reset_mock()
+    oqa_search.set_deadline(-1)
+    with pytest.raises(oqa_search.DeadlineExceeded):
+        oqa_search._get_log_text(MOCK_URL)
+    mock_requests_get.assert_not_called()
+
+    oqa_search.set_deadline(None)
+
+
+def test_request_slot_priority():
+    sent = []
+
+    def request(name):
+        with oqa_search._request_slot():
+            sent.append(name)
+
+    requests = [
+        ((oqa_search.PRIORITY_BUILD_CHECKS,), "log"),
+        ((oqa_search.PRIORITY_AGGREGATED_UPDATES, 0), "aggregated"),
+        ((oqa_search.PRIORITY_SINGLE_INCIDENTS, 1), "15-SP6"),
+        ((oqa_search.PRIORITY_SINGLE_INCIDENTS, 0), "15-SP5"),
+        ((oqa_search.PRIORITY_SINGLE_INCIDENTS, 1), "15-SP6 staging"),
+    ]
+    with mock.patch.object(oqa_search, "_fetch_slots", 1):
+        # the only slot is taken meanwhile all the requests arrive
+        with oqa_search._request_slot():
+            futures = oqa_search._run_concurrently(
+                oqa_search._call_with_priority,
+                [(priority, request, name) for priority, name in requests],
+                len(requests),
+            )
+            while len(oqa_search._fetch_queue) < len(requests):
+                time.sleep(0.01)
+        for future in futures:
+            future.result()
+
+        # the output printed first is fetched first, in arrival order for the same output
+        assert sent == ["15-SP5", "15-SP6", "15-SP6 staging", "aggregated", "log"]
+        assert oqa_search._fetch_slots == 1
+
+        # the requests waiting for a slot give up with the deadline
+        with oqa_search._request_slot():
+            oqa_search.set_deadline(0.1)
+            future = oqa_search._run_concurrently(request, [("late",)], 1)[0]
+            with pytest.raises(oqa_search.DeadlineExceeded):
+                future.result()
+        oqa_search.set_deadline(None)
+        assert oqa_search._fetch_queue == []
+        assert oqa_search._fetch_slots == 1
+
+
+@mock.patch("oqa_search.oqa_search._get_openqa_print_url")
+@mock.patch("oqa_search.oqa_search._get_openqa_build_url")
+@mock.patch("oqa_search.oqa_search._get_json")
+@mock.patch("oqa_search.oqa_search.print")
+@mock.patch("oqa_search.oqa_search.print_warn")
+def test_openqa_job_results_deadline(
+    mock_print_warn, mock_print, mock_get_json, mock_get_openqa_build_url, mock_get_openqa_print_url
+):
+    mock_get_openqa_print_url.return_value = MOCK_URL
+    mock_get_json.side_effect = oqa_search.DeadlineExceeded()
+
+    oqa_search._print_openqa_job_results(MOCK_URL, "15-SP4", ":12345:foo", 439)
+
+    mock_print.assert_called_once_with("15-SP4 -> {}".format(MOCK_URL))
+    mock_print_warn.assert_called_once_with(oqa_search.INCOMPLETE_TEXT)
+
+
+@mock.patch("oqa_search.oqa_search.get_aggregated_groups")
+def test_parser_multiple_openqa_instances(mock_get_aggregated_groups):
+    staging_url = "https://fake.staging.url"
+    mock_get_aggregated_groups.side_effect = lambda url: (
+        {"staging": 123} if url == staging_url else MOCK_AGGREGATED_GROUPS
+    )
+
+    args = oqa_search._parser(
+        ["S:M:12345:56789", "--url-openqa", MOCK_URL, "--url-openqa", staging_url, "--aggregated-groups", "core"]
+    )
+    assert args.url_openqa == [MOCK_URL, staging_url]
+
+    # groups from any of the instances are valid
+    args = oqa_search._parser(
+        ["S:M:12345:56789", "--url-openqa", MOCK_URL, "--url-openqa", staging_url, "--aggregated-groups", "staging"]
+    )
+    assert args.aggregated_groups == ["staging"]
+
+    with pytest.raises(SystemExit):
+        oqa_search._parser(["S:M:12345:56789", "--aggregated-groups", "staging"])
+
+
+@mock.patch("oqa_search.oqa_search.get_aggregated_groups", return_value=MOCK_AGGREGATED_GROUPS)
+def test_parser_url_openqa_before_update_id(_):
+    args = oqa_search._parser(["--url-openqa", MOCK_URL, "S:M:12345:56789"])
+    assert args.url_openqa == [MOCK_URL]
+    assert args.update_id == ["S:M:12345:56789"]
+
+    args = oqa_search._parser(["S:M:12345:56789"])
+    assert args.url_openqa == [oqa_search.DEFAULT_OPENQA_URL]
+
+
+@mock.patch("oqa_search.oqa_search._get_json")
+def test_fetch_openqa_groups_per_instance(mock_get_json):
+    staging_url = "https://fake.staging.url"
+    mock_get_json.side_effect = lambda url, *_: [mock_openqa_job_group(name=url)]
+    oqa_search._fetch_openqa_groups.cache_clear()
+
+    assert oqa_search._fetch_openqa_groups(MOCK_URL) == [mock_openqa_job_group(name=MOCK_URL + "/api/v1/job_groups")]
+    assert oqa_search._fetch_openqa_groups(staging_url) == [
+        mock_openqa_job_group(name=staging_url + "/api/v1/job_groups")
+    ]
+    oqa_search._fetch_openqa_groups(MOCK_URL)
+    assert mock_get_json.call_count == 2
+
+    oqa_search._fetch_openqa_groups.cache_clear()
+
+
+def test_get_session():
+    assert oqa_search._get_session(MOCK_URL) is oqa_search._get_session(MOCK_URL)
+    assert oqa_search._get_session(MOCK_URL) is not oqa_search._get_session("https://fake.staging.url")
+
+
+@mock.patch("oqa_search.oqa_search._get_json")
+def test_get_openqa_jobs(mock_get_json):
+    job_ids = list(range(oqa_search.OQA_JOBS_BATCH_SIZE + 5))
+    mock_jobs = {i: mock_openqa_job_details(i, state="done" if i else "running") for i in job_ids}
+    mock_get_json.side_effect = lambda url: {"jobs": [mock_jobs[int(i)] for i in url.split("ids=")[1].split(",")]}
+    oqa_search._finished_jobs.clear()
+
+    assert oqa_search._get_openqa_jobs(MOCK_URL, job_ids) == [mock_jobs[i] for i in job_ids]
+    # asked for in batches
+    assert mock_get_json.call_count == 2
+
+    # only the unfinished job is asked for again
+    mock_get_json.reset_mock()
+    assert oqa_search._get_openqa_jobs(MOCK_URL, job_ids) == [mock_jobs[i] for i in job_ids]
+    mock_get_json.assert_called_once_with("{}/api/v1/jobs?ids=0".format(MOCK_URL))
+
+    oqa_search._finished_jobs.clear()
+
+
+def test_group_failed_modules():
+    jobs = [
+        mock_openqa_job_details(1, "mau-extratests1", failed_modules=["ptp"]),
+        mock_openqa_job_details(2, "mau-extratests1", failed_modules=["ptp", "zypper_lr"]),
+        mock_openqa_job_details(3, "qam-regression", result="incomplete"),
+    ]
+    expected_value = {"mau-extratests1": ["ptp", "zypper_lr"], "qam-regression": ["incomplete"]}
+
+    assert oqa_search._group_failed_modules(jobs) == expected_value
+
+
+@mock.patch("oqa_search.oqa_search._get_openqa_jobs")
+@mock.patch("oqa_search.oqa_search.print")
+def test_print_failed_job_details(mock_print, mock_get_openqa_jobs):
+    mock_get_openqa_jobs.return_value = [
+        mock_openqa_job_details(2, "qam-regression", failed_modules=["firefox"]),
+        mock_openqa_job_details(1, "mau-extratests1", failed_modules=["ptp"]),
+    ]
+
+    oqa_search._print_failed_job_details(MOCK_URL, mock_openqa_job_results(2))
+
+    mock_get_openqa_jobs.assert_called_once_with(MOCK_URL, [0, 1])
+    assert mock_print.call_args_list == [mock.call("  mau-extratests1: ptp"), mock.call("  qam-regression: firefox")]
+
+
+@pytest.mark.parametrize(
+    "items",
+    [
+        [],
+        [{"id": 1, "name": "Maintenance: SLE 15 SP6 Core Incidents"}, {"id": 2, "name": "Ünïcode ✓"}],
+        [12345, -1.5e3, "foo", None, True, [1, [2]], {"nested": {"list": [1, 2, 3]}}],
+    ],
+)
+@pytest.mark.parametrize("chunk_size", [1, 2, 7, 1024])
+def test_iter_json_items(items, chunk_size):
+    document = json.dumps(items, ensure_ascii=False, indent=1).encode()
+    chunks = (document[n : n + chunk_size] for n in range(0, len(document), chunk_size))
+
+    assert list(oqa_search._iter_json_items(chunks)) == items
+
+
+@pytest.mark.parametrize("document", [b'[{"id": 1}, {"id": 2', b'{"id": 1}', b"[1, 2"])
+def test_iter_json_items_invalid(document):
+    with pytest.raises(json.JSONDecodeError):
+        list(oqa_search._iter_json_items([document]))
+
+
+@pytest.mark.parametrize(
+    ("template", "expected_value"), [("sle-micro-2\n" * 100, "sle-micro"), ("sle-15\n" * 100, "template"), (None, None)]
+)
+def test_reduce_openqa_group(template, expected_value):
+    group = {**mock_openqa_job_group(111, "Maintenance: SLE 12 SP5 Core Incidents", template), "description": "foo"}
+    reduced_group = oqa_search._reduce_openqa_group(group)
+
+    assert reduced_group == mock_openqa_job_group(111, "Maintenance: SLE 12 SP5 Core Incidents", expected_value)
+    assert oqa_search._is_valid_template(reduced_group) == oqa_search._is_valid_template(group)
+
+
+@mock.patch("oqa_search.oqa_search._get_session")
+def test_get_json_item_reducer(mock_get_session):
+    jobs = [{"id": i, "name": "somejob-{}".format(i), "settings": {"FOO": "bar" * 100}} for i in range(100)]
+    document = json.dumps(jobs).encode()
+    response = mock_get_session.return_value.get.return_value.__enter__.return_value
+    response.iter_content.return_value = (document[n : n + 100] for n in range(0, len(document), 100))
+
+    actual_value = oqa_search._get_json(MOCK_URL, oqa_search._reduce_openqa_job)
+
+    assert actual_value == [{"id": i, "name": "somejob-{}".format(i)} for i in range(100)]
+
+
+@mock.patch("oqa_search.oqa_search.time.time")
+def test_cache(mock_time, tmp_path):
+    mock_time.return_value = 1000.0
+    # nothing is cached without a cache directory
+    oqa_search._cache_set("somecache", "key", [1])
+    assert oqa_search._cache_get("somecache", "key") is None
+
+    oqa_search.set_cache_dir(str(tmp_path))
+    oqa_search._cache_set("somecache", "forever", [1, 2])
+    oqa_search._cache_set("somecache", "short", [], ttl=60)
+    assert oqa_search._cache_get("somecache", "forever") == [1, 2]
+    assert oqa_search._cache_get("somecache", "short") == []
+    assert oqa_search._cache_get("somecache", "missing") is None
+    oqa_search._save_caches()
+
+    # reloaded from the cache directory, expired entries are gone
+    mock_time.return_value = 1061.0
+    oqa_search.set_cache_dir(str(tmp_path))
+    assert oqa_search._cache_get("somecache", "forever") == [1, 2]
+    assert oqa_search._cache_get("somecache", "short") is None
+
+    # an unreadable cache starts over
+    (tmp_path / "somecache.json").write_text("{")
+    oqa_search.set_cache_dir(str(tmp_path))
+    assert oqa_search._cache_get("somecache", "forever") is None
+
+    oqa_search.set_cache_dir(None)
+
+
+def test_cache_prune_and_save(tmp_path):
+    old_build = "{}-1".format((datetime.now() - timedelta(oqa_search.AGGREGATED_MAX_DAYS + 1)).strftime("%Y%m%d"))
+    recent_build = "{}-1".format((datetime.now() - timedelta(oqa_search.AGGREGATED_MAX_DAYS - 1)).strftime("%Y%m%d"))
+    keys = [oqa_search._get_build_cache_key(MOCK_URL, "15-SP6", build, 414) for build in [old_build, recent_build]]
+    keys.append(oqa_search._get_build_cache_key(MOCK_URL, "15-SP6", ":12345:foo", 414))
+    oqa_search.set_cache_dir(str(tmp_path))
+    try:
+        for name in [oqa_search.AGGREGATED_BUILDS_CACHE, oqa_search.BUILD_RESULTS_CACHE, "somecache"]:
+            for key in keys:
+                oqa_search._cache_set(name, key, [])
+        oqa_search._save_caches()
+
+        # the aggregated updates builds out of any --days window are dropped when loading the caches keyed by build
+        oqa_search.set_cache_dir(str(tmp_path))
+        for name in [oqa_search.AGGREGATED_BUILDS_CACHE, oqa_search.BUILD_RESULTS_CACHE]:
+            assert [oqa_search._cache_get(name, key) for key in keys] == [None, [], []]
+        assert [oqa_search._cache_get("somecache", key) for key in keys] == [[], [], []]
+
+        # only the changed caches are written again
+        oqa_search._save_caches()
+        (tmp_path / "somecache.json").unlink()
+        oqa_search._cache_set(oqa_search.BUILD_RESULTS_CACHE, keys[0], [])
+        oqa_search._save_caches()
+        assert not (tmp_path / "somecache.json").exists()
+        assert keys[0] in json.loads((tmp_path / "build_results.json").read_text())
+    finally:
+        oqa_search.set_cache_dir(None)
+
+
+@pytest.mark.parametrize(
+    ("running", "failed", "all_jobs", "cached"),
+    [
+        ([], mock_openqa_job_results(2), mock_openqa_job_results(4), True),
+        ([], [], mock_openqa_job_results(3), True),
+        # still running, or no jobs scheduled yet
+        (mock_openqa_job_results(1), [], mock_openqa_job_results(2), False),
+        ([], [], [], False),
+    ],
+)
+@mock.patch("oqa_search.oqa_search._get_openqa_build_url")
+@mock.patch("oqa_search.oqa_search._get_json")
+def test_openqa_job_results_cache(
+    mock_get_json, mock_get_openqa_build_url, tmp_path, running, failed, all_jobs, cached
+):
+    mock_get_openqa_build_url.side_effect = lambda state, *_: state
+    mock_get_json.side_effect = lambda url, _: {"running": running, "failed": failed, "all": all_jobs}[
+        url.split("?")[0]
+    ]
+    oqa_search.set_cache_dir(str(tmp_path))
+    build = "{}-1".format(datetime.now().strftime("%Y%m%d"))
+
+    try:
+        assert oqa_search._get_openqa_job_results(MOCK_URL, "15-SP6", build, 414) == (running, failed)
+        oqa_search._save_caches()
+        # shared by every run (and every update searched for in it) while it's cached
+        oqa_search.set_cache_dir(str(tmp_path))
+        mock_get_json.reset_mock()
+        assert oqa_search._get_openqa_job_results(MOCK_URL, "15-SP6", build, 414) == (running, failed)
+        if cached:
+            # checked to be of the same jobs, once per run
+            mock_get_json.assert_called_once_with(
+                "all?limit={}&offset=0".format(oqa_search.OQA_PAGE_SIZE), oqa_search._reduce_openqa_job
+            )
+            assert oqa_search._get_openqa_job_results(MOCK_URL, "15-SP6", build, 414) == (running, failed)
+            assert mock_get_json.call_count == 1
+        else:
+            assert mock_get_json.call_count > 1
+    finally:
+        oqa_search.set_cache_dir(None)
+
+
+@mock.patch("oqa_search.oqa_search._get_openqa_build_url")
+@mock.patch("oqa_search.oqa_search._get_json")
+def test_openqa_job_results_cache_restarted(mock_get_json, mock_get_openqa_build_url, tmp_path):
+    listings = {"running": [], "failed": mock_openqa_job_results(1), "all": mock_openqa_job_results(2)}
+    mock_get_openqa_build_url.side_effect = lambda state, *_: state
+    mock_get_json.side_effect = lambda url, _: listings[url.split("?")[0]]
+    oqa_search.set_cache_dir(str(tmp_path))
+    build = "{}-1".format(datetime.now().strftime("%Y%m%d"))
+
+    try:
+        assert oqa_search._get_openqa_job_results(MOCK_URL, "15-SP6", build, 414) == ([], listings["failed"])
+        oqa_search._save_caches()
+        # the failed job is restarted by the next run
+        restarted = {"id": 2, "name": "somejob-0"}
+        listings.update(running=[restarted], failed=[], all=[restarted, listings["all"][1]])
+        oqa_search.set_cache_dir(str(tmp_path))
+        assert oqa_search._get_openqa_job_results(MOCK_URL, "15-SP6", build, 414) == ([restarted], [])
+        assert not oqa_search._get_cache(oqa_search.BUILD_RESULTS_CACHE)
+    finally:
+        oqa_search.set_cache_dir(None)
+
+
+@mock.patch("oqa_search.oqa_search._get_openqa_build_url")
+@mock.patch("oqa_search.oqa_search._get_json")
+def test_openqa_job_results_cache_restarted_finished(mock_get_json, mock_get_openqa_build_url, tmp_path):
+    listings = {"running": [], "failed": mock_openqa_job_results(1), "all": mock_openqa_job_results(2)}
+    mock_get_openqa_build_url.side_effect = lambda state, *_: state
+    mock_get_json.side_effect = lambda url, _: listings[url.split("?")[0]]
+    oqa_search.set_cache_dir(str(tmp_path))
+    build = "{}-1".format(datetime.now().strftime("%Y%m%d"))
+
+    try:
+        assert oqa_search._get_openqa_job_results(MOCK_URL, "15-SP6", build, 414) == ([], listings["failed"])
+        oqa_search._save_caches()
+        # the failed job is restarted and its clone passed before the next run
+        listings.update(failed=[], all=[{"id": 2, "name": "somejob-0"}, listings["all"][1]])
+        oqa_search.set_cache_dir(str(tmp_path))
+        assert oqa_search._get_openqa_job_results(MOCK_URL, "15-SP6", build, 414) == ([], [])
+        oqa_search._save_caches()
+        # the new results are cached instead
+        oqa_search.set_cache_dir(str(tmp_path))
+        listings.update(failed=None)
+        assert oqa_search._get_openqa_job_results(MOCK_URL, "15-SP6", build, 414) == ([], [])
+    finally:
+        oqa_search.set_cache_dir(None)
+
+
+@pytest.mark.parametrize(("paginated", "count"), [(True, 20), (False, 20), (False, 5)])
+@mock.patch("oqa_search.oqa_search._get_json")
+def test_get_json_pages(mock_get_json, paginated, count):
+    jobs = mock_openqa_job_results(count)
+
+    def get_page(url, _):
+        limit, offset = [int(i.split("=")[1]) for i in url.split("?")[1].split("&")[-2:]]
+        # servers without pagination send the whole listing every time
+        return jobs[offset : offset + limit] if paginated else jobs
+
+    mock_get_json.side_effect = get_page
+
+    # a single page is prefetched at a time without pagination, so none is left being fetched
+    workers = 2 if paginated else 1
+    assert (
+        oqa_search._get_json_pages(MOCK_URL + "/api/v1/jobs/overview?distri=sle", page_size=5, workers=workers) == jobs
+    )
+    mock_get_json.assert_any_call(MOCK_URL + "/api/v1/jobs/overview?distri=sle&limit=5&offset=0", None)
+    # the first page and two windows of two prefetched pages, the last one empty. Without pagination the first page
+    # is the whole listing, seen again in the next one if it's exactly a page
+    unpaginated_calls = 1 if count > 5 else 2
+    assert mock_get_json.call_count == (5 if paginated else unpaginated_calls)
+
+    # only the pages needed are fetched while iterating
+    mock_get_json.reset_mock()
+    assert list(islice(oqa_search._iter_json_pages(MOCK_URL, page_size=5), 7)) == jobs[:7]
+    assert mock_get_json.call_count == (2 if paginated else unpaginated_calls)
+    mock_get_json.reset_mock()
+    assert list(oqa_search._iter_json_pages(MOCK_URL, page_size=5)) == jobs
+    assert mock_get_json.call_count == (5 if paginated else unpaginated_calls)
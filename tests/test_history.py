@@ -0,0 +1,143 @@
+import time
+
+import mock
+import pytest
+
+from oqa_search import oqa_search
+from tests.conftest import get_expected_log_matches
+from tests.fake_server import FakeServer
+
+
+def _record_update(update_id, status, version="15-SP6", section="aggregated", group="core"):
+    oqa_search._record_history(
+        "openqa_results",
+        url="https://openqa.suse.de",
+        section=section,
+        group_name=group,
+        version=version,
+        group_id=1,
+        build=None if status == "no build" else "20241120-1",
+        status=status,
+        running_jobs=int(status == "running"),
+        failed_jobs=int(status == "failed"),
+    )
+    oqa_search._save_history(update_id)
+
+
+@pytest.fixture
+def history_db(tmp_path):
+    path = str(tmp_path / "history" / "history.sqlite3")
+    oqa_search.set_history_db(path)
+    yield path
+    oqa_search.set_history_db(None)
+
+
+def test_query_history(history_db):
+    _record_update("SUSE:Maintenance:1:1", "failed")
+    _record_update("SUSE:Maintenance:2:2", "passed")
+    _record_update("SUSE:Maintenance:2:2", "running", section="single")
+    _record_update("SUSE:Maintenance:3:3", "no build", version="15-SP5")
+    # searched again, only the last results count
+    _record_update("SUSE:Maintenance:1:1", "passed")
+
+    rows = oqa_search.query_history(history_db, versions=["15-SP6"], section="aggregated", group="core")
+    assert [(row["update_id"], row["status"]) for row in rows] == [
+        ("SUSE:Maintenance:1:1", "passed"),
+        ("SUSE:Maintenance:2:2", "passed"),
+    ]
+
+    rows = oqa_search.query_history(history_db, last=2)
+    assert [(row["update_id"], row["section"], row["status"]) for row in rows] == [
+        ("SUSE:Maintenance:1:1", "aggregated", "passed"),
+        ("SUSE:Maintenance:3:3", "aggregated", "no build"),
+    ]
+
+    rows = oqa_search.query_history(history_db, status="running")
+    assert [(row["update_id"], row["running_jobs"]) for row in rows] == [("SUSE:Maintenance:2:2", 1)]
+
+    assert oqa_search.query_history(history_db, update_ids=["SUSE:Maintenance:3:3"], versions=["15-SP6"]) == []
+    assert oqa_search.query_history(history_db, since=time.time() + 60) == []
+
+
+def test_query_history_build_checks(history_db):
+    for update_id, package in [("SUSE:Maintenance:1:1", "automake"), ("SUSE:Maintenance:2:2", "python")]:
+        for n, matches in enumerate(get_expected_log_matches(package)):
+            oqa_search._record_build_checks("{}.log".format(n), matches)
+        oqa_search._save_history(update_id)
+    oqa_search._record_build_checks("0.log", ["[ 1s] 97 examples, 2 failures"])
+    oqa_search._save_history("SUSE:Maintenance:3:3")
+
+    rows = oqa_search.query_history(history_db, build_checks=True, status="failed")
+    assert [(row["update_id"], row["log"]) for row in rows] == [("SUSE:Maintenance:3:3", "0.log")]
+
+    rows = oqa_search.query_history(history_db, build_checks=True, update_ids=["SUSE:Maintenance:1:1"])
+    assert [row["results"] for row in rows] == ["\n".join(get_expected_log_matches("automake")[0])]
+
+
+@pytest.mark.parametrize(
+    ("line", "failed"),
+    [
+        ("# FAIL:  0", False),
+        ("# FAIL:  2", True),
+        ("# XFAIL: 41", False),
+        ("Expected Fail:      1", False),
+        ("Fail:               1", True),
+        ("97 examples, 0 failures", False),
+        ("97 examples, 1 failure", True),
+        ("100% tests passed, 0 tests failed out of 42", False),
+        ("2 tests failed:", True),
+        ("===== 1 failed, 3 passed in 0.12s =====", True),
+        ("Result: FAIL", True),
+        ("OK (20 tests)", False),
+    ],
+)
+def test_testsuite_failure_pattern(line, failed):
+    assert bool(oqa_search.TESTSUITE_FAILURE_PATTERN.search(line)) == failed
+
+
+def test_save_history_disabled(tmp_path):
+    oqa_search.set_history_db(None)
+
+    _record_update("SUSE:Maintenance:1:1", "failed")
+
+    assert oqa_search._history_rows == {}
+    assert list(tmp_path.iterdir()) == []
+
+
+@mock.patch("oqa_search.oqa_search.print_warn")
+def test_save_history_error(mock_print_warn, tmp_path):
+    # the database can't be created in a file
+    (tmp_path / "file").write_text("")
+    oqa_search.set_history_db(str(tmp_path / "file" / "history.sqlite3"))
+
+    _record_update("SUSE:Maintenance:1:1", "failed")
+    oqa_search.set_history_db(None)
+
+    assert "Could not save the results history" in mock_print_warn.call_args[0][0]
+
+
+def test_main_query_fake_server(capsys, tmp_path, run_main):
+    history_db = str(tmp_path / "history.sqlite3")
+    with FakeServer(versions=2, failed_jobs=1, aggregated_day=1) as server:
+        run_main(["SUSE:Maintenance:12345:67890", "--no-cache", "--history-db", history_db], server.url)
+        requests = sum(server.requests.values())
+
+        capsys.readouterr()
+        run_main(["query", "--history-db", history_db, "--section", "aggregated", "--version"] + server.versions)
+        output = capsys.readouterr().out
+
+        run_main(["query", "--history-db", history_db, "--build-checks", "--status", "failed"])
+        build_checks_output = capsys.readouterr().out
+
+        # the queries are answered from the history alone
+        assert sum(server.requests.values()) == requests
+
+    assert output.count("SUSE:Maintenance:12345:67890 aggregated - core") == 2
+    assert output.count("{} FAILED (1 jobs)".format(server.aggregated_build)) == 2
+    assert "# FAIL:  1" in build_checks_output
+
+
+def test_main_query_empty(capsys, tmp_path, run_main):
+    run_main(["query", "--history-db", str(tmp_path / "history.sqlite3"), "--last", "10"])
+
+    assert capsys.readouterr().out == "No results in the history for this query\n"
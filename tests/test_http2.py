@@ -0,0 +1,88 @@
+import shutil
+
+import mock
+import pytest
+
+from oqa_search import oqa_search
+from tests.fake_server import FakeServer
+
+UPDATE_ID = "SUSE:Maintenance:12345:67890"
+
+pytest.importorskip("httpx")
+pytest.importorskip("h2")
+pytestmark = pytest.mark.skipif(not shutil.which("openssl"), reason="the openssl command makes the certificates")
+
+
+@pytest.fixture
+def tls_server(monkeypatch):
+    def start(**kwargs):
+        server = FakeServer(**kwargs).start()
+        servers.append(server)
+        # both transports trust the self signed certificate of the server
+        monkeypatch.setenv("SSL_CERT_FILE", server.cert_file)
+        monkeypatch.setenv("REQUESTS_CA_BUNDLE", server.cert_file)
+        return server
+
+    servers = []
+    yield start
+    oqa_search.set_http2(False)
+    oqa_search._get_http2_client.cache_clear()
+    oqa_search._get_session.cache_clear()
+    for server in servers:
+        server.stop()
+
+
+def test_main_http2_fake_server(capsys, run_main, tls_server):
+    http1_server = tls_server(tls=True, versions=2, failed_jobs=1)
+    run_main([UPDATE_ID, "--no-cache", "--no-history"], http1_server.url)
+    http1_output = capsys.readouterr().out
+
+    http2_server = tls_server(http2=True, versions=2, failed_jobs=1)
+    run_main([UPDATE_ID, "--no-cache", "--no-history", "--http2"], http2_server.url)
+    http2_output = capsys.readouterr().out
+
+    assert http2_output.replace(http2_server.url, http1_server.url) == http1_output
+    assert "# FAIL:" in http2_output
+    assert http2_server.requests == http1_server.requests
+    # all the concurrent requests went through a single connection
+    assert http2_server.connections == 1
+    assert http1_server.connections > 1
+
+
+def test_http2_fallback(tls_server):
+    # the server only offers HTTP/1.1, it's used instead
+    server = tls_server(tls=True, logs=1)
+    oqa_search.set_http2(True)
+    url = "{}/api/v1/jobs/overview?version=15-SP0&build={}&groupid=10000".format(server.url, server.build)
+
+    futures = oqa_search._run_concurrently(oqa_search._get_json, [(url,)] * 4, 4)
+    assert [len(future.result()) for future in futures] == [server.jobs_per_build] * 4
+    log_url = "{}/testreports/{}/build_checks/{}".format(server.url, UPDATE_ID, server.log_names[0])
+    assert oqa_search._get_log_text(log_url).endswith("# FAIL:  1")
+    assert server.requests["jobs_overview"] == 4
+
+    with pytest.raises(oqa_search.requests.HTTPError) as e:
+        oqa_search._get_json("{}/api/v1/unknown".format(server.url))
+    assert e.value.response.status_code == 404
+
+
+def test_http2_deadline(tls_server):
+    server = tls_server(http2=True, latency=1)
+    oqa_search.set_http2(True)
+    oqa_search.set_deadline(0.2)
+    try:
+        with pytest.raises(oqa_search.DeadlineExceeded):
+            oqa_search._get_json("{}/api/v1/job_groups".format(server.url))
+    finally:
+        oqa_search.set_deadline(None)
+
+
+def test_main_http2_missing(capsys, run_main):
+    with mock.patch.object(oqa_search, "httpx", None):
+        with pytest.raises(ValueError):
+            oqa_search.set_http2(True)
+        with pytest.raises(SystemExit):
+            run_main([UPDATE_ID, "--http2"])
+
+    assert oqa_search.HTTP2_MISSING_TEXT in capsys.readouterr().err
+    assert not oqa_search._http2
@@ -0,0 +1,87 @@
+import mock
+import pytest
+
+from oqa_search import oqa_search
+from tests.fake_server import FakeServer
+
+UPDATE_ID = "SUSE:Maintenance:12345:67890"
+
+numpy_modes = pytest.mark.parametrize(
+    "with_numpy",
+    [pytest.param(True, marks=pytest.mark.skipif(oqa_search.numpy is None, reason="numpy not installed")), False],
+    ids=["numpy", "array"],
+)
+
+
+def _make_jobs(count, first_id=1, machine="64bit", state="done", result="failed"):
+    return [
+        {
+            "id": n,
+            "name": "sle-15-SP6-Server-DVD-Updates-x86_64-Build20241120-1-test{}@{}".format(n, machine),
+            "state": state,
+            "result": result,
+        }
+        for n in range(first_id, first_id + count)
+    ]
+
+
+@numpy_modes
+def test_count_jobs(with_numpy):
+    table = oqa_search._make_job_table()
+    oqa_search._add_job_results(table, _make_jobs(3, state="running", result="none"), "15-SP6", "core")
+    oqa_search._add_job_results(table, _make_jobs(2, 4, "uefi"), "15-SP6", "core")
+    oqa_search._add_job_results(table, _make_jobs(4, 6, result="incomplete"), "15-SP5", "yast")
+
+    with mock.patch.object(oqa_search, "numpy", oqa_search.numpy if with_numpy else None):
+        assert oqa_search._count_jobs(table, ["state"]) == {("done",): 6, ("running",): 3}
+        assert oqa_search._count_jobs(table, ["machine"]) == {("64bit",): 7, ("uefi",): 2}
+        assert list(oqa_search._count_jobs(table, ["result"]).items()) == [
+            (("incomplete",), 4),
+            (("none",), 3),
+            (("failed",), 2),
+        ]
+        assert oqa_search._count_jobs(table, ["version", "group", "result"]) == {
+            ("15-SP5", "yast", "incomplete"): 4,
+            ("15-SP6", "core", "none"): 3,
+            ("15-SP6", "core", "failed"): 2,
+        }
+        # more value combinations than jobs
+        assert oqa_search._count_jobs(table, oqa_search.JOB_TABLE_COLUMNS) == {
+            ("done", "incomplete", "15-SP5", "yast", "64bit"): 4,
+            ("running", "none", "15-SP6", "core", "64bit"): 3,
+            ("done", "failed", "15-SP6", "core", "uefi"): 2,
+        }
+        assert oqa_search._count_jobs(oqa_search._make_job_table(), oqa_search.JOB_TABLE_COLUMNS) == {}
+
+
+def test_job_table_size():
+    table = oqa_search._make_job_table()
+    oqa_search._add_job_results(table, _make_jobs(1000), "15-SP6", "core")
+
+    # a few bytes per job
+    assert sum(column.itemsize for column in table.values()) <= 32
+    assert all(len(column) == 1000 for column in table.values())
+
+
+@numpy_modes
+def test_main_summary_fake_server(capsys, run_main, with_numpy):
+    args = [UPDATE_ID, "--no-cache", "--no-history", "--summary", "--aggregated-groups", "core", "yast"]
+    with FakeServer(versions=2, failed_jobs=2, running_jobs=1) as server:
+        # an incomplete and a scheduled job, also matched by the failed and running overview queries
+        failed_id, _, running_id = server._get_build_jobs("15-SP0", server.build, 10000)[:3]
+        server._jobs[failed_id]["result"] = "incomplete"
+        server._jobs[running_id]["state"] = "scheduled"
+        with mock.patch.object(oqa_search, "numpy", oqa_search.numpy if with_numpy else None):
+            run_main(args, server.url)
+
+    # the single incidents and both aggregated updates builds of every version
+    assert capsys.readouterr().out.endswith(
+        "18 running or failed jobs\n"
+        "State: done 12, running 5, scheduled 1\n"
+        "Result: failed 11, none 6, incomplete 1\n"
+        "Version: 15-SP0 9, 15-SP1 9\n"
+        "Group: core 12, yast 6\n"
+        "Machine: 64bit 18\n"
+    )
+    # nothing is kept for the next runs
+    assert oqa_search._job_table is None
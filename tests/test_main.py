@@ -1,9 +1,12 @@
+import os
+import time
 from argparse import Namespace
 
 import mock
 import pytest
 
 from oqa_search import oqa_search
+from tests.fake_server import FakeServer
 
 
 @pytest.mark.parametrize(
@@ -14,6 +17,8 @@ from oqa_search import oqa_search
         ("S:M:12345:65478", [], False),
     ],
 )
+@mock.patch("oqa_search.oqa_search._start_build_checks")
+@mock.patch("oqa_search.oqa_search._start_aggregated_searches")
 @mock.patch("oqa_search.oqa_search._get_incident_info")
 @mock.patch("oqa_search.oqa_search.build_checks")
 @mock.patch("oqa_search.oqa_search.aggregated_updates")
@@ -25,6 +30,8 @@ def test_main(
     mock_aggregated_updates,
     mock_build_checks,
     mock_get_incident_info,
+    mock_start_aggregated_searches,
+    mock_start_build_checks,
     update_id,
     versions,
     no_aggregated,
@@ -37,6 +44,17 @@ def test_main(
         no_aggregated=no_aggregated,
         days=5,
         aggregated_groups=["core"],
+        details=False,
+        backend="openqa",
+        cache_dir=None,
+        no_cache=True,
+        history_db=None,
+        no_history=True,
+        gate=False,
+        build_checks_dir=None,
+        scan_workers=1,
+        summary=False,
+        changed_only=False,
     )
     mock_get_incident_info.return_value = (":12345:foo", versions)
 
@@ -54,3 +72,273 @@ def test_main(
 
     mock_get_incident_info.assert_called_once()
     mock_build_checks.assert_called_once()
+    # the sections printed later are fetched in the background meanwhile
+    assert mock_start_aggregated_searches.called == bool(versions and not no_aggregated)
+    mock_start_build_checks.assert_called_once()
+    assert mock_build_checks.call_args.args[-1] == mock_start_build_checks.return_value
+
+
+@mock.patch("oqa_search.oqa_search._get_incident_info")
+@mock.patch("oqa_search.oqa_search.build_checks")
+@mock.patch("oqa_search.oqa_search.single_incidents")
+@mock.patch("oqa_search.oqa_search.print_warn")
+@mock.patch("oqa_search.oqa_search._parser")
+def test_main_deadline(mock_parser, mock_print_warn, mock_single_incidents, mock_build_checks, mock_get_incident_info):
+    mock_parser.return_value = Namespace(
+        update_id="SUSE:Maintenance:12345:67890",
+        url_dashboard_qam="http://dashboard.qam.suse.de",
+        url_openqa="https://openqa.suse.de",
+        url_qam="https://qam.suse.de",
+        no_aggregated=False,
+        days=5,
+        aggregated_groups=["core"],
+        deadline=1,
+        details=False,
+        backend="openqa",
+        cache_dir=None,
+        no_cache=True,
+        history_db=None,
+        no_history=True,
+        gate=False,
+        build_checks_dir=None,
+        scan_workers=1,
+        summary=False,
+        changed_only=False,
+    )
+    mock_get_incident_info.side_effect = oqa_search.DeadlineExceeded()
+
+    oqa_search.main()
+
+    mock_single_incidents.assert_not_called()
+    mock_build_checks.assert_not_called()
+    mock_print_warn.assert_has_calls([mock.call(oqa_search.INCOMPLETE_TEXT)] * 2)
+
+
+@pytest.mark.parametrize("backend", ["openqa", "dashboard"])
+@mock.patch("oqa_search.oqa_search._start_build_checks")
+@mock.patch("oqa_search.oqa_search._start_aggregated_searches")
+@mock.patch("oqa_search.oqa_search._get_dashboard_aggregated_builds")
+@mock.patch("oqa_search.oqa_search._get_dashboard_job_results")
+@mock.patch("oqa_search.oqa_search._get_incident_info")
+@mock.patch("oqa_search.oqa_search.build_checks")
+@mock.patch("oqa_search.oqa_search.aggregated_updates")
+@mock.patch("oqa_search.oqa_search.single_incidents")
+@mock.patch("oqa_search.oqa_search._parser")
+def test_main_backend(
+    mock_parser,
+    mock_single_incidents,
+    mock_aggregated_updates,
+    mock_build_checks,
+    mock_get_incident_info,
+    mock_get_dashboard_job_results,
+    mock_get_dashboard_aggregated_builds,
+    mock_start_aggregated_searches,
+    mock_start_build_checks,
+    backend,
+):
+    mock_parser.return_value = Namespace(
+        update_id="SUSE:Maintenance:12345:67890",
+        url_dashboard_qam="http://dashboard.qam.suse.de",
+        url_openqa=["https://openqa.suse.de"],
+        url_qam="https://qam.suse.de",
+        no_aggregated=False,
+        days=5,
+        aggregated_groups=["core"],
+        details=False,
+        backend=backend,
+        cache_dir=None,
+        no_cache=True,
+        history_db=None,
+        no_history=True,
+        gate=False,
+        build_checks_dir=None,
+        scan_workers=1,
+        summary=False,
+        changed_only=False,
+    )
+    mock_get_incident_info.return_value = (":12345:foo", ["15-SP5"])
+
+    oqa_search.main()
+
+    if backend == "dashboard":
+        mock_get_dashboard_job_results.assert_called_once_with("http://dashboard.qam.suse.de", 12345)
+        mock_get_dashboard_aggregated_builds.assert_called_once_with("http://dashboard.qam.suse.de", 12345, 5)
+        dashboard_results = mock_get_dashboard_job_results.return_value
+        dashboard_builds = mock_get_dashboard_aggregated_builds.return_value
+        # the aggregated builds to search in are only known once the dashboard answers
+        mock_start_aggregated_searches.assert_not_called()
+        started_searches = None
+    else:
+        mock_get_dashboard_job_results.assert_not_called()
+        mock_get_dashboard_aggregated_builds.assert_not_called()
+        dashboard_results = None
+        dashboard_builds = None
+        mock_start_aggregated_searches.assert_called_once_with(
+            12345, ["15-SP5"], 5, ["core"], ["https://openqa.suse.de"]
+        )
+        started_searches = mock_start_aggregated_searches.return_value
+    mock_single_incidents.assert_called_once_with(
+        ":12345:foo", ["15-SP5"], ["https://openqa.suse.de"], False, dashboard_results
+    )
+    mock_aggregated_updates.assert_called_once_with(
+        12345, ["15-SP5"], 5, ["core"], ["https://openqa.suse.de"], False, dashboard_builds, started_searches
+    )
+
+
+@pytest.mark.parametrize("backend", ["openqa", "dashboard"])
+def test_main_fake_server(capsys, tmp_path, run_main, backend):
+    args = ["SUSE:Maintenance:12345:67890", "--backend", backend, "--cache-dir", str(tmp_path), "--no-history"]
+    with FakeServer(versions=2, failed_jobs=1, aggregated_day=1) as server:
+        run_main(args, server.url)
+
+    output = capsys.readouterr().out
+    # single incidents and aggregated updates (core) builds for both versions
+    assert output.count("FAILED (1 jobs)") == 4
+    assert "build={}&".format(server.aggregated_build) in output
+    assert "# FAIL:  1" in output
+    assert server.requests["job_groups"] == 1
+    if backend == "dashboard":
+        # the results and the aggregated builds come from the dashboard, openQA is only asked about those builds
+        assert server.requests["dashboard_jobs"] == 1
+        assert server.requests["update_settings"] == 1
+        assert server.requests["jobs_overview"] == 2 + 2 * 3
+    else:
+        # all, running and failed jobs of the single incidents, every version looks back to yesterday's aggregated
+        # updates build (the second one in both days at once), all, running and failed jobs of the aggregated updates
+        assert server.requests["jobs_overview"] == 2 * 3 + 2 * 2 + 2 * 3
+
+
+def test_main_fake_server_restarted_finished(capsys, tmp_path, run_main):
+    args = ["SUSE:Maintenance:12345:67890", "--no-aggregated", "--cache-dir", str(tmp_path), "--no-history"]
+    with FakeServer(versions=2, failed_jobs=1) as server:
+        run_main(args, server.url)
+        first_output = capsys.readouterr().out
+        # the failed jobs are restarted by a reviewer and pass before the next run
+        for version, group_id in [("15-SP0", 10000), ("15-SP1", 10001)]:
+            clone_id = server.restart_job(server._get_build_jobs(version, server.build, group_id)[0])
+            server._jobs[clone_id].update(state="done", result="passed")
+        run_main(args, server.url)
+        second_output = capsys.readouterr().out
+
+    assert first_output.count("FAILED (1 jobs)") == 2
+    # the cached results are of the jobs before the restart
+    assert "FAILED (1 jobs)" not in second_output
+    assert second_output.count("PASSED") == 2
+
+
+def test_main_deadline_stalled_body(capsys, run_main):
+    with FakeServer(versions=1, failed_jobs=1, stall=4) as server:
+        run_main(["SUSE:Maintenance:12345:67890", "--deadline", "2", "--no-cache", "--no-history"], server.url)
+
+    output = capsys.readouterr().out
+    # the openQA results came in time, the build checks log stalled past the deadline in the middle of its body
+    assert output.count("FAILED (1 jobs)") == 2
+    assert output.endswith("{}\n\x1b[01;33m{}\x1b[0m\n".format(server.log_names[0], oqa_search.INCOMPLETE_TEXT))
+
+
+@mock.patch("oqa_search.oqa_search.search_update")
+@mock.patch("oqa_search.oqa_search._parser")
+def test_main_batch(mock_parser, mock_search_update):
+    update_ids = ["SUSE:Maintenance:12345:67890", "SUSE:Maintenance:23456:78901"]
+    mock_parser.return_value = Namespace(
+        update_id=update_ids,
+        cache_dir=None,
+        no_cache=True,
+        no_history=True,
+        gate=False,
+        summary=False,
+        changed_only=False,
+    )
+
+    oqa_search.main()
+
+    assert mock_search_update.call_args_list == [mock.call(i, mock_parser.return_value) for i in update_ids]
+
+
+def test_main_fake_server_batch(capsys, tmp_path, run_main):
+    args = ["SUSE:Maintenance:12345:67890"] * 2 + ["--cache-dir", str(tmp_path), "--no-history"]
+    with FakeServer(versions=2, failed_jobs=1, aggregated_day=1) as server:
+        run_main(args, server.url)
+
+    output = capsys.readouterr().out
+    assert output.count("FAILED (1 jobs)") == 2 * 4
+    # the finished builds results are only queried for the first update
+    assert server.requests["incident_settings"] == 2
+    assert server.requests["jobs_overview"] == 2 * 3 + 2 * 2 + 2 * 3
+
+
+@pytest.mark.parametrize(
+    ("failed_jobs", "running_jobs", "aggregated_day", "expected_exit_code"),
+    [
+        (0, 0, 1, 0),
+        (1, 0, 1, 1),
+        (0, 1, 1, 2),
+        (0, 0, None, 3),
+    ],
+)
+def test_main_gate_fake_server(capsys, run_main, failed_jobs, running_jobs, aggregated_day, expected_exit_code):
+    server = FakeServer(versions=2, failed_jobs=failed_jobs, running_jobs=running_jobs, aggregated_day=aggregated_day)
+    with server:
+        exit_code = run_main(["SUSE:Maintenance:12345:67890", "--gate", "--no-cache", "--no-history"], server.url)
+
+    output = capsys.readouterr().out
+    assert exit_code == expected_exit_code
+    if expected_exit_code == 1:
+        # the first failed build rejects the update, whatever was fetched ahead of it is given up
+        assert output.count("FAILED (1 jobs)") == 1
+        assert "GATE: FAILED" in output
+        assert "Build checks:" not in output
+    else:
+        assert server.requests["build_checks_index"] == 1
+
+
+def test_main_gate_fake_server_cache(capsys, tmp_path, run_main):
+    deadlines_at_save = []
+    save_caches = oqa_search._save_caches
+
+    def saving_caches():
+        deadlines_at_save.append(oqa_search._deadline)
+        save_caches()
+
+    args = ["SUSE:Maintenance:12345:67890", "--gate", "--cache-dir", str(tmp_path), "--no-history"]
+    with FakeServer(versions=2, failed_jobs=1, aggregated_day=1, latency=0.05) as server:
+        with mock.patch.object(oqa_search, "_save_caches", side_effect=saving_caches):
+            exit_code = run_main(args, server.url)
+
+    assert exit_code == oqa_search.GATE_EXIT_CODES["failed"]
+    # the searches still in the background were given up before the caches were saved
+    assert len(deadlines_at_save) == 1
+    assert deadlines_at_save[0] is not None and deadlines_at_save[0] <= time.monotonic()
+    assert "build_results.json" in os.listdir(tmp_path)
+
+
+@pytest.mark.parametrize(
+    ("statuses", "expected_exit_code"),
+    [
+        (set(), 0),
+        ({"passed"}, 0),
+        ({"passed", "no build"}, 3),
+        ({"incomplete", "no build", "running"}, 2),
+        ({"incomplete", "passed"}, 4),
+    ],
+)
+def test_get_gate_exit_code(statuses, expected_exit_code):
+    oqa_search.set_gate(True)
+    for status in statuses:
+        oqa_search._record_gate(status)
+    oqa_search.set_gate(False)
+    for status in statuses:
+        oqa_search._record_gate(status)
+
+    assert oqa_search._get_gate_exit_code() == expected_exit_code
+
+
+def test_record_gate_failed():
+    oqa_search.set_gate(False)
+    oqa_search._record_gate("failed")
+    assert oqa_search._get_gate_exit_code() == 1
+
+    oqa_search.set_gate(True)
+    with pytest.raises(oqa_search.GateFailed):
+        oqa_search._record_gate("failed")
+    oqa_search.set_gate(False)
@@ -0,0 +1,107 @@
+import threading
+import time
+from collections import Counter
+from types import SimpleNamespace
+
+import pytest
+
+from oqa_search import oqa_search
+from tests.fake_server import FakeServer
+
+UPDATE_ID = "SUSE:Maintenance:12345:67890"
+
+
+@pytest.fixture(autouse=True)
+def stop_profile():
+    yield
+    oqa_search.set_profile(None)
+
+
+def test_main_profile_fake_server(capsys, tmp_path, run_main):
+    profile_path = tmp_path / "oqa-search.folded"
+    with FakeServer(logs=2, log_size=8 * 1024 * 1024) as server:
+        run_main([UPDATE_ID, "--no-cache", "--no-history", "--profile", str(profile_path)], server.url)
+    output = capsys.readouterr()
+
+    # the search itself isn't changed, the summary goes to the standard error
+    assert output.out.count("# FAIL:") == 2
+    assert "Profile written to {}".format(profile_path) in output.err
+    assert "Top functions:" in output.err
+
+    stacks = {}
+    for line in profile_path.read_text().splitlines():
+        stack, microseconds = line.rsplit(" ", 1)
+        stacks[stack] = int(microseconds)
+    assert all(microseconds > 0 for microseconds in stacks.values())
+    # the logs fetched in the background are scanned under the log scanning phase, with their whole stack
+    assert any(
+        stack.startswith("[log scanning];threading.py:") and "oqa_search.py:_get_build_checks;" in stack
+        for stack in stacks
+    )
+    assert all(
+        stack.split(";", 1)[0].strip("[]") in set(oqa_search.PROFILE_PHASES.values()) | {"other"} for stack in stacks
+    )
+
+
+def _make_frames(*frames):
+    # innermost frame first, like the ones sampled
+    frame = None
+    for filename, name in reversed(frames):
+        frame = SimpleNamespace(f_code=SimpleNamespace(co_filename=filename, co_name=name), f_back=frame)
+    return frame
+
+
+@pytest.mark.parametrize(
+    ("frames", "phase"),
+    [
+        # a whole response decoded at once
+        ([("/usr/lib/python3/json/decoder.py", "raw_decode"), (oqa_search.__file__, "_get_json")], "JSON parsing"),
+        # its body fetched before that
+        (
+            [
+                ("/usr/lib/python3/site-packages/requests/models.py", "close"),
+                (oqa_search.__file__, "_get"),
+                (oqa_search.__file__, "_get_json"),
+            ],
+            "fetching",
+        ),
+        (
+            [(oqa_search.__file__, "_iter_body"), (oqa_search.__file__, "_get"), (oqa_search.__file__, "_get_json")],
+            "fetching",
+        ),
+        ([(oqa_search.__file__, "main")], "other"),
+    ],
+)
+def test_get_collapsed_stack_phase(frames, phase):
+    stack = oqa_search._get_collapsed_stack(_make_frames(*frames))
+
+    assert stack.split(";")[0] == "[{}]".format(phase)
+    assert stack.rsplit(";", 1)[-1].endswith(":" + frames[0][1])
+
+
+def test_profile_cpu_time(capsys, tmp_path):
+    profile_path = tmp_path / "oqa-search.folded"
+    stop = threading.Event()
+
+    def busy():
+        while not stop.is_set():
+            sum(range(1000))
+
+    oqa_search.set_profile(str(profile_path))
+    thread = threading.Thread(target=busy)
+    thread.start()
+    time.sleep(0.3)
+    stop.set()
+    thread.join()
+    oqa_search._save_profile()
+
+    stacks = Counter()
+    for line in profile_path.read_text().splitlines():
+        stack, microseconds = line.rsplit(" ", 1)
+        stacks[stack.rsplit(";", 1)[-1]] += int(microseconds)
+    # the waiting thread uses next to no CPU time
+    assert stacks.most_common(1)[0][0] == "test_profile.py:busy"
+    assert stacks["test_profile.py:test_profile_cpu_time"] < stacks["test_profile.py:busy"] / 10
+    assert "Profile written to" in capsys.readouterr().err
+    # profiling is stopped once written
+    assert oqa_search._profile_thread is None
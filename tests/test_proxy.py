@@ -0,0 +1,161 @@
+import json
+import threading
+from datetime import datetime, timedelta
+from urllib.parse import urlparse
+
+import mock
+import pytest
+
+from oqa_search import oqa_search
+from tests.fake_server import FakeServer
+
+UPDATE_ID = "SUSE:Maintenance:12345:67890"
+
+
+@pytest.fixture
+def proxy_cache():
+    yield oqa_search._proxy_cache
+    oqa_search._proxy_cache.clear()
+    oqa_search._proxy_cache_size = 0
+
+
+@pytest.fixture
+def proxy(proxy_cache):
+    def start(upstreams):
+        server = oqa_search.make_proxy_server(upstreams, port=0)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+        return "http://{}:{}".format(*server.server_address[:2])
+
+    servers = []
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+def test_main_proxy_fake_server(capsys, tmp_path, run_main, proxy):
+    with FakeServer(versions=2, failed_jobs=1, aggregated_day=1) as server:
+        proxy_url = "{}/{}".format(proxy([server.url]), urlparse(server.url).netloc)
+
+        # every reviewer has its own cache, the proxy is shared
+        run_main([UPDATE_ID, "--no-history", "--cache-dir", str(tmp_path / "first")], proxy_url)
+        first_output = capsys.readouterr().out
+        first_requests = dict(server.requests)
+        run_main([UPDATE_ID, "--no-history", "--cache-dir", str(tmp_path / "second")], proxy_url)
+        second_output = capsys.readouterr().out
+        second_requests = dict(server.requests)
+
+        # later, only what may have changed meanwhile is fetched again
+        for url, (body, content_type, expires) in list(oqa_search._proxy_cache.items()):
+            if expires is not None:
+                oqa_search._proxy_cache[url] = (body, content_type, expires - oqa_search.PROXY_TTL - 1)
+        run_main([UPDATE_ID, "--no-history", "--cache-dir", str(tmp_path / "third")], proxy_url)
+        third_output = capsys.readouterr().out
+
+    assert first_output.count("FAILED (1 jobs)") == 4
+    for output in [second_output, third_output]:
+        assert output.replace(proxy_url, server.url) == first_output.replace(proxy_url, server.url)
+    # the second reviewer is answered by the proxy alone
+    assert second_requests == first_requests
+    # the job groups, finished jobs and build checks logs are only fetched once for everybody, the job listings of
+    # every build could have changed since
+    for endpoint in ["job_groups", "build_checks_log"]:
+        assert server.requests[endpoint] == 1
+    assert server.requests["jobs"] == first_requests["jobs"]
+    assert server.requests["jobs_overview"] == 2 * first_requests["jobs_overview"]
+
+
+def test_proxy_unknown_upstream(proxy):
+    proxy_url = proxy(["https://openqa.suse.de"])
+
+    with pytest.raises(oqa_search.requests.HTTPError) as e:
+        oqa_search._get_json("{}/example.com/api/v1/job_groups".format(proxy_url))
+    assert e.value.response.status_code == 404
+
+
+def test_proxy_get_once(proxy_cache):
+    started, finished = threading.Event(), threading.Event()
+
+    def slow_get():
+        started.set()
+        finished.wait(5)
+        return mock.MagicMock(headers={"Content-Type": "text/plain"})
+
+    # the clients asking for the same URL at once share a single upstream request
+    with mock.patch("oqa_search.oqa_search._open") as mock_open, mock.patch(
+        "oqa_search.oqa_search._iter_body", return_value=[b"foo"]
+    ):
+        mock_open.return_value.__enter__.side_effect = slow_get
+        futures = oqa_search._run_concurrently(oqa_search._proxy_get, [("https://qam.suse.de/log",)] * 4, 4)
+        started.wait(5)
+        finished.set()
+        assert [future.result() for future in futures] == [(b"foo", "text/plain")] * 4
+        assert oqa_search._proxy_get("https://qam.suse.de/log") == (b"foo", "text/plain")
+
+    mock_open.assert_called_once_with("https://qam.suse.de/log")
+
+
+def test_proxy_cache_size(proxy_cache):
+    with mock.patch.object(oqa_search, "_proxy_cache_max_size", 10):
+        for n in range(4):
+            oqa_search._proxy_cache_set("https://qam.suse.de/build_checks/{}.log".format(n), b"1234", None)
+        # the least recently used responses are dropped first
+        assert list(proxy_cache) == ["https://qam.suse.de/build_checks/{}.log".format(n) for n in [2, 3]]
+        assert oqa_search._proxy_cache_size == 8
+
+
+@pytest.mark.parametrize(
+    ("url", "body", "expected_ttl"),
+    [
+        ("https://qam.suse.de/testreports/SUSE:Maintenance:1:2/build_checks/foo.log", b"", None),
+        ("https://qam.suse.de/testreports/SUSE:Maintenance:1:2/build_checks/", b"", oqa_search.PROXY_TTL),
+        ("https://openqa.suse.de/api/v1/job_groups", b"[]", oqa_search.PROXY_JOB_GROUPS_TTL),
+        ("https://openqa.suse.de/api/v1/jobs/1", json.dumps({"job": {"state": "done"}}).encode(), None),
+        (
+            "https://openqa.suse.de/api/v1/jobs/1",
+            json.dumps({"job": {"state": "running"}}).encode(),
+            oqa_search.PROXY_TTL,
+        ),
+        (
+            "https://openqa.suse.de/api/v1/jobs?ids=1,2",
+            json.dumps({"jobs": [{"state": "done"}, {"state": "cancelled"}]}).encode(),
+            None,
+        ),
+        (
+            "https://openqa.suse.de/api/v1/jobs?ids=1,2",
+            json.dumps({"jobs": [{"state": "done"}, {"state": "scheduled"}]}).encode(),
+            oqa_search.PROXY_TTL,
+        ),
+        ("https://openqa.suse.de/api/v1/jobs/1", b"<html>", oqa_search.PROXY_TTL),
+        (
+            "https://openqa.suse.de/api/v1/jobs/overview?distri=sle&version=15-SP6&build=20241120-1",
+            b"[]",
+            oqa_search.PROXY_TTL,
+        ),
+        (
+            "https://openqa.suse.de/api/v1/jobs/overview?distri=sle&version=15-SP6&build=20241120-1"
+            "&state=scheduled&state=running",
+            b"[]",
+            oqa_search.PROXY_TTL,
+        ),
+        (
+            "https://openqa.suse.de/api/v1/jobs/overview?distri=sle&version=15-SP6&build=:12345:foo",
+            b"[]",
+            oqa_search.PROXY_TTL,
+        ),
+        ("http://dashboard.qam.suse.de/api/incident_settings/12345", b"[]", oqa_search.PROXY_TTL),
+    ],
+)
+def test_get_proxy_ttl(url, body, expected_ttl):
+    assert oqa_search._get_proxy_ttl(url, body) == expected_ttl
+
+
+def test_get_proxy_ttl_past_days():
+    today = "{}-1".format(datetime.now().strftime("%Y%m%d"))
+    yesterday = "{}-1".format((datetime.now() - timedelta(1)).strftime("%Y%m%d"))
+    url = "https://openqa.suse.de/api/v1/jobs/overview?distri=sle&version=15-SP6&build={}&groupid=1"
+
+    # the jobs of past builds can still be restarted
+    assert oqa_search._get_proxy_ttl(url.format(today), b"[]") == oqa_search.PROXY_TTL
+    assert oqa_search._get_proxy_ttl(url.format(yesterday), b"[]") == oqa_search.PROXY_TTL
@@ -0,0 +1,113 @@
+from collections import Counter
+
+import pytest
+
+from oqa_search import oqa_search
+from tests.fake_server import FAKE_AGGREGATED_GROUPS, FakeServer
+
+UPDATE_ID = "SUSE:Maintenance:12345:67890"
+
+# bytes of the test framework summary the fake server adds after the log_size bytes of every log
+LOG_SUMMARY_SIZE = 128
+
+
+def _get_budget(
+    versions, groups, days, archs, aggregated_day, warm, backend="openqa", details=False, running=False
+) -> Counter:
+    """Get the requests a search may send by endpoint"""
+    found = aggregated_day is not None and aggregated_day < days
+    budget = Counter(job_groups=1, incident_settings=1, build_checks_index=1, build_checks_log=archs)
+
+    # all the jobs of every build queried (to cache its results once finished), then its running and failed ones
+    build_queries = 3
+    if backend == "dashboard":
+        # the dashboard tells the single incidents results and the aggregated updates builds of the incident
+        budget.update(dashboard_jobs=1, update_settings=1)
+        single_incidents = 0
+        probes = versions if found else 0
+    else:
+        single_incidents = build_queries * versions
+        # aggregated updates builds looked into for the incident, for all the groups at once: the days back to the
+        # build for every version (the date found first and the newer ones at once for the rest), or the whole window
+        probes = (aggregated_day + 1) * versions if found else days * versions
+    # every version and group build
+    aggregated_results = build_queries * versions * groups if found else 0
+
+    if not warm:
+        # the tested incidents of every build looked into are checked with a job per group, and a single batch of jobs
+        # if some groups weren't among them
+        budget.update(jobs_overview=single_incidents + probes + aggregated_results, jobs=probes * min(groups, 2))
+    elif running:
+        # only the builds still running are queried again
+        budget.update(jobs_overview=single_incidents + aggregated_results)
+    else:
+        # the cached results of every finished build are checked to be of the same jobs
+        budget.update(jobs_overview=(single_incidents + aggregated_results) // build_queries)
+    if details:
+        # the failed jobs of every build in a single request, the aggregated ones were already fetched when looked into
+        budget.update(jobs=versions + (versions * groups if warm and found else 0))
+
+    return +budget
+
+
+@pytest.mark.parametrize("warm", [False, True], ids=["cold", "warm"])
+@pytest.mark.parametrize(
+    ("versions", "groups", "days", "archs", "aggregated_day", "kwargs"),
+    [
+        (1, 1, 1, 1, 0, {}),
+        (4, 1, 3, 1, 2, {}),
+        (2, 3, 3, 1, 2, {}),
+        (2, 1, 10, 1, 9, {}),
+        (2, 1, 3, 4, 2, {}),
+        (2, 2, 5, 1, None, {}),
+        (2, 2, 3, 1, 1, {"running": True}),
+        (3, 1, 3, 1, 2, {"details": True}),
+        (2, 2, 3, 2, 1, {"backend": "dashboard"}),
+        (2, 1, 3, 1, None, {"backend": "dashboard"}),
+    ],
+    ids=[
+        "base",
+        "versions",
+        "groups",
+        "days",
+        "archs",
+        "no-build",
+        "running",
+        "details",
+        "dashboard",
+        "dashboard-none",
+    ],
+)
+def test_main_request_budget(capsys, tmp_path, run_main, versions, groups, days, archs, aggregated_day, kwargs, warm):
+    server = FakeServer(
+        versions=versions,
+        aggregated_day=aggregated_day,
+        logs=archs,
+        running_jobs=int(kwargs.get("running", False)),
+    )
+    args = ["--days", str(days), "--aggregated-groups"] + [group.lower() for group in FAKE_AGGREGATED_GROUPS[:groups]]
+    args = [UPDATE_ID, "--no-history", "--cache-dir", str(tmp_path)] + args
+    args.extend(["--backend", kwargs.get("backend", "openqa")])
+    if kwargs.get("details"):
+        args.append("--details")
+
+    with server:
+        # nothing but the cache directory is kept between runs
+        if warm:
+            run_main(args, server.url)
+            capsys.readouterr()
+            server.requests.clear()
+            server.bytes_sent.clear()
+        run_main(args, server.url)
+    output = capsys.readouterr().out
+
+    budget = _get_budget(versions, groups, days, archs, aggregated_day, warm, **kwargs)
+    over_budget = {
+        endpoint: (count, budget[endpoint]) for endpoint, count in server.requests.items() if count > budget[endpoint]
+    }
+    assert not over_budget, "requests over budget (sent, budget): {}".format(over_budget)
+    # every log is downloaded once
+    assert server.bytes_sent["build_checks_log"] <= archs * (server.log_size + LOG_SUMMARY_SIZE)
+    # the budget isn't met by giving up on anything
+    assert output.count("# FAIL:") == archs
+    assert oqa_search.INCOMPLETE_TEXT not in output
@@ -2,7 +2,12 @@ import mock
 import pytest
 
 from oqa_search import oqa_search
-from tests.conftest import MOCK_INCIDENT_GROUPS, MOCK_URL
+from tests.conftest import (
+    MOCK_AGGREGATED_GROUPS,
+    MOCK_INCIDENT_GROUPS,
+    MOCK_URL,
+    mock_dashboard_job_json,
+)
 
 
 @pytest.mark.parametrize(
@@ -13,16 +18,162 @@ from tests.conftest import MOCK_INCIDENT_GROUPS, MOCK_URL
     ],
 )
 @mock.patch("oqa_search.oqa_search._print_openqa_job_results")
+@mock.patch("oqa_search.oqa_search._get_openqa_job_results")
+@mock.patch("oqa_search.oqa_search.get_aggregated_groups")
 @mock.patch("oqa_search.oqa_search.get_incident_groups")
-def test_single_incidents(mock_get_incident_groups, mock_print_openqa_job_results, versions):
+def test_single_incidents(
+    mock_get_incident_groups,
+    mock_get_aggregated_groups,
+    mock_get_openqa_job_results,
+    mock_print_openqa_job_results,
+    versions,
+):
     build = ":12345:foo"
     mock_get_incident_groups.return_value = MOCK_INCIDENT_GROUPS
+    mock_get_aggregated_groups.return_value = MOCK_AGGREGATED_GROUPS
     oqa_search.single_incidents(build, versions, MOCK_URL)
 
-    expected_calls = [mock.call(MOCK_URL, v, build, MOCK_INCIDENT_GROUPS[v]) for v in versions]
+    expected_calls = [mock.call(MOCK_URL, v, build, MOCK_INCIDENT_GROUPS[v], mock.ANY) for v in versions]
 
     assert mock_print_openqa_job_results.call_count == len(versions)
     mock_print_openqa_job_results.assert_has_calls(expected_calls)
+    # all the versions are fetched concurrently and printed in order
+    assert [c.args[4].result() for c in mock_print_openqa_job_results.call_args_list] == [
+        mock_get_openqa_job_results.return_value
+    ] * len(versions)
 
     with pytest.raises(ValueError):
         oqa_search.single_incidents(build, ["12-SP9", "15-SP5"], MOCK_URL)
+
+
+@mock.patch("oqa_search.oqa_search.print_title")
+@mock.patch("oqa_search.oqa_search.print")
+@mock.patch("oqa_search.oqa_search.print_ko")
+@mock.patch("oqa_search.oqa_search.print_ok")
+@mock.patch("oqa_search.oqa_search._get_openqa_job_results")
+@mock.patch("oqa_search.oqa_search.get_incident_groups")
+def test_single_incidents_multiple_instances(
+    mock_get_incident_groups, mock_get_openqa_job_results, mock_print_ok, mock_print_ko, mock_print, mock_print_title
+):
+    build = ":12345:foo"
+    versions = ["15-SP2", "15-SP3"]
+    urls = [MOCK_URL, "https://fake.staging.url"]
+    mock_get_incident_groups.return_value = MOCK_INCIDENT_GROUPS
+    # the staging instance has failures
+    mock_get_openqa_job_results.side_effect = lambda url, *_: ([], [{"id": 1}] if url != MOCK_URL else [])
+
+    oqa_search.single_incidents(build, versions, urls)
+
+    # results of every instance are shown together for each version
+    expected_calls = [
+        mock.call(
+            "{} -> {}/tests/overview?distri=sle&version={}&build={}&groupid={}".format(
+                v, url, v, build, MOCK_INCIDENT_GROUPS[v]
+            )
+        )
+        for v in versions
+        for url in urls
+    ]
+    assert mock_print.call_args_list == expected_calls
+    assert mock_print_ok.call_count == len(versions)
+    assert mock_print_ko.call_count == len(versions)
+
+
+@mock.patch("oqa_search.oqa_search.print_warn")
+@mock.patch("oqa_search.oqa_search._print_openqa_job_results")
+@mock.patch("oqa_search.oqa_search._get_openqa_job_results")
+@mock.patch("oqa_search.oqa_search.get_aggregated_groups")
+@mock.patch("oqa_search.oqa_search.get_incident_groups")
+def test_single_incidents_missing_in_instance(
+    mock_get_incident_groups,
+    mock_get_aggregated_groups,
+    mock_get_openqa_job_results,
+    mock_print_openqa_job_results,
+    mock_print_warn,
+):
+    build = ":12345:foo"
+    staging_url = "https://fake.staging.url"
+    # the staging instance only has the 15-SP3 group
+    mock_get_incident_groups.side_effect = lambda url: (
+        {"15-SP3": MOCK_INCIDENT_GROUPS["15-SP3"]} if url == staging_url else MOCK_INCIDENT_GROUPS
+    )
+    mock_get_aggregated_groups.return_value = {}
+
+    oqa_search.single_incidents(build, ["15-SP2", "15-SP3"], [MOCK_URL, staging_url])
+
+    assert mock_print_openqa_job_results.call_args_list == [
+        mock.call(MOCK_URL, "15-SP2", build, MOCK_INCIDENT_GROUPS["15-SP2"], mock.ANY),
+        mock.call(MOCK_URL, "15-SP3", build, MOCK_INCIDENT_GROUPS["15-SP3"], mock.ANY),
+        mock.call(staging_url, "15-SP3", build, MOCK_INCIDENT_GROUPS["15-SP3"], mock.ANY),
+    ]
+    mock_print_warn.assert_called_once_with("15-SP2 -> Not available in {}".format(staging_url))
+    # a version missing in all the instances is still an error
+    with pytest.raises(ValueError):
+        oqa_search.single_incidents(build, ["12-SP9"], [MOCK_URL, staging_url])
+
+
+@mock.patch("oqa_search.oqa_search._print_failed_job_details")
+@mock.patch("oqa_search.oqa_search._print_openqa_job_results")
+@mock.patch("oqa_search.oqa_search._get_openqa_job_results")
+@mock.patch("oqa_search.oqa_search.get_incident_groups")
+def test_single_incidents_details(
+    mock_get_incident_groups,
+    mock_get_openqa_job_results,
+    mock_print_openqa_job_results,
+    mock_print_failed_job_details,
+):
+    mock_get_incident_groups.return_value = MOCK_INCIDENT_GROUPS
+    # only the first version has failed jobs
+    mock_print_openqa_job_results.side_effect = [[{"id": 1}], []]
+
+    oqa_search.single_incidents(":12345:foo", ["15-SP2", "15-SP3"], MOCK_URL, details=True)
+
+    mock_print_failed_job_details.assert_called_once_with(MOCK_URL, [{"id": 1}])
+
+
+@mock.patch("oqa_search.oqa_search._get_json")
+def test_get_dashboard_job_results(mock_get_json):
+    mock_get_json.return_value = [
+        mock_dashboard_job_json(1, "15-SP6", 546, "passed"),
+        mock_dashboard_job_json(2, "15-SP6", 546, "failed"),
+        mock_dashboard_job_json(3, "15-SP6", 546, "failed", obsolete=True),
+        mock_dashboard_job_json(4, "15-SP6", 999, "running"),
+        mock_dashboard_job_json(5, "15-SP4", 521, "waiting", flavor="Server-DVD-TERADATA-Incidents"),
+        mock_dashboard_job_json(6, "15-SP5", 490, "passed"),
+    ]
+    expected_value = {
+        ("15-SP6", 546): ([], [{"id": 2, "name": "somejob-2"}]),
+        ("15-SP6", 999): ([{"id": 4, "name": "somejob-4"}], []),
+        ("15-SP4-TERADATA", 521): ([{"id": 5, "name": "somejob-5"}], []),
+        ("15-SP5", 490): ([], []),
+    }
+
+    assert oqa_search._get_dashboard_job_results(MOCK_URL, 12345) == expected_value
+    mock_get_json.assert_called_once_with("{}/api/jobs/incident/12345".format(MOCK_URL))
+
+    # nothing known when the dashboard doesn't have the jobs
+    mock_get_json.side_effect = oqa_search.requests.HTTPError()
+    assert oqa_search._get_dashboard_job_results(MOCK_URL, 12345) == {}
+
+
+@mock.patch("oqa_search.oqa_search.print")
+@mock.patch("oqa_search.oqa_search.print_ko")
+@mock.patch("oqa_search.oqa_search.print_ok")
+@mock.patch("oqa_search.oqa_search._get_json")
+@mock.patch("oqa_search.oqa_search.get_aggregated_groups")
+@mock.patch("oqa_search.oqa_search.get_incident_groups")
+def test_single_incidents_dashboard_results(
+    mock_get_incident_groups, mock_get_aggregated_groups, mock_get_json, mock_print_ok, mock_print_ko, mock_print
+):
+    mock_get_incident_groups.return_value = MOCK_INCIDENT_GROUPS
+    mock_get_aggregated_groups.return_value = MOCK_AGGREGATED_GROUPS
+    mock_get_json.return_value = []
+    dashboard_results = {("15-SP2", MOCK_INCIDENT_GROUPS["15-SP2"]): ([], [{"id": 1, "name": "somejob-1"}])}
+
+    oqa_search.single_incidents(":12345:foo", ["15-SP2", "15-SP3"], MOCK_URL, dashboard_results=dashboard_results)
+
+    mock_print_ko.assert_called_once_with("FAILED (1 jobs)")
+    # openQA is only queried (running and failed jobs) for the version missing in the dashboard
+    mock_print_ok.assert_called_once_with("PASSED")
+    assert mock_get_json.call_count == 2
+    assert all("version=15-SP3" in c.args[0] for c in mock_get_json.call_args_list)
@@ -0,0 +1,104 @@
+import sqlite3
+from datetime import datetime
+
+import pytest
+
+from oqa_search import oqa_search
+from tests.fake_server import FakeServer
+
+UPDATE_ID = "SUSE:Maintenance:12345:67890"
+
+
+@pytest.mark.parametrize("backend", ["openqa", "dashboard"])
+def test_main_prefetch_offline(capsys, tmp_path, run_main, backend):
+    snapshot = str(tmp_path / "snapshot.sqlite3")
+    options = ["--backend", backend]
+    with FakeServer(versions=2, failed_jobs=1, aggregated_day=1) as server:
+        run_main([UPDATE_ID, "--no-cache", "--no-history"] + options, server.url)
+        online_output = capsys.readouterr().out
+        online_requests = sum(server.requests.values())
+
+        run_main(["prefetch", UPDATE_ID, "--snapshot", snapshot] + options, server.url)
+        prefetch_output = capsys.readouterr().out
+        prefetch_requests = sum(server.requests.values()) - online_requests
+
+    # the server is gone, everything is answered from the snapshot
+    run_main([UPDATE_ID, "--no-cache", "--no-history", "--offline", snapshot] + options, server.url)
+    offline_output = capsys.readouterr().out
+
+    assert prefetch_output.startswith(UPDATE_ID + "\n")
+    assert "FAILED" not in prefetch_output
+    assert " responses (" in prefetch_output
+    with sqlite3.connect(snapshot) as connection:
+        # the prefetch sends the same requests as a search
+        assert connection.execute("SELECT COUNT(*) FROM responses").fetchone()[0] <= prefetch_requests
+    assert prefetch_requests == online_requests
+    assert offline_output == online_output
+    assert oqa_search.INCOMPLETE_TEXT not in offline_output
+
+
+def test_main_prefetch_offline_cache(capsys, tmp_path, run_main):
+    snapshot = str(tmp_path / "snapshot.sqlite3")
+    cache_dir = tmp_path / "cache"
+    options = ["--no-history", "--cache-dir", str(cache_dir)]
+    with FakeServer(versions=2, failed_jobs=1, aggregated_day=1) as server:
+        # the cache has the results of the live runs before
+        run_main([UPDATE_ID] + options, server.url)
+        online_output = capsys.readouterr().out
+        run_main(["prefetch", UPDATE_ID, "--snapshot", snapshot], server.url)
+        capsys.readouterr()
+    cached = {path.name: path.read_text() for path in cache_dir.iterdir()}
+
+    run_main([UPDATE_ID, "--offline", snapshot] + options, server.url)
+    offline_output = capsys.readouterr().out
+
+    assert offline_output == online_output
+    assert oqa_search.INCOMPLETE_TEXT not in offline_output
+    # the cache is left as it was
+    assert {path.name: path.read_text() for path in cache_dir.iterdir()} == cached
+
+
+def test_main_offline_not_in_snapshot(capsys, tmp_path, run_main):
+    snapshot = str(tmp_path / "snapshot.sqlite3")
+    with FakeServer(versions=1) as server:
+        run_main(["prefetch", UPDATE_ID, "--no-aggregated", "--snapshot", snapshot], server.url)
+        capsys.readouterr()
+
+    # only the single incidents and the build checks were prefetched
+    run_main([UPDATE_ID, "--no-cache", "--no-history", "--offline", snapshot], server.url)
+    output = capsys.readouterr().out
+
+    assert "{} -> {}".format(server.versions[0], oqa_search.INCOMPLETE_TEXT) in output
+    assert output.count(oqa_search.INCOMPLETE_TEXT) == 1
+    assert "# FAIL:" in output
+
+
+def test_snapshot_now(tmp_path):
+    snapshot = str(tmp_path / "snapshot.sqlite3")
+    taken_at = datetime(2024, 11, 20, 12)
+    with sqlite3.connect(snapshot) as connection:
+        connection.executescript(oqa_search.SNAPSHOT_SCHEMA)
+        connection.execute("INSERT INTO info VALUES ('taken_at', ?)", (str(taken_at.timestamp()),))
+        connection.execute("INSERT INTO responses VALUES ('https://openqa.test/log', ?, NULL)", (b"foo",))
+
+    oqa_search.set_snapshot(snapshot, offline=True)
+    try:
+        # the aggregated updates builds are searched back from when the snapshot was taken
+        assert oqa_search._get_aggregated_build_names(2) == ["20241120-1", "20241119-1"]
+        assert oqa_search._get_log_text("https://openqa.test/log") == "foo"
+        with pytest.raises(oqa_search.NotInSnapshot):
+            oqa_search._get_log_text("https://openqa.test/other")
+    finally:
+        oqa_search.set_snapshot(None)
+
+    assert oqa_search._now().date() == datetime.now().date()
+
+
+def test_main_offline_invalid_snapshot(capsys, tmp_path, run_main):
+    not_a_snapshot = tmp_path / "snapshot.sqlite3"
+    not_a_snapshot.write_text("foo")
+
+    with pytest.raises(SystemExit):
+        run_main([UPDATE_ID, "--offline", str(not_a_snapshot)])
+    assert "Could not use the snapshot" in capsys.readouterr().err
+    assert not oqa_search._snapshot_offline